@@ -0,0 +1,5 @@
+"""Offline performance benchmarks.
+
+Run from the repository root, e.g. ``python -m benchmarks.jellyfin_db``.
+They are not collected by pytest.
+"""
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Device profile of a play built from the add-on settings against the cached
+one, in the service and in the plugin process.
+
+python -m benchmarks.device_profile --plays 500 --setting-cost 0.5
+
+Every getSetting call costs --setting-cost milliseconds, it is noticeably slow
+on ARM boxes. The plugin starts afresh for every play, its profile comes from
+the window property the first build published.
+"""
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import xbmcaddon
+
+from . import kodi_stub
+
+#################################################################################################
+
+
+class ApiClient(object):
+    class config(object):
+        data = {"auth.token": ""}
+
+
+def slow_settings(cost, reads):
+    """getSetting taking cost seconds, counting the calls in reads."""
+    get_setting = xbmcaddon.Addon.getSetting
+
+    def getSetting(self, key):
+        reads.append(key)
+        end = time.perf_counter() + cost
+
+        while time.perf_counter() < end:
+            pass
+
+        return get_setting(self, key)
+
+    xbmcaddon.Addon.getSetting = getSetting
+
+
+def run(plays, play, reads):
+    """Seconds and settings read per play."""
+    del reads[:]
+    start = time.perf_counter()
+
+    for _ in range(plays):
+        play()
+
+    return (time.perf_counter() - start) / plays, len(reads) / plays
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--plays", type=int, default=500)
+    parser.add_argument(
+        "--setting-cost", type=float, default=0.5, help="milliseconds per getSetting"
+    )
+    args = parser.parse_args()
+
+    profile = tempfile.mkdtemp(prefix="jellyfin-benchmark-")
+    kodi_stub.install(profile)
+    reads = []
+    slow_settings(args.setting_cost / 1000.0, reads)
+
+    from jellyfin_kodi.helper import playutils
+
+    def utils():
+        return playutils.PlayUtils(
+            {"Type": "Movie"}, False, api_client=ApiClient, server="http://server"
+        )
+
+    def build():
+        return utils().build_device_profile()
+
+    def service():
+        return utils().get_device_profile()
+
+    def plugin():
+        playutils.PROFILES.clear()
+        return utils().get_device_profile()
+
+    try:
+        assert service() == build()
+
+        results = [
+            ("built every play", run(args.plays, build, reads)),
+            ("service, cached", run(args.plays, service, reads)),
+            ("plugin, window", run(args.plays, plugin, reads)),
+        ]
+
+        playutils.check_device_profile()
+        settings_changed = run(1, playutils.check_device_profile, reads)
+    finally:
+        shutil.rmtree(profile, ignore_errors=True)
+
+    print(
+        "%s plays, getSetting %.2f ms, profile fingerprint %s"
+        % (args.plays, args.setting_cost, next(iter(playutils.PROFILES)))
+    )
+
+    for name, (seconds, count) in results:
+        print("%-17s %8.3f ms/play %5.1f settings read" % (name, seconds * 1e3, count))
+
+    print(
+        "%-17s %8.3f ms       %5.1f settings read"
+        % ("settings changed", settings_changed[0] * 1e3, settings_changed[1])
+    )
+
+
+if __name__ == "__main__":
+    main()
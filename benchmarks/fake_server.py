@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""Local stand-in for the Jellyfin endpoints a sync requests, serving a
+SyntheticLibrary. It runs in its own process so its work does not count
+against the add-on's time and memory.
+"""
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import collections
+import json
+import multiprocessing
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from .synthetic import SyntheticLibrary
+
+#################################################################################################
+
+ROUTES = [
+    ("views", re.compile(r"^/Users/[^/]+/Views$")),
+    ("trailers", re.compile(r"^/Users/[^/]+/Items/(?P<id>[^/]+)/LocalTrailers$")),
+    ("item", re.compile(r"^/Users/[^/]+/Items/(?P<id>[^/]+)$")),
+    ("items", re.compile(r"^/Users/[^/]+/Items$")),
+    ("seasons", re.compile(r"^/Shows/(?P<id>[^/]+)/Seasons$")),
+    ("episodes", re.compile(r"^/Shows/(?P<id>[^/]+)/Episodes$")),
+    ("artists", re.compile(r"^/Artists$")),
+    ("ancestors", re.compile(r"^/Items/(?P<id>[^/]+)/Ancestors$")),
+    ("sync_queue", re.compile(r"^/Jellyfin.Plugin.KodiSyncQueue/[^/]+/GetItems$")),
+    ("stats", re.compile(r"^/Benchmark/Stats$")),
+]
+
+#################################################################################################
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+
+        for name, route in ROUTES:
+            match = route.match(url.path)
+
+            if match:
+                self.server.count(name)
+                method = getattr(self, name)
+                break
+        else:
+            self.server.count("unknown")
+            return self.reply({}, 404)
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        return self.reply(method(params, **match.groupdict()))
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+
+        if url.path == "/Benchmark/Touch":
+            length = int(self.headers.get("Content-Length") or 0)
+            item_ids = json.loads(self.rfile.read(length) or "[]")
+            self.server.library.touch(item_ids)
+
+            return self.reply({"Touched": len(item_ids)})
+
+        # Playback reports, userdata and the like
+        self.server.count("post")
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        return self.reply({}, 204)
+
+    def reply(self, result, status=200):
+        body = b"" if status == 204 else json.dumps(result).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.sent(len(body))
+
+    @property
+    def library(self):
+        return self.server.library
+
+    def paged(self, items, params, total):
+        start = int(params.get("StartIndex") or 0)
+        result = {"Items": items, "StartIndex": start}
+
+        if params.get("EnableTotalRecordCount", "true").lower() != "false":
+            result["TotalRecordCount"] = total
+
+        return result
+
+    def views(self, params):
+        return {"Items": self.library.views()}
+
+    def item(self, params, id):
+        return self.library.view(id) or self.library.get(id) or {}
+
+    def items(self, params):
+        if params.get("Ids"):
+            items = [self.library.get(x) for x in params["Ids"].split(",")]
+            items = [x for x in items if x is not None]
+
+            return {"Items": items, "TotalRecordCount": len(items)}
+
+        if params.get("MinDateLastSaved") or params.get("MinDateLastSavedForUser"):
+            items = [
+                {"Id": x, "Type": self.library.get(x)["Type"]}
+                for x in self.library.changed
+            ]
+            return {"Items": items, "TotalRecordCount": len(items)}
+
+        types = (params.get("IncludeItemTypes") or "").split(",")
+        total = sum(self.library.total(x) for x in types)
+        start = int(params.get("StartIndex") or 0)
+        limit = int(params.get("Limit") or total)
+        items = []
+
+        # Several types are served one after the other
+        for item_type in types:
+            count = self.library.total(item_type)
+
+            if start < count and len(items) < limit:
+                items.extend(self.library.page(item_type, start, limit - len(items)))
+
+            start = max(start - count, 0)
+
+        return self.paged(items, params, total)
+
+    def trailers(self, params, id):
+        return []
+
+    def ancestors(self, params, id):
+        item = self.library.get(id) or {}
+        return [
+            view for view in self.library.views() if view["Id"] == item.get("ParentId")
+        ]
+
+    def seasons(self, params, id):
+        show = int(id.split("-")[1])
+        items = self.library.show_seasons(show)
+
+        return {"Items": items, "TotalRecordCount": len(items)}
+
+    def episodes(self, params, id):
+        show = int(id.split("-")[1])
+        season = params.get("SeasonId")
+        items = self.library.show_episodes(
+            show, int(season.split("-")[2]) if season else None
+        )
+        start = int(params.get("StartIndex") or 0)
+        limit = int(params.get("Limit") or len(items))
+
+        return self.paged(items[start : start + limit], params, len(items))
+
+    def artists(self, params):
+        total = self.library.total("MusicArtist")
+        start = int(params.get("StartIndex") or 0)
+        limit = int(params.get("Limit") or total)
+
+        return self.paged(self.library.page("MusicArtist", start, limit), params, total)
+
+    def sync_queue(self, params):
+        changed = list(self.library.changed)
+
+        return {
+            "ItemsAdded": [],
+            "ItemsUpdated": changed,
+            "ItemsRemoved": [],
+            "UserDataChanged": [],
+        }
+
+    def stats(self, params):
+        return self.server.stats()
+
+
+class FakeServer(ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, library, latency=0, port=0):
+        ThreadingHTTPServer.__init__(self, ("127.0.0.1", port), Handler)
+        self.library = library
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.requests = collections.Counter()
+        self.bytes_sent = 0
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%s" % self.server_address[1]
+
+    def count(self, name):
+        with self.lock:
+            self.requests[name] += 1
+
+    def sent(self, size):
+        with self.lock:
+            self.bytes_sent += size
+
+    def stats(self):
+        with self.lock:
+            return {"Requests": dict(self.requests), "BytesSent": self.bytes_sent}
+
+
+def serve(library_args, latency, pipe):
+    server = FakeServer(SyntheticLibrary(**library_args), latency)
+    pipe.send(server.url)
+    server.serve_forever()
+
+
+def start(latency=0, **library_args):
+    """Serve a SyntheticLibrary from a child process, returns (process, url)."""
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(
+        target=serve, args=(library_args, latency, child), daemon=True
+    )
+    process.start()
+
+    return process, parent.recv()
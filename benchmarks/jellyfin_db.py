@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""Lookup speed of the jellyfin mapping table before and after the index migration.
+
+python -m benchmarks.jellyfin_db --rows 500000
+"""
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from jellyfin_kodi.database import jellyfin_tables, queries as QU
+
+#################################################################################################
+
+CREATE_V1 = """CREATE TABLE jellyfin(
+    jellyfin_id TEXT UNIQUE, media_folder TEXT, jellyfin_type TEXT, media_type TEXT,
+    kodi_id INTEGER, kodi_fileid INTEGER, kodi_pathid INTEGER, parent_id INTEGER,
+    checksum INTEGER, jellyfin_parent_id TEXT)"""
+
+LIBRARIES = ["library%02d" % x for x in range(8)]
+
+#################################################################################################
+
+
+def populate(cursor, rows):
+    """Roughly the shape of a real library: 10% movies, the rest episodes in
+    seasons of 12, each season in a show of 4 seasons.
+    """
+    cursor.execute(CREATE_V1)
+    cursor.execute("CREATE TABLE version(idVersion TEXT)")
+    cursor.execute("INSERT INTO version(idVersion) VALUES ('1')")
+
+    def generate():
+        for x in range(rows):
+            if x % 10 == 0:
+                yield (
+                    "movie%08d" % x,
+                    random.choice(LIBRARIES),
+                    "Movie",
+                    "movie",
+                    x,
+                    x,
+                    1,
+                    None,
+                    "{}",
+                    "parent%05d" % (x % 5000),
+                )
+            else:
+                season = x // 12
+                yield (
+                    "episode%08d" % x,
+                    None,
+                    "Episode",
+                    "episode",
+                    x,
+                    x,
+                    1,
+                    season,
+                    "{}",
+                    "season%07d" % season,
+                )
+
+    cursor.executemany(
+        "INSERT INTO jellyfin(jellyfin_id, media_folder, jellyfin_type, media_type,"
+        " kodi_id, kodi_fileid, kodi_pathid, parent_id, checksum, jellyfin_parent_id)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        generate(),
+    )
+
+
+def lookups(rows):
+    return [
+        (
+            "get_item_by_parent",
+            QU.get_item_by_parent,
+            lambda: (random.randrange(rows // 12), "episode"),
+            200,
+        ),
+        (
+            "get_item_by_kodi",
+            QU.get_item_by_kodi,
+            lambda: (random.randrange(rows), "episode"),
+            200,
+        ),
+        (
+            "get_media_by_parent_id",
+            QU.get_media_by_parent_id,
+            lambda: ("season%07d" % random.randrange(rows // 12),),
+            200,
+        ),
+        (
+            "get_item_by_media_folder",
+            QU.get_item_by_media_folder,
+            lambda: (random.choice(LIBRARIES),),
+            10,
+        ),
+        ("get_checksum", QU.get_checksum, lambda: ("Movie",), 5),
+    ]
+
+
+def measure(cursor, rows):
+    results = {}
+
+    for name, query, args, repeat in lookups(rows):
+        start = time.perf_counter()
+
+        for _ in range(repeat):
+            cursor.execute(query, args()).fetchall()
+
+        results[name] = (time.perf_counter() - start) / repeat * 1000
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500000)
+    args = parser.parse_args()
+
+    random.seed(1)
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+
+    try:
+        conn = sqlite3.connect(path)
+        cursor = conn.cursor()
+
+        start = time.perf_counter()
+        populate(cursor, args.rows)
+        conn.commit()
+        print("populated %s rows in %.1fs" % (args.rows, time.perf_counter() - start))
+
+        before = measure(cursor, args.rows)
+
+        start = time.perf_counter()
+        jellyfin_tables(cursor)
+        conn.commit()
+        print("migration took %.1fs" % (time.perf_counter() - start))
+
+        after = measure(cursor, args.rows)
+        conn.close()
+    finally:
+        os.remove(path)
+
+    print("%-26s %12s %12s %10s" % ("lookup", "before (ms)", "after (ms)", "speedup"))
+    for name in before:
+        print(
+            "%-26s %12.3f %12.3f %9.0fx"
+            % (name, before[name], after[name], before[name] / max(after[name], 1e-6))
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""The Kodi SQL layer per writer call and per table, against fixture databases
+of Kodi 19, 20 and 21.
+
+The writers get the items of a SyntheticLibrary without a server behind them,
+in pages inside bulk() like a full sync. Next to the timings a digest of every
+table is printed, a change to the SQL layer should leave the digests as they
+were.
+
+python -m benchmarks.kodi_db --kodi 19 20 21 --movies 2000 --series 20 --artists 20
+"""
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import argparse
+import collections
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from . import kodi_schema, kodi_stub
+from .synthetic import VIEWS, SyntheticLibrary
+
+#################################################################################################
+
+ADDRESS = "http://127.0.0.1:8096"
+
+# label, writers instrumented, attribute of the writer holding the method, method
+CASES = [
+    ("Movies.movie_add", ["movies"], None, "movie_add"),
+    ("TVShows.episode_add", ["tvshows"], None, "episode_add"),
+    ("Music.song_add", ["music"], None, "song_add"),
+    ("add_people", ["movies", "tvshows"], None, "add_people"),
+    ("Artwork.add", ["movies", "tvshows", "music"], "artwork", "add"),
+]
+
+# writer, method, item type, in the order of a full sync
+WRITES = [
+    ("movies", "movie", "Movie"),
+    ("tvshows", "tvshow", "Series"),
+    ("tvshows", "episode", "Episode"),
+    ("music", "artist", "MusicArtist"),
+    ("music", "album", "MusicAlbum"),
+    ("music", "song", "Audio"),
+]
+
+# Columns Kodi or the add-on fill with the time of the write
+VOLATILE = {"lastScraped"}
+
+Connection = collections.namedtuple("Connection", "conn cursor")
+
+#################################################################################################
+
+
+class Server(object):
+    """What the writers ask of the server, answered from a SyntheticLibrary."""
+
+    def __init__(self, library):
+        self.library = library
+        self.auth = self
+        self.jellyfin = self
+        self.server_id = "benchmark-server"
+
+    def get_server_info(self, server_id):
+        return {"Id": server_id, "address": ADDRESS}
+
+    def get_item(self, item_id):
+        return self.library.get(item_id)
+
+    def get_items(self, item_ids):
+        return {"Items": [self.library.get(x) for x in item_ids]}
+
+    def get_seasons(self, show_id):
+        return {"Items": self.library.show_seasons(int(show_id.split("-")[1]))}
+
+    def get_local_trailers(self, item_id):
+        return []
+
+
+def instrument(metrics, writers):
+    """Record the calls of CASES on the writers."""
+    for label, names, owner, method in CASES:
+        for name in names:
+            target = writers[name]
+
+            if owner is not None:
+                target = getattr(target, owner)
+
+            setattr(target, method, metrics.timed(label)(getattr(target, method)))
+
+
+def connect(path, metrics):
+    from jellyfin_kodi.helper.metrics import TimedCursor
+
+    conn = sqlite3.connect(path)
+
+    return Connection(conn, TimedCursor(conn.cursor(), metrics))
+
+
+def digest(path):
+    """Rows and a digest of the content of every table, ignoring VOLATILE."""
+    conn = sqlite3.connect(path)
+    result = {}
+
+    for (table,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name"
+    ):
+        cursor = conn.execute("SELECT * FROM %s" % table)
+        keep = [
+            index
+            for index, column in enumerate(cursor.description)
+            if column[0] not in VOLATILE
+        ]
+        rows = sorted(repr([row[x] for x in keep]) for row in cursor)
+
+        if rows:
+            content = "\n".join(rows).encode("utf-8")
+            result[table] = (len(rows), hashlib.sha1(content).hexdigest()[:12])
+
+    conn.close()
+
+    return result
+
+
+def pages(items, limit):
+    for start in range(0, len(items), limit):
+        yield items[start : start + limit]
+
+
+def write(writer, call, items, limit, metrics, stage):
+    for page in pages(items, limit):
+        with writer.bulk():
+            for item in page:
+                with metrics.timer(stage):
+                    call(item)
+
+    metrics.add_items(len(items))
+
+
+def run(kodi, folder, library, limit):
+    """Write the library into new databases of a Kodi version, returns the
+    metrics summary and the paths of the databases.
+    """
+    from jellyfin_kodi.database import jellyfin_tables
+    from jellyfin_kodi.database.jellyfin_db import JellyfinDatabase
+    from jellyfin_kodi.helper.metrics import Metrics
+    from jellyfin_kodi.objects import Movies, Music, TVShows
+
+    kodi_stub.build_version("%s.0" % kodi)
+    folder = os.path.join(folder, "kodi%s" % kodi)
+    os.makedirs(folder)
+    video_path = kodi_schema.create_video(
+        os.path.join(folder, "MyVideos%s.db" % kodi_schema.KODI[kodi][0]), kodi
+    )
+    music_path = kodi_schema.create_music(
+        os.path.join(folder, "MyMusic%s.db" % kodi_schema.KODI[kodi][1]), kodi
+    )
+    jellyfin_path = os.path.join(folder, "jellyfin.db")
+
+    metrics = Metrics()
+    server = Server(library)
+    video = connect(video_path, metrics)
+    music = connect(music_path, metrics)
+    jellyfin = connect(jellyfin_path, metrics)
+
+    jellyfin_tables(jellyfin.cursor)
+    views = JellyfinDatabase(jellyfin.cursor)
+
+    for view in library.views():
+        views.add_view(view["Id"], view["Name"], view["CollectionType"])
+
+    def view(collection):
+        return {"Id": VIEWS[collection][0], "Name": VIEWS[collection][1]}
+
+    writers = {
+        "movies": Movies(server, jellyfin, video, False, view("movies")),
+        "tvshows": TVShows(server, jellyfin, video, False, view("tvshows")),
+        "music": Music(server, jellyfin, music, False, view("music")),
+    }
+    instrument(metrics, writers)
+    metrics.start()
+
+    for name, method, item_type in WRITES:
+        write(
+            writers[name],
+            getattr(writers[name], method),
+            library.page(item_type, 0, library.total(item_type)),
+            limit,
+            metrics,
+            "write.%s" % method,
+        )
+
+    summary = metrics.stop()
+
+    for connection in (video, music, jellyfin):
+        connection.conn.commit()
+        connection.conn.close()
+
+    return summary, (video_path, music_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--kodi",
+        type=int,
+        nargs="+",
+        choices=sorted(kodi_schema.KODI),
+        default=sorted(kodi_schema.KODI),
+    )
+    parser.add_argument("--movies", type=int, default=1000)
+    parser.add_argument("--series", type=int, default=20)
+    parser.add_argument("--seasons", type=int, default=3)
+    parser.add_argument("--episodes", type=int, default=10)
+    parser.add_argument("--artists", type=int, default=20)
+    parser.add_argument("--albums", type=int, default=3)
+    parser.add_argument("--songs", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=50, help="items per bulk block")
+    parser.add_argument("--keep", action="store_true", help="keep the databases")
+    args = parser.parse_args()
+
+    profile = tempfile.mkdtemp(prefix="jellyfin-kodi-db-")
+    kodi_stub.install(profile)
+
+    # The writers read the path substitutions of the server from here
+    from jellyfin_kodi.database import save_credentials
+    from jellyfin_kodi.helper.metrics import report
+
+    save_credentials({"Servers": [{"Id": "benchmark-server", "address": ADDRESS}]})
+    library = SyntheticLibrary(
+        args.movies,
+        args.series,
+        args.seasons,
+        args.episodes,
+        args.artists,
+        args.albums,
+        args.songs,
+    )
+
+    try:
+        for kodi in args.kodi:
+            summary, databases = run(kodi, profile, library, args.limit)
+
+            print("Kodi %s" % kodi)
+            print(report(summary))
+
+            for path in databases:
+                print(os.path.basename(path))
+
+                for table, (rows, value) in sorted(digest(path).items()):
+                    print("    %-20s %8d rows  %s" % (table, rows, value))
+
+            print("")
+    finally:
+        if args.keep:
+            print("databases: %s" % profile)
+        else:
+            shutil.rmtree(profile, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""Empty Kodi video and music databases, the tables and indexes Kodi creates.
+
+The statements follow VideoDatabase::CreateTables and MusicDatabase::CreateTables
+of Kodi 19 (MyVideos119, MyMusic82), 20 (MyVideos121, MyMusic82) and 21
+(MyVideos131, MyMusic83). The video tables of 20 and 21 are the ones of 19 with
+Kodi's own upgrade steps applied. The music tables the add-on writes did not
+change between 82 and 83. Views are reduced to the columns the add-on reads,
+the triggers to the link cleanups that run when the add-on removes items.
+"""
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import sqlite3
+
+#################################################################################################
+
+# Kodi major version: (MyVideos version, MyMusic version)
+KODI = {19: (119, 82), 20: (121, 82), 21: (131, 83)}
+VIDEO_VERSION, MUSIC_VERSION = KODI[21]
+
+
+def columns(count):
+    return ", ".join("c%02d TEXT" % x for x in range(count))
+
+
+VIDEO = [
+    "CREATE TABLE version (idVersion INTEGER, iCompressCount INTEGER)",
+    "CREATE TABLE bookmark (idBookmark INTEGER PRIMARY KEY, idFile INTEGER,"
+    " timeInSeconds DOUBLE, totalTimeInSeconds DOUBLE, thumbNailImage TEXT,"
+    " player TEXT, playerState TEXT, type INTEGER)",
+    "CREATE TABLE settings (idFile INTEGER, Deinterlace BOOL, ViewMode INTEGER,"
+    " ZoomAmount FLOAT, PixelRatio FLOAT, VerticalShift FLOAT, AudioStream INTEGER,"
+    " SubtitleStream INTEGER, SubtitleDelay FLOAT, SubtitlesOn BOOL, Brightness FLOAT,"
+    " Contrast FLOAT, Gamma FLOAT, VolumeAmplification FLOAT, AudioDelay FLOAT,"
+    " ResumeTime INTEGER, Sharpness FLOAT, NoiseReduction FLOAT, NonLinStretch BOOL,"
+    " PostProcess BOOL, ScalingMethod INTEGER, DeinterlaceMode INTEGER,"
+    " StereoMode INTEGER, StereoInvert BOOL, VideoStream INTEGER,"
+    " TonemapMethod INTEGER, TonemapParam FLOAT, Orientation INTEGER,"
+    " CenterMixLevel INTEGER)",
+    "CREATE TABLE stacktimes (idFile INTEGER, times TEXT)",
+    "CREATE TABLE genre (genre_id INTEGER PRIMARY KEY, name TEXT)",
+    "CREATE TABLE genre_link (genre_id INTEGER, media_id INTEGER, media_type TEXT)",
+    "CREATE TABLE country (country_id INTEGER PRIMARY KEY, name TEXT)",
+    "CREATE TABLE country_link (country_id INTEGER, media_id INTEGER, media_type TEXT)",
+    "CREATE TABLE movie (idMovie INTEGER PRIMARY KEY, idFile INTEGER, %s,"
+    " idSet INTEGER, userrating INTEGER, premiered TEXT)" % columns(24),
+    "CREATE TABLE actor (actor_id INTEGER PRIMARY KEY, name TEXT, art_urls TEXT)",
+    "CREATE TABLE actor_link (actor_id INTEGER, media_id INTEGER, media_type TEXT,"
+    " role TEXT, cast_order INTEGER)",
+    "CREATE TABLE director_link (actor_id INTEGER, media_id INTEGER, media_type TEXT)",
+    "CREATE TABLE writer_link (actor_id INTEGER, media_id INTEGER, media_type TEXT)",
+    "CREATE TABLE path (idPath INTEGER PRIMARY KEY, strPath TEXT, strContent TEXT,"
+    " strScraper TEXT, strHash TEXT, scanRecursive INTEGER, useFolderNames BOOL,"
+    " strSettings TEXT, noUpdate BOOL, exclude BOOL, allAudio BOOL, dateAdded TEXT,"
+    " idParentPath INTEGER)",
+    "CREATE TABLE files (idFile INTEGER PRIMARY KEY, idPath INTEGER,"
+    " strFilename TEXT, playCount INTEGER, lastPlayed TEXT, dateAdded TEXT)",
+    "CREATE TABLE tvshow (idShow INTEGER PRIMARY KEY, %s, userrating INTEGER,"
+    " duration INTEGER)" % columns(24),
+    "CREATE TABLE episode (idEpisode INTEGER PRIMARY KEY, idFile INTEGER, %s,"
+    " idShow INTEGER, userrating INTEGER, idSeason INTEGER)" % columns(24),
+    "CREATE TABLE tvshowlinkpath (idShow INTEGER, idPath INTEGER)",
+    "CREATE TABLE movielinktvshow (idMovie INTEGER, IdShow INTEGER)",
+    "CREATE TABLE studio (studio_id INTEGER PRIMARY KEY, name TEXT)",
+    "CREATE TABLE studio_link (studio_id INTEGER, media_id INTEGER, media_type TEXT)",
+    "CREATE TABLE musicvideo (idMVideo INTEGER PRIMARY KEY, idFile INTEGER, %s,"
+    " userrating INTEGER, premiered TEXT)" % columns(24),
+    "CREATE TABLE streamdetails (idFile INTEGER, iStreamType INTEGER,"
+    " strVideoCodec TEXT, fVideoAspect FLOAT, iVideoWidth INTEGER,"
+    " iVideoHeight INTEGER, strAudioCodec TEXT, iAudioChannels INTEGER,"
+    " strAudioLanguage TEXT, strSubtitleLanguage TEXT, iVideoDuration INTEGER,"
+    " strStereoMode TEXT, strVideoLanguage TEXT)",
+    "CREATE TABLE sets (idSet INTEGER PRIMARY KEY, strSet TEXT, strOverview TEXT)",
+    "CREATE TABLE seasons (idSeason INTEGER PRIMARY KEY, idShow INTEGER,"
+    " season INTEGER, name TEXT, userrating INTEGER)",
+    "CREATE TABLE art (art_id INTEGER PRIMARY KEY, media_id INTEGER,"
+    " media_type TEXT, type TEXT, url TEXT)",
+    "CREATE TABLE tag (tag_id INTEGER PRIMARY KEY, name TEXT)",
+    "CREATE TABLE tag_link (tag_id INTEGER, media_id INTEGER, media_type TEXT)",
+    "CREATE TABLE rating (rating_id INTEGER PRIMARY KEY, media_id INTEGER,"
+    " media_type TEXT, rating_type TEXT, rating FLOAT, votes INTEGER)",
+    "CREATE TABLE uniqueid (uniqueid_id INTEGER PRIMARY KEY, media_id INTEGER,"
+    " media_type TEXT, value TEXT, type TEXT)",
+    # Indexes
+    "CREATE UNIQUE INDEX ix_bookmark ON bookmark (idFile, type)",
+    "CREATE UNIQUE INDEX ix_settings ON settings (idFile)",
+    "CREATE UNIQUE INDEX ix_stacktimes ON stacktimes (idFile)",
+    "CREATE UNIQUE INDEX ix_path ON path (strPath)",
+    "CREATE INDEX ix_path2 ON path (idParentPath)",
+    "CREATE INDEX ix_files ON files (idPath, strFilename)",
+    "CREATE UNIQUE INDEX ix_movie_file_1 ON movie (idFile, idMovie)",
+    "CREATE UNIQUE INDEX ix_movie_file_2 ON movie (idMovie, idFile)",
+    "CREATE INDEX ixMovieBasePath ON movie (c23)",
+    "CREATE UNIQUE INDEX ix_tvshowlinkpath_1 ON tvshowlinkpath (idShow, idPath)",
+    "CREATE UNIQUE INDEX ix_tvshowlinkpath_2 ON tvshowlinkpath (idPath, idShow)",
+    "CREATE UNIQUE INDEX ix_movielinktvshow_1 ON movielinktvshow (idShow, idMovie)",
+    "CREATE UNIQUE INDEX ix_movielinktvshow_2 ON movielinktvshow (idMovie, idShow)",
+    "CREATE UNIQUE INDEX ix_episode_file_1 ON episode (idEpisode, idFile)",
+    "CREATE UNIQUE INDEX id_episode_file_2 ON episode (idFile, idEpisode)",
+    "CREATE INDEX ix_episode_season_episode ON episode (c12, c13)",
+    "CREATE INDEX ix_episode_bookmark ON episode (c17)",
+    "CREATE INDEX ix_episode_show1 ON episode (idEpisode, idShow)",
+    "CREATE INDEX ix_episode_show2 ON episode (idShow, idEpisode)",
+    "CREATE INDEX ixEpisodeBasePath ON episode (c19)",
+    "CREATE UNIQUE INDEX ix_musicvideo_file_1 ON musicvideo (idMVideo, idFile)",
+    "CREATE UNIQUE INDEX ix_musicvideo_file_2 ON musicvideo (idFile, idMVideo)",
+    "CREATE INDEX ixMusicVideoBasePath ON musicvideo (c14)",
+    "CREATE INDEX ix_streamdetails ON streamdetails (idFile)",
+    "CREATE INDEX ix_seasons ON seasons (idShow, season)",
+    "CREATE INDEX ix_art ON art (media_id, media_type, type)",
+    "CREATE INDEX ix_rating ON rating (media_id, media_type)",
+    "CREATE INDEX ix_uniqueid1 ON uniqueid (media_id, media_type, type)",
+    "CREATE INDEX ix_uniqueid2 ON uniqueid (media_type, value)",
+    "CREATE UNIQUE INDEX ix_actor_1 ON actor (name)",
+    "CREATE UNIQUE INDEX ix_actor_link_1 ON actor_link"
+    " (actor_id, media_type, media_id, role)",
+    "CREATE INDEX ix_actor_link_2 ON actor_link (media_id, media_type, actor_id)",
+]
+
+for link in ("director_link", "writer_link"):
+    VIDEO += [
+        "CREATE UNIQUE INDEX ix_%s_1 ON %s (actor_id, media_type, media_id)"
+        % (link, link),
+        "CREATE INDEX ix_%s_2 ON %s (media_id, media_type, actor_id)" % (link, link),
+    ]
+
+for table in ("genre", "country", "studio", "tag"):
+    VIDEO += [
+        "CREATE UNIQUE INDEX ix_%s_1 ON %s (name)" % (table, table),
+        "CREATE UNIQUE INDEX ix_%s_link_1 ON %s_link (%s_id, media_type, media_id)"
+        % (table, table, table),
+        "CREATE INDEX ix_%s_link_2 ON %s_link (media_id, media_type, %s_id)"
+        % (table, table, table),
+    ]
+
+VIDEO += [
+    "CREATE VIEW tvshowcounts AS SELECT tvshow.idShow AS idShow,"
+    " MAX(files.lastPlayed) AS lastPlayed,"
+    " NULLIF(COUNT(episode.c12), 0) AS totalCount,"
+    " COUNT(files.playCount) AS watchedcount,"
+    " NULLIF(COUNT(DISTINCT(episode.c12)), 0) AS totalSeasons,"
+    " MAX(files.dateAdded) AS dateAdded"
+    " FROM tvshow"
+    " LEFT JOIN episode ON episode.idShow = tvshow.idShow"
+    " LEFT JOIN files ON files.idFile = episode.idFile"
+    " GROUP BY tvshow.idShow",
+    "CREATE VIEW tvshow_view AS SELECT tvshow.*, uniqueid.value AS uniqueid_value,"
+    " uniqueid.type AS uniqueid_type"
+    " FROM tvshow"
+    " LEFT JOIN uniqueid ON uniqueid.uniqueid_id = tvshow.c12",
+]
+
+# media_type, table, id column, link tables holding media_id
+VIDEO_MEDIA = [
+    ("movie", "movie", "idMovie"),
+    ("tvshow", "tvshow", "idShow"),
+    ("episode", "episode", "idEpisode"),
+    ("musicvideo", "musicvideo", "idMVideo"),
+    ("season", "seasons", "idSeason"),
+    ("set", "sets", "idSet"),
+]
+VIDEO_LINKS = [
+    "genre_link",
+    "country_link",
+    "studio_link",
+    "tag_link",
+    "actor_link",
+    "director_link",
+    "writer_link",
+    "art",
+    "rating",
+    "uniqueid",
+]
+
+for media, table, column in VIDEO_MEDIA:
+    VIDEO.append(
+        "CREATE TRIGGER delete_%s AFTER DELETE ON %s FOR EACH ROW BEGIN %s END"
+        % (
+            media,
+            table,
+            " ".join(
+                "DELETE FROM %s WHERE media_id = old.%s AND media_type = '%s';"
+                % (link, column, media)
+                for link in VIDEO_LINKS
+            ),
+        )
+    )
+
+# Kodi 20 keeps the HDR type of video streams
+VIDEO_20 = ["ALTER TABLE streamdetails ADD COLUMN strHdrType TEXT"]
+
+# Kodi 21 adds versions (editions) of movies
+VIDEO_21 = [
+    "CREATE TABLE videoversiontype (id INTEGER PRIMARY KEY, name TEXT,"
+    " owner INTEGER, itemType INTEGER)",
+    "CREATE TABLE videoversion (idFile INTEGER PRIMARY KEY, idMedia INTEGER,"
+    " media_type TEXT, itemType INTEGER, idType INTEGER)",
+    "CREATE INDEX ix_videoversion ON videoversion (idMedia, media_type)",
+    # Rows Kodi inserts with a new database, the standard version of a movie
+    "INSERT INTO videoversiontype (id, name, owner, itemType)"
+    " VALUES (40400, 'Standard Edition', 0, 0)",
+]
+
+MUSIC = [
+    "CREATE TABLE version (idVersion INTEGER, iCompressCount INTEGER)",
+    "CREATE TABLE artist (idArtist INTEGER PRIMARY KEY, strArtist VARCHAR(256),"
+    " strMusicBrainzArtistID TEXT, strSortName TEXT, strType TEXT, strGender TEXT,"
+    " strDisambiguation TEXT, strBorn TEXT, strFormed TEXT, strGenres TEXT,"
+    " strMoods TEXT, strStyles TEXT, strInstruments TEXT, strBiography TEXT,"
+    " strDied TEXT, strDisbanded TEXT, strYearsActive TEXT, strImage TEXT,"
+    " idInfoSetting INTEGER NOT NULL DEFAULT 0, dateAdded TEXT, dateNew TEXT,"
+    " dateModified TEXT, lastScraped VARCHAR(20) DEFAULT NULL,"
+    " bScrapedMBID INTEGER NOT NULL DEFAULT 0)",
+    "CREATE TABLE album (idAlbum INTEGER PRIMARY KEY, strAlbum VARCHAR(256),"
+    " strMusicBrainzAlbumID TEXT, strReleaseGroupMBID TEXT, strArtistDisp TEXT,"
+    " strArtistSort TEXT, strGenres TEXT, strReleaseDate TEXT,"
+    " strOrigReleaseDate TEXT, bBoxedSet INTEGER NOT NULL DEFAULT 0,"
+    " bCompilation INTEGER NOT NULL DEFAULT '0', strMoods TEXT, strStyles TEXT,"
+    " strThemes TEXT, strReview TEXT, strImage TEXT, strLabel TEXT, strType TEXT,"
+    " strReleaseStatus TEXT, fRating FLOAT NOT NULL DEFAULT 0,"
+    " iVotes INTEGER NOT NULL DEFAULT 0, iUserrating INTEGER NOT NULL DEFAULT 0,"
+    " lastScraped VARCHAR(20) DEFAULT NULL, bScrapedMBID INTEGER NOT NULL DEFAULT 0,"
+    " strReleaseType TEXT, iDiscTotal INTEGER NOT NULL DEFAULT 0,"
+    " idInfoSetting INTEGER NOT NULL DEFAULT 0, dateAdded TEXT, dateNew TEXT,"
+    " dateModified TEXT, iAlbumDuration INTEGER NOT NULL DEFAULT 0)",
+    "CREATE TABLE album_artist (idArtist INTEGER, idAlbum INTEGER, iOrder INTEGER,"
+    " strArtist TEXT)",
+    "CREATE TABLE album_source (idSource INTEGER, idAlbum INTEGER)",
+    "CREATE TABLE genre (idGenre INTEGER PRIMARY KEY, strGenre VARCHAR(256))",
+    "CREATE TABLE path (idPath INTEGER PRIMARY KEY, strPath VARCHAR(512),"
+    " strHash TEXT)",
+    "CREATE TABLE song (idSong INTEGER PRIMARY KEY, idAlbum INTEGER,"
+    " idPath INTEGER, strArtistDisp TEXT, strArtistSort TEXT, strGenres TEXT,"
+    " strTitle VARCHAR(512), iTrack INTEGER, iDuration INTEGER,"
+    " strReleaseDate TEXT, strOrigReleaseDate TEXT, strDiscSubtitle TEXT,"
+    " strFileName TEXT, strMusicBrainzTrackID TEXT, iTimesPlayed INTEGER,"
+    " iStartOffset INTEGER, iEndOffset INTEGER, lastplayed VARCHAR(20) DEFAULT NULL,"
+    " rating FLOAT NOT NULL DEFAULT 0, votes INTEGER NOT NULL DEFAULT 0,"
+    " userrating INTEGER NOT NULL DEFAULT 0, comment TEXT, mood TEXT,"
+    " iBPM INTEGER NOT NULL DEFAULT 0, iBitRate INTEGER NOT NULL DEFAULT 0,"
+    " iSampleRate INTEGER NOT NULL DEFAULT 0, iChannels INTEGER NOT NULL DEFAULT 0,"
+    " strVideoURL TEXT, strReplayGain TEXT, dateAdded TEXT, dateNew TEXT,"
+    " dateModified TEXT)",
+    "CREATE TABLE song_artist (idArtist INTEGER, idSong INTEGER, idRole INTEGER,"
+    " iOrder INTEGER, strArtist TEXT)",
+    "CREATE TABLE song_genre (idGenre INTEGER, idSong INTEGER, iOrder INTEGER)",
+    "CREATE TABLE role (idRole INTEGER PRIMARY KEY, strRole TEXT)",
+    "CREATE TABLE infosetting (idSetting INTEGER PRIMARY KEY, strScraperPath TEXT,"
+    " strSettings TEXT)",
+    "CREATE TABLE discography (idArtist INTEGER, strAlbum TEXT, strYear TEXT,"
+    " strReleaseGroupMBID TEXT)",
+    "CREATE TABLE art (art_id INTEGER PRIMARY KEY, media_id INTEGER,"
+    " media_type TEXT, type TEXT, url TEXT)",
+    "CREATE TABLE versiontagscan (idVersion INTEGER, iNeedsScan INTEGER,"
+    " lastscanned VARCHAR(20), artistlinksupdated VARCHAR(20),"
+    " genresupdated VARCHAR(20))",
+    "CREATE TABLE removed_link (idArtist INTEGER, idMedia INTEGER, idRole INTEGER)",
+    # Indexes
+    "CREATE INDEX idxAlbum ON album (strAlbum)",
+    "CREATE INDEX idxAlbum_1 ON album (bCompilation)",
+    "CREATE UNIQUE INDEX idxAlbum_2 ON album (strMusicBrainzAlbumID)",
+    "CREATE INDEX idxAlbum_3 ON album (idInfoSetting)",
+    "CREATE UNIQUE INDEX idxAlbumArtist_1 ON album_artist (idAlbum, idArtist)",
+    "CREATE UNIQUE INDEX idxAlbumArtist_2 ON album_artist (idArtist, idAlbum)",
+    "CREATE INDEX idxGenre ON genre (strGenre)",
+    "CREATE INDEX idxArtist ON artist (strArtist)",
+    "CREATE UNIQUE INDEX idxArtist1 ON artist (strMusicBrainzArtistID)",
+    "CREATE INDEX idxArtist2 ON artist (idInfoSetting)",
+    "CREATE INDEX idxPath ON path (strPath)",
+    "CREATE INDEX idxDiscography_1 ON discography (idArtist)",
+    "CREATE INDEX idxSong ON song (strTitle)",
+    "CREATE INDEX idxSong1 ON song (iTimesPlayed)",
+    "CREATE INDEX idxSong2 ON song (lastplayed)",
+    "CREATE INDEX idxSong3 ON song (idAlbum)",
+    "CREATE INDEX idxSong6 ON song (idPath, strFileName)",
+    "CREATE UNIQUE INDEX idxSong7 ON song (idAlbum, strMusicBrainzTrackID)",
+    "CREATE UNIQUE INDEX idxSongArtist_1 ON song_artist (idSong, idArtist, idRole)",
+    "CREATE INDEX idxSongArtist_2 ON song_artist (idSong, idRole)",
+    "CREATE INDEX idxSongArtist_3 ON song_artist (idArtist, idRole)",
+    "CREATE INDEX idxSongArtist_4 ON song_artist (idRole)",
+    "CREATE UNIQUE INDEX idxSongGenre_1 ON song_genre (idSong, idGenre)",
+    "CREATE UNIQUE INDEX idxSongGenre_2 ON song_genre (idGenre, idSong)",
+    "CREATE UNIQUE INDEX idxRole ON role (strRole)",
+    "CREATE INDEX ix_art ON art (media_id, media_type, type)",
+    # Rows Kodi inserts with a new database
+    "INSERT INTO role (idRole, strRole) VALUES (1, 'Artist')",
+    "INSERT INTO artist (idArtist, strArtist, strSortName, strMusicBrainzArtistID)"
+    " VALUES (1, '[Missing Tag]', '[Missing Tag]', 'Artist Tag Missing')",
+]
+
+#################################################################################################
+
+
+def video(kodi=21):
+    """Statements creating the video database of a Kodi major version."""
+    statements = list(VIDEO)
+
+    if kodi >= 20:
+        statements += VIDEO_20
+
+    if kodi >= 21:
+        statements += VIDEO_21
+
+    return statements
+
+
+def create(path, statements, version):
+    """Create the database at path, returns the path."""
+    conn = sqlite3.connect(path)
+
+    with conn:
+        for statement in statements:
+            conn.execute(statement)
+
+        conn.execute("INSERT INTO version VALUES (?, 0)", (version,))
+
+    conn.close()
+
+    return path
+
+
+def create_video(path, kodi=21):
+    return create(path, video(kodi), KODI[kodi][0])
+
+
+def create_music(path, kodi=21):
+    version = KODI[kodi][1]
+    scan = "INSERT INTO versiontagscan (idVersion, iNeedsScan) VALUES (%s, 0)" % version
+
+    return create(path, MUSIC + [scan], version)
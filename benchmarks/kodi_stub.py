@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Just enough of a Kodi runtime for the add-on to sync outside of Kodi.
+
+Kodistubs only provides the signatures, install() gives them behaviour: special://
+paths map to a profile folder, window properties and add-on settings live in
+dicts, dialogs answer no and Kodi never aborts. It has to run before the add-on
+is imported, some modules resolve paths and settings at import time.
+"""
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import os
+import sys
+
+import xbmc
+import xbmcaddon
+import xbmcgui
+import xbmcvfs
+
+#################################################################################################
+
+PROPERTIES = {}
+INFO = {}
+SETTINGS = {
+    "useDirectPaths": "0",
+    "dbSyncScreensaver": "true",
+    "syncIndicator": "999999",
+    "enableMusic": "true",
+}
+SPECIAL = {
+    "special://profile/": "",
+    "special://database/": "Database",
+    "special://home/": "home",
+    "special://temp/": "temp",
+    "special://thumbnails/": "Thumbnails",
+}
+
+#################################################################################################
+
+
+def install(profile, settings=None, version="21.0", log_level=xbmc.LOGWARNING):
+    """Patch Kodistubs to run against the folder profile."""
+
+    def translate_path(path):
+        for special, folder in SPECIAL.items():
+            if path.startswith(special):
+                return os.path.join(profile, folder, path[len(special) :])
+
+        return path
+
+    def listdir(path):
+        path = translate_path(path)
+        names = sorted(os.listdir(path))
+        dirs = [x for x in names if os.path.isdir(os.path.join(path, x))]
+
+        return dirs, [x for x in names if x not in dirs]
+
+    def mkdirs(path):
+        os.makedirs(translate_path(path), exist_ok=True)
+        return True
+
+    def delete(path):
+        path = translate_path(path)
+
+        if os.path.exists(path):
+            os.remove(path)
+
+        return True
+
+    def log(msg, level=xbmc.LOGDEBUG):
+        if level >= log_level:
+            print(msg, file=sys.stderr)
+
+    for folder in SPECIAL.values():
+        os.makedirs(os.path.join(profile, folder), exist_ok=True)
+
+    SETTINGS.update(settings or {})
+    build_version(version)
+
+    xbmc.log = log
+    xbmc.getInfoLabel = lambda label: INFO.get(label, "")
+    xbmc.getCondVisibility = lambda condition: False
+    xbmc.executebuiltin = lambda function, wait=False: None
+    xbmc.executeJSONRPC = lambda request: '{"result": {}}'
+    xbmc.sleep = lambda time: None
+    xbmc.Monitor.waitForAbort = lambda self, timeout=-1: False
+    xbmc.Monitor.abortRequested = lambda self: False
+    xbmc.Player.isPlaying = lambda self: False
+    xbmc.Player.isPlayingVideo = lambda self: False
+
+    xbmcvfs.translatePath = translate_path
+    xbmcvfs.exists = lambda path: os.path.exists(translate_path(path))
+    xbmcvfs.listdir = listdir
+    xbmcvfs.mkdir = mkdirs
+    xbmcvfs.mkdirs = mkdirs
+    xbmcvfs.delete = delete
+
+    xbmcgui.Window.getProperty = lambda self, key: PROPERTIES.get(key, "")
+    xbmcgui.Window.setProperty = lambda self, key, value: PROPERTIES.__setitem__(
+        key, value
+    )
+    xbmcgui.Window.clearProperty = lambda self, key: PROPERTIES.pop(key, None)
+    xbmcgui.Dialog.yesno = lambda self, *args, **kwargs: False
+    xbmcgui.Dialog.ok = lambda self, *args, **kwargs: True
+    xbmcgui.Dialog.select = lambda self, *args, **kwargs: -1
+    xbmcgui.Dialog.multiselect = lambda self, *args, **kwargs: None
+
+    xbmcaddon.Addon.getSetting = lambda self, key: SETTINGS.get(key, "")
+    xbmcaddon.Addon.setSetting = lambda self, key, value: SETTINGS.__setitem__(
+        key, value
+    )
+
+    # The library service refuses to work unless the server is online
+    PROPERTIES["jellyfin_online"] = "true"
+
+
+def build_version(version):
+    """The Kodi version the add-on sees, e.g. "19.5"."""
+    INFO["System.BuildVersion"] = "%s (%s.0) Git:benchmark" % (version, version)
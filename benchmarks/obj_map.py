@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""Objects.map with compiled plans against the original per-item interpreter.
+
+python -m benchmarks.obj_map --items 20000
+"""
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import argparse
+import json
+import time
+
+from jellyfin_kodi.objects.obj import Objects
+
+#################################################################################################
+
+
+def sample_item(index=0):
+    """An episode shaped like an Items response with Fields populated."""
+    return {
+        "Id": "episode%08d" % index,
+        "Name": "Episode %s" % index,
+        "Type": "Episode",
+        "SeriesName": "Some show",
+        "SeriesId": "series%05d" % (index // 100),
+        "SeasonId": "season%06d" % (index // 10),
+        "ParentIndexNumber": 1 + index // 10 % 10,
+        "IndexNumber": 1 + index % 10,
+        "Overview": "Something happens.",
+        "Path": "/media/show/episode%08d.mkv" % index,
+        "PremiereDate": "2020-01-01T00:00:00.0000000Z",
+        "DateCreated": "2021-01-01T00:00:00.0000000Z",
+        "RunTimeTicks": 27000000000,
+        "CommunityRating": 7.5,
+        "Genres": ["Drama", "Comedy"],
+        "Studios": [{"Name": "ACME", "Id": "1"}],
+        "Tags": [],
+        "ProviderIds": {"Tvdb": str(index), "Imdb": "tt%07d" % index},
+        "ImageTags": {"Primary": "abc"},
+        "BackdropImageTags": [],
+        "ParentBackdropImageTags": ["def"],
+        "ParentBackdropItemId": "series%05d" % (index // 100),
+        "People": [
+            {"Name": "Actor %s" % x, "Type": "Actor", "Role": "Role %s" % x}
+            for x in range(8)
+        ]
+        + [
+            {"Name": "Director", "Type": "Director"},
+            {"Name": "Writer", "Type": "Writer"},
+        ],
+        "MediaSources": [
+            {
+                "Id": "source",
+                "Path": "/media/show/episode%08d.mkv" % index,
+                "MediaStreams": [
+                    {"Type": "Video", "Codec": "h264", "Height": 1080, "Width": 1920},
+                    {"Type": "Audio", "Codec": "aac", "Channels": 2, "Language": "eng"},
+                    {"Type": "Subtitle", "Codec": "srt", "Language": "eng"},
+                    {"Type": "Subtitle", "Codec": "srt", "Language": "fre"},
+                ],
+            }
+        ],
+        "UserData": {
+            "PlayCount": index % 3,
+            "IsFavorite": False,
+            "Played": bool(index % 3),
+            "PlaybackPositionTicks": 0,
+        },
+    }
+
+
+class LegacyObjects(Objects):
+    """The interpreter Objects.map used before mapping plans were compiled."""
+
+    def map(self, item, mapping_name):
+        """Syntax to traverse the item dictionary.
+        This of the query almost as a url.
+
+        Item is the Jellyfin item json object structure
+
+        ",": each element will be used as a fallback until a value is found.
+        "?": split filters and key name from the query part, i.e. MediaSources/0?$Name
+        "$": lead the key name with $. Only one key value can be requested per element.
+        ":": indicates it's a list of elements [], i.e. MediaSources/0/MediaStreams:?$Name
+            MediaStreams is a list.
+        "/": indicates where to go directly
+        """
+        self.mapped_item = {}
+
+        if not mapping_name:
+            raise Exception("execute mapping() first")
+
+        mapping = self.objects[mapping_name]
+
+        for key, value in mapping.items():
+
+            self.mapped_item[key] = None
+            params = value.split(",")
+
+            for param in params:
+
+                obj = item
+                obj_param = param
+                obj_key = ""
+                obj_filters = {}
+
+                if "?" in obj_param:
+
+                    if "$" in obj_param:
+                        obj_param, obj_key = obj_param.rsplit("$", 1)
+
+                    obj_param, filters = obj_param.rsplit("?", 1)
+
+                    if filters:
+                        for filter in filters.split("&"):
+                            filter_key, filter_value = filter.split("=")
+                            obj_filters[filter_key] = filter_value
+
+                if ":" in obj_param:
+                    result = []
+
+                    for d in self.__recursiveloop__(obj, obj_param):
+
+                        if not obj_filters or self.__filters__(d, obj_filters):
+                            result.append(d)
+
+                    obj = result
+                    obj_filters = {}
+
+                elif "/" in obj_param:
+                    obj = self.__recursive__(obj, obj_param)
+
+                elif obj is item and obj is not None:
+                    obj = item.get(obj_param)
+
+                if obj_filters and obj and not self.__filters__(obj, obj_filters):
+                    obj = None
+
+                if obj is None and len(params) != params.index(param):
+                    continue
+
+                if obj_key:
+                    obj = (
+                        [d[obj_key] for d in obj if d.get(obj_key)]
+                        if isinstance(obj, list)
+                        else obj.get(obj_key)
+                    )
+
+                self.mapped_item[key] = obj
+                break
+
+        if (
+            not mapping_name.startswith("Browse")
+            and not mapping_name.startswith("Artwork")
+            and not mapping_name.startswith("UpNext")
+        ):
+
+            self.mapped_item["ProviderName"] = self.objects.get(
+                "%sProviderName" % mapping_name
+            )
+            self.mapped_item["Checksum"] = json.dumps(item["UserData"])
+
+        return self.mapped_item
+
+    def __recursiveloop__(self, obj, keys):
+
+        first, rest = keys.split(":", 1)
+        obj = self.__recursive__(obj, first)
+
+        if obj:
+            for item in obj:
+                if rest:
+                    self.__recursiveloop__(item, rest)
+                else:
+                    yield item
+
+    def __recursive__(self, obj, keys):
+
+        for string in keys.split("/"):
+
+            if not obj:
+                return
+
+            obj = obj[int(string)] if string.isdigit() else obj.get(string)
+
+        return obj
+
+    def __filters__(self, obj, filters):
+
+        result = False
+
+        for key, value in filters.items():
+
+            inverse = False
+
+            if value.startswith("!"):
+
+                inverse = True
+                value = value.split("!", 1)[1]
+
+            if value.lower() == "null":
+                value = None
+
+            result = obj.get(key) != value if inverse else obj.get(key) == value
+
+        return result
+
+
+def run(objects, items, names):
+    start = time.perf_counter()
+
+    for item in items:
+        for name in names:
+            objects.map(item, name)
+
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=20000)
+    args = parser.parse_args()
+
+    objects = Objects()
+    objects.mapping()
+    items = [sample_item(x) for x in range(args.items)]
+    names = ("Episode", "Artwork")
+
+    for item in items[:100]:
+        for name in names:
+            expected = dict(LegacyObjects().map(item, name), Checksum=None)
+            assert dict(objects.map(item, name), Checksum=None) == expected
+
+    legacy = run(LegacyObjects(), items, names)
+    compiled = run(objects, items, names)
+
+    print("%s items, mappings %s" % (args.items, ", ".join(names)))
+    print("interpreter %8.1f us/item" % (legacy / args.items * 1e6))
+    print("compiled    %8.1f us/item" % (compiled / args.items * 1e6))
+    print("speedup     %8.1fx" % (legacy / compiled))
+
+
+if __name__ == "__main__":
+    main()
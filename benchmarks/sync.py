@@ -0,0 +1,371 @@
+# -*- coding: utf-8 -*-
+"""Full sync and incremental sync of a synthetic library against a local fake
+server and empty Kodi databases, reporting throughput and peak memory.
+
+python -m benchmarks.sync --movies 5000 --series 200 --artists 200 --changes 2000
+"""
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+import requests
+
+from . import fake_server, kodi_schema, kodi_stub
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+#################################################################################################
+
+VIDEO_TABLES = ["movie", "tvshow", "seasons", "episode"]
+MUSIC_TABLES = ["artist", "album", "song"]
+
+# SyntheticLibrary arguments, shared with the fake server
+ARGS = {}
+
+#################################################################################################
+
+
+def peak_rss():
+    """Peak resident memory of this process in MB, None where unknown."""
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return peak / (1024.0 * 1024 if sys.platform == "darwin" else 1024.0)
+
+
+def row_counts(profile):
+    counts = {}
+    database = os.path.join(profile, "Database")
+
+    for name, tables in (
+        ("MyVideos%s.db" % kodi_schema.VIDEO_VERSION, VIDEO_TABLES),
+        ("MyMusic%s.db" % kodi_schema.MUSIC_VERSION, MUSIC_TABLES),
+    ):
+        conn = sqlite3.connect(os.path.join(database, name))
+
+        for table in tables:
+            counts[table] = conn.execute("SELECT COUNT(*) FROM %s" % table).fetchone()[
+                0
+            ]
+
+        conn.close()
+
+    return counts
+
+
+class Monitor(object):
+    """What Library needs of the service monitor."""
+
+    def __init__(self):
+        import xbmc
+
+        self.monitor = self
+        self.player = xbmc.Player()
+
+    def waitForAbort(self, timeout=None):
+        return False
+
+
+def connect(url):
+    from jellyfin_kodi.database import save_credentials
+    from jellyfin_kodi.jellyfin import Jellyfin
+
+    # What a successful sign in leaves behind
+    credentials = {
+        "Servers": [
+            {
+                "Id": "benchmark-server",
+                "Name": "benchmark",
+                "address": url,
+                "UserId": "benchmark-user",
+                "AccessToken": "benchmark-token",
+            }
+        ]
+    }
+    save_credentials(credentials)
+
+    Jellyfin().construct()
+    client = Jellyfin().get_client()
+    client.config.app("Jellyfin for Kodi", "benchmark", "benchmark", "benchmark")
+    client.config.auth(url, "benchmark-user", "benchmark-token")
+    client.set_credentials(credentials)
+    client.auth.server_id = "benchmark-server"
+    client.logged_in = True
+    client.start(websocket=False)
+
+    return client
+
+
+def full_sync(library, client):
+    from jellyfin_kodi.full_sync import FullSync
+    from jellyfin_kodi.views import Views
+
+    # The service saves the libraries before it syncs
+    Views().get_views()
+    views = client.jellyfin.get_views()["Items"]
+
+    with FullSync(library, client) as sync:
+        sync.libraries(",".join(view["Id"] for view in views))
+
+
+def drain(library, timeout):
+    """Run the library service until every queue and worker is done, sleeping
+    in between the way the library thread does.
+    """
+    deadline = time.time() + timeout
+
+    while time.time() < deadline:
+        library.service()
+
+        if not len(library.changes) and library.pool.idle():
+            return True
+
+        library.wait()
+
+    return False
+
+
+def touch(url, changes):
+    """Mark items as changed on the fake server, returns their ids."""
+    item_ids = fake_server.SyntheticLibrary(**ARGS).changes(changes)
+    requests.post(url + "/Benchmark/Touch", data=json.dumps(item_ids))
+
+    return item_ids
+
+
+def fast_sync(library, url, changes):
+    item_ids = touch(url, changes)
+    library.fast_sync()
+
+    if not drain(library, timeout=600):
+        raise RuntimeError("Library service did not finish")
+
+    return len(item_ids)
+
+
+def events(library, url, changes, events):
+    """The changes as the websocket brings them during a rescan: every item is
+    in several overlapping LibraryChanged and UserDataChanged events.
+    """
+    item_ids = touch(url, changes)
+
+    for event in range(events):
+        overlap = item_ids[event % 2 :: 2] + item_ids[: len(item_ids) // events]
+        library.updated(overlap)
+        library.userdata([{"ItemId": x} for x in overlap[::3]])
+
+    if not drain(library, timeout=600):
+        raise RuntimeError("Library service did not finish")
+
+    return len(item_ids)
+
+
+def play_count(item_id):
+    from jellyfin_kodi.database import Database, jellyfin_db
+
+    with Database("jellyfin") as jellyfindb:
+        item = jellyfin_db.JellyfinDatabase(jellyfindb.cursor).get_item_by_id(item_id)
+
+    with Database("video") as videodb:
+        videodb.cursor.execute(
+            "SELECT playCount FROM files WHERE idFile = ?", (item[1],)
+        )
+
+        return videodb.cursor.fetchone()[0]
+
+
+def playstate(library, url, changes):
+    """A movie is watched on another client while an update of changes items
+    is written, returns the seconds until its play count is in Kodi.
+    """
+    from jellyfin_kodi.changes import UPDATED
+    from jellyfin_kodi.helper.pool import BUSY
+
+    library.updated(touch(url, changes))
+
+    while not any(
+        worker.state == BUSY
+        for worker in library.pool.workers
+        if getattr(worker, "lane", None) == UPDATED
+    ):
+        library.service()
+        time.sleep(0.02)
+
+    synthetic = fake_server.SyntheticLibrary(**ARGS)
+    watched = synthetic.by_index("Movie", synthetic.total("Movie") - 1)["Id"]
+    played = play_count(watched)
+    requests.post(url + "/Benchmark/Touch", data=json.dumps([watched]))
+    started = time.time()
+    library.userdata([{"ItemId": watched}])
+
+    while play_count(watched) == played and time.time() - started < 600:
+        library.service()
+        time.sleep(0.02)
+
+    latency = time.time() - started
+
+    if not drain(library, timeout=600):
+        raise RuntimeError("Library service did not finish")
+
+    return latency
+
+
+def stage(name, items, run):
+    started = time.time()
+    result = run()
+    elapsed = time.time() - started
+    items = items if result is None else result
+
+    print(
+        "%-12s %8d items %8.2fs %10.1f items/s   peak RSS %s MB"
+        % (
+            name,
+            items,
+            elapsed,
+            items / elapsed if elapsed else 0,
+            "%.1f" % peak_rss() if resource else "?",
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--movies", type=int, default=1000)
+    parser.add_argument("--series", type=int, default=50)
+    parser.add_argument("--seasons", type=int, default=3)
+    parser.add_argument("--episodes", type=int, default=10)
+    parser.add_argument("--artists", type=int, default=50)
+    parser.add_argument("--albums", type=int, default=3)
+    parser.add_argument("--songs", type=int, default=10)
+    parser.add_argument(
+        "--changes", type=int, default=500, help="items changed before the fast sync"
+    )
+    parser.add_argument(
+        "--events",
+        type=int,
+        default=4,
+        help="websocket events carrying each change, 0 to skip that stage",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0, help="seconds added to every response"
+    )
+    parser.add_argument("--limit", type=int, default=50, help="page size setting")
+    parser.add_argument("--threads", type=int, default=3, help="paging threads")
+    parser.add_argument(
+        "--metrics", action="store_true", help="print the per stage sync timings"
+    )
+    parser.add_argument("--keep", action="store_true", help="keep the profile folder")
+    args = parser.parse_args()
+
+    ARGS.update(
+        movies=args.movies,
+        series=args.series,
+        seasons=args.seasons,
+        episodes=args.episodes,
+        artists=args.artists,
+        albums=args.albums,
+        songs=args.songs,
+    )
+    profile = tempfile.mkdtemp(prefix="jellyfin-benchmark-")
+    kodi_stub.install(
+        profile,
+        {
+            "limitIndex": str(args.limit),
+            "limitThreads": str(args.threads),
+            "syncMetrics": "true" if args.metrics else "false",
+        },
+    )
+    database = os.path.join(profile, "Database")
+    kodi_schema.create_video(
+        os.path.join(database, "MyVideos%s.db" % kodi_schema.VIDEO_VERSION)
+    )
+    kodi_schema.create_music(
+        os.path.join(database, "MyMusic%s.db" % kodi_schema.MUSIC_VERSION)
+    )
+
+    server, url = fake_server.start(args.latency, **ARGS)
+    library = None
+
+    try:
+        # The add-on reads settings and paths when imported
+        from jellyfin_kodi.helper.metrics import metrics, report
+        from jellyfin_kodi.library import Library
+
+        client = connect(url)
+        library = Library(Monitor())
+        total = sum(
+            fake_server.SyntheticLibrary(**ARGS).total(x)
+            for x in (
+                "Movie",
+                "Series",
+                "Episode",
+                "MusicArtist",
+                "MusicAlbum",
+                "Audio",
+            )
+        )
+
+        print("profile: %s" % profile)
+        print("baseline peak RSS %.1f MB" % peak_rss() if resource else "")
+
+        stage("full sync", total, lambda: full_sync(library, client))
+
+        if args.metrics:
+            print(report(json.loads(kodi_stub.PROPERTIES["jellyfin_sync_metrics"])))
+            metrics.start()
+
+        stage(
+            "fast sync",
+            args.changes,
+            lambda: fast_sync(library, url, args.changes),
+        )
+
+        if args.metrics:
+            print(report(metrics.stop()))
+
+        if args.events:
+            requested = requests.get(url + "/Benchmark/Stats").json()["Requests"]
+            stage(
+                "events",
+                args.changes,
+                lambda: events(library, url, args.changes, args.events),
+            )
+            items = requests.get(url + "/Benchmark/Stats").json()["Requests"]
+            print(
+                "%s item requests for %s events"
+                % (items["items"] - requested["items"], args.events)
+            )
+
+        latency = playstate(library, url, args.changes)
+        print(
+            "playstate written %.2fs after the event, during an update of %s items"
+            % (latency, args.changes)
+        )
+
+        print("rows: %s" % row_counts(profile))
+        print("server: %s" % requests.get(url + "/Benchmark/Stats").json())
+    finally:
+        if library is not None:
+            library.pool.stop()
+
+        server.terminate()
+
+        if not args.keep:
+            shutil.rmtree(profile, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,416 @@
+# -*- coding: utf-8 -*-
+"""Synthetic Jellyfin library, items are built from their id on request so a
+library of any size costs no memory until it is served.
+"""
+
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import re
+
+#################################################################################################
+
+TICKS = 10000000
+GENRES = ["Drama", "Comedy", "Action", "Thriller", "Documentary", "Animation"]
+STUDIOS = ["ACME", "Globex", "Initech", "Umbrella"]
+VIEWS = {
+    "movies": ("view-movies", "Movies"),
+    "tvshows": ("view-tvshows", "TV Shows"),
+    "music": ("view-music", "Music"),
+}
+ID = re.compile(r"^(movie|series|season|episode|artist|album|song)-([\d-]+)$")
+
+#################################################################################################
+
+
+def people(index, actors):
+    return [
+        {
+            "Name": "Actor %s" % ((index + x) % 5000),
+            "Id": "person-%s" % ((index + x) % 5000),
+            "Type": "Actor",
+            "Role": "Role %s" % x,
+            "PrimaryImageTag": "p%s" % x,
+        }
+        for x in range(actors)
+    ] + [
+        {"Name": "Director %s" % (index % 300), "Type": "Director"},
+        {"Name": "Writer %s" % (index % 700), "Type": "Writer"},
+    ]
+
+
+def media_sources(path, container="mkv"):
+    return [
+        {
+            "Id": "source",
+            "Path": path,
+            "Container": container,
+            "MediaStreams": [
+                {
+                    "Type": "Video",
+                    "Codec": "h264",
+                    "Height": 1080,
+                    "Width": 1920,
+                    "AspectRatio": "16:9",
+                },
+                {"Type": "Audio", "Codec": "aac", "Channels": 6, "Language": "eng"},
+                {"Type": "Subtitle", "Codec": "srt", "Language": "eng"},
+                {"Type": "Subtitle", "Codec": "srt", "Language": "fre"},
+            ],
+        }
+    ]
+
+
+class SyntheticLibrary(object):
+    """Movies, series with seasons and episodes, artists with albums and songs.
+
+    touch() marks items as changed on the server, they come back with another
+    name and play count, the way an edit or a watched state would.
+    """
+
+    def __init__(
+        self,
+        movies=1000,
+        series=50,
+        seasons=3,
+        episodes=10,
+        artists=50,
+        albums=3,
+        songs=10,
+    ):
+        self.counts = {
+            "Movie": movies,
+            "Series": series,
+            "Episode": series * seasons * episodes,
+            "MusicArtist": artists,
+            "MusicAlbum": artists * albums,
+            "Audio": artists * albums * songs,
+        }
+        self.seasons = seasons
+        self.episodes = episodes
+        self.albums = albums
+        self.songs = songs
+        self.changed = {}
+
+    def views(self):
+        views = []
+
+        for collection, (view_id, name) in VIEWS.items():
+            if collection == "tvshows" and not self.counts["Series"]:
+                continue
+
+            if collection == "movies" and not self.counts["Movie"]:
+                continue
+
+            if collection == "music" and not self.counts["MusicArtist"]:
+                continue
+
+            views.append(
+                {
+                    "Id": view_id,
+                    "Name": name,
+                    "CollectionType": collection,
+                    "Type": "CollectionFolder",
+                }
+            )
+
+        return views
+
+    def view(self, view_id):
+        for view in self.views():
+            if view["Id"] == view_id:
+                return view
+
+    def total(self, item_type):
+        return self.counts.get(item_type, 0)
+
+    def page(self, item_type, start, limit):
+        """Items of a type in library order."""
+        stop = min(start + limit, self.total(item_type))
+
+        return [self.by_index(item_type, x) for x in range(start, stop)]
+
+    def by_index(self, item_type, index):
+        if item_type == "Movie":
+            return self.movie(index)
+
+        if item_type == "Series":
+            return self.series(index)
+
+        if item_type == "Episode":
+            show, rest = divmod(index, self.seasons * self.episodes)
+            return self.episode(show, *divmod(rest, self.episodes))
+
+        if item_type == "MusicArtist":
+            return self.artist(index)
+
+        if item_type == "MusicAlbum":
+            return self.album(*divmod(index, self.albums))
+
+        if item_type == "Audio":
+            artist, rest = divmod(index, self.albums * self.songs)
+            return self.song(artist, *divmod(rest, self.songs))
+
+    def get(self, item_id):
+        """Item by id, None when the id is not one of this library."""
+        match = ID.match(item_id)
+
+        if match is None:
+            return
+
+        kind, numbers = match.group(1), [int(x) for x in match.group(2).split("-")]
+
+        try:
+            return getattr(self, kind)(*numbers)
+        except TypeError:
+            return
+
+    def show_seasons(self, show):
+        return [self.season(show, x) for x in range(self.seasons)]
+
+    def show_episodes(self, show, season=None):
+        seasons = range(self.seasons) if season is None else [season]
+
+        return [self.episode(show, x, y) for x in seasons for y in range(self.episodes)]
+
+    def changes(self, limit):
+        """Ids of the first items of every type, up to limit in total."""
+        item_ids = []
+
+        for item_type in ("Movie", "Episode", "Audio"):
+            count = min(limit - len(item_ids), self.total(item_type))
+            item_ids.extend(self.by_index(item_type, x)["Id"] for x in range(count))
+
+        return item_ids
+
+    def touch(self, item_ids):
+        for item_id in item_ids:
+            self.changed[item_id] = self.changed.get(item_id, 0) + 1
+
+    def revision(self, item):
+        revision = self.changed.get(item["Id"], 0)
+
+        if revision:
+            item["Name"] = "%s (rev %s)" % (item["Name"], revision)
+            item["UserData"]["PlayCount"] += revision
+            item["UserData"]["Played"] = True
+            item["Etag"] = "%s-%s" % (item["Etag"], revision)
+
+        return item
+
+    def user_data(self, index):
+        return {
+            "PlayCount": index % 3,
+            "IsFavorite": index % 7 == 0,
+            "Played": bool(index % 3),
+            "PlaybackPositionTicks": 0,
+            "LastPlayedDate": "2024-01-01T00:00:00.0000000Z" if index % 3 else None,
+        }
+
+    def movie(self, index):
+        name = "Movie %s" % index
+        path = "/media/movies/%s (%s)/%s.mkv" % (name, 1950 + index % 70, name)
+
+        return self.revision(
+            {
+                "Id": "movie-%s" % index,
+                "Name": name,
+                "SortName": name.lower(),
+                "Type": "Movie",
+                "ParentId": VIEWS["movies"][0],
+                "Etag": "movie%s" % index,
+                "Path": path,
+                "Overview": "Something happens in movie %s." % index,
+                "Taglines": ["Tagline %s" % index],
+                "OfficialRating": "PG-13",
+                "ProductionYear": 1950 + index % 70,
+                "PremiereDate": "%s-05-01T00:00:00.0000000Z" % (1950 + index % 70),
+                "DateCreated": "2021-01-01T00:00:00.0000000Z",
+                "CommunityRating": 5 + index % 50 / 10.0,
+                "CriticRating": index % 100,
+                "VoteCount": index * 3,
+                "RunTimeTicks": (90 + index % 60) * 60 * TICKS,
+                "Genres": [GENRES[index % 6], GENRES[(index + 1) % 6]],
+                "Studios": [{"Name": STUDIOS[index % 4], "Id": str(index % 4)}],
+                "Tags": ["tag %s" % (index % 20)],
+                "ProductionLocations": ["Country %s" % (index % 30)],
+                "ProviderIds": {"Imdb": "tt%07d" % index, "Tmdb": str(index)},
+                "People": people(index, 10),
+                "LocalTrailerCount": 0,
+                "RemoteTrailers": [],
+                "ImageTags": {"Primary": "p%s" % index, "Logo": "l%s" % index},
+                "BackdropImageTags": ["b%s" % index, "c%s" % index],
+                "MediaSources": media_sources(path),
+                "UserData": self.user_data(index),
+            }
+        )
+
+    def series(self, show):
+        name = "Series %s" % show
+
+        return self.revision(
+            {
+                "Id": "series-%s" % show,
+                "Name": name,
+                "SortName": name.lower(),
+                "Type": "Series",
+                "ParentId": VIEWS["tvshows"][0],
+                "Etag": "series%s" % show,
+                "Path": "/media/tv/%s" % name,
+                "Overview": "Something happens in series %s." % show,
+                "OfficialRating": "TV-14",
+                "ProductionYear": 1990 + show % 30,
+                "PremiereDate": "%s-09-01T00:00:00.0000000Z" % (1990 + show % 30),
+                "DateCreated": "2021-01-01T00:00:00.0000000Z",
+                "CommunityRating": 7.5,
+                "VoteCount": show,
+                "Status": "Ended",
+                "RecursiveItemCount": self.seasons * self.episodes,
+                "Genres": [GENRES[show % 6]],
+                "Studios": [{"Name": STUDIOS[show % 4], "Id": str(show % 4)}],
+                "Tags": [],
+                "ProviderIds": {"Tvdb": str(show), "Imdb": "tt9%06d" % show},
+                "People": people(show, 6),
+                "LocalTrailerCount": 0,
+                "RemoteTrailers": [],
+                "ImageTags": {"Primary": "p%s" % show},
+                "BackdropImageTags": ["b%s" % show],
+                "UserData": self.user_data(show),
+            }
+        )
+
+    def season(self, show, season):
+        return {
+            "Id": "season-%s-%s" % (show, season),
+            "Name": "Season %s" % (season + 1),
+            "Type": "Season",
+            "IndexNumber": season + 1,
+            "SeriesId": "series-%s" % show,
+            "SeriesName": "Series %s" % show,
+            "ParentId": "series-%s" % show,
+            "LocationType": "FileSystem",
+            "ImageTags": {"Primary": "s%s" % season},
+            "BackdropImageTags": [],
+            "UserData": self.user_data(season),
+        }
+
+    def episode(self, show, season, episode):
+        index = (show * self.seasons + season) * self.episodes + episode
+        name = "Episode %s" % (episode + 1)
+        path = "/media/tv/Series %s/Season %s/S%02dE%02d.mkv" % (
+            show,
+            season + 1,
+            season + 1,
+            episode + 1,
+        )
+
+        return self.revision(
+            {
+                "Id": "episode-%s-%s-%s" % (show, season, episode),
+                "Name": name,
+                "Type": "Episode",
+                "SeriesName": "Series %s" % show,
+                "SeriesId": "series-%s" % show,
+                "SeasonId": "season-%s-%s" % (show, season),
+                "ParentId": "season-%s-%s" % (show, season),
+                "ParentIndexNumber": season + 1,
+                "IndexNumber": episode + 1,
+                "Etag": "episode%s" % index,
+                "Path": path,
+                "Overview": "Something happens in episode %s." % index,
+                "PremiereDate": "2020-01-01T00:00:00.0000000Z",
+                "DateCreated": "2021-01-01T00:00:00.0000000Z",
+                "CommunityRating": 7.5,
+                "RunTimeTicks": 45 * 60 * TICKS,
+                "ProviderIds": {"Tvdb": str(index)},
+                "People": people(index, 4),
+                "LocationType": "FileSystem",
+                "ImageTags": {"Primary": "p%s" % index},
+                "BackdropImageTags": [],
+                "ParentBackdropItemId": "series-%s" % show,
+                "ParentBackdropImageTags": ["b%s" % show],
+                "SeriesPrimaryImageTag": "p%s" % show,
+                "MediaSources": media_sources(path),
+                "UserData": self.user_data(index),
+            }
+        )
+
+    def artist(self, artist):
+        name = "Artist %s" % artist
+
+        return self.revision(
+            {
+                "Id": "artist-%s" % artist,
+                "Name": name,
+                "Type": "MusicArtist",
+                "ParentId": VIEWS["music"][0],
+                "Etag": "artist%s" % artist,
+                "Overview": "Biography of %s." % name,
+                "Genres": [GENRES[artist % 6]],
+                "ProviderIds": {"MusicBrainzArtist": "mb-artist-%s" % artist},
+                "DateCreated": "2021-01-01T00:00:00.0000000Z",
+                "ImageTags": {"Primary": "p%s" % artist},
+                "BackdropImageTags": [],
+                "UserData": self.user_data(artist),
+            }
+        )
+
+    def album(self, artist, album):
+        artists = [{"Name": "Artist %s" % artist, "Id": "artist-%s" % artist}]
+
+        return self.revision(
+            {
+                "Id": "album-%s-%s" % (artist, album),
+                "Name": "Album %s of artist %s" % (album, artist),
+                "Type": "MusicAlbum",
+                "ParentId": VIEWS["music"][0],
+                "Etag": "album%s-%s" % (artist, album),
+                "ProductionYear": 1970 + album,
+                "Overview": "Review of album %s." % album,
+                "Genres": [GENRES[artist % 6]],
+                "AlbumArtist": artists[0]["Name"],
+                "AlbumArtists": artists,
+                "ArtistItems": artists,
+                "RunTimeTicks": self.songs * 4 * 60 * TICKS,
+                "ProviderIds": {"MusicBrainzAlbum": "mb-album-%s-%s" % (artist, album)},
+                "DateCreated": "2021-01-01T00:00:00.0000000Z",
+                "ImageTags": {"Primary": "a%s" % album},
+                "BackdropImageTags": [],
+                "UserData": self.user_data(album),
+            }
+        )
+
+    def song(self, artist, album, song):
+        index = (artist * self.albums + album) * self.songs + song
+        artists = [{"Name": "Artist %s" % artist, "Id": "artist-%s" % artist}]
+        path = "/media/music/Artist %s/Album %s/%02d.flac" % (artist, album, song + 1)
+
+        return self.revision(
+            {
+                "Id": "song-%s-%s-%s" % (artist, album, song),
+                "Name": "Song %s" % (song + 1),
+                "Type": "Audio",
+                "ParentId": "album-%s-%s" % (artist, album),
+                "Etag": "song%s" % index,
+                "Path": path,
+                "Album": "Album %s of artist %s" % (album, artist),
+                "AlbumId": "album-%s-%s" % (artist, album),
+                "AlbumArtist": artists[0]["Name"],
+                "AlbumArtists": artists,
+                "ArtistItems": artists,
+                "Artists": [artists[0]["Name"]],
+                "IndexNumber": song + 1,
+                "ParentIndexNumber": 1,
+                "ProductionYear": 1970 + album,
+                "RunTimeTicks": 4 * 60 * TICKS,
+                "Genres": [GENRES[artist % 6]],
+                "ProviderIds": {
+                    "MusicBrainzTrackId": "mb-track-%s-%s-%s" % (artist, album, song)
+                },
+                "DateCreated": "2021-01-01T00:00:00.0000000Z",
+                "AlbumPrimaryImageTag": "a%s" % album,
+                "ImageTags": {},
+                "BackdropImageTags": [],
+                "MediaSources": [{"Id": "source", "Path": path, "Container": "flac"}],
+                "UserData": self.user_data(index),
+            }
+        )
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+##################################################################################################
+
+import threading
+import time
+from collections import OrderedDict
+
+from .helper import LazyLogger
+from .helper.utils import split_list
+
+##################################################################################################
+
+LOG = LazyLogger(__name__)
+# Seconds without a new event before a burst is handed on
+DELAY = 1.0
+# Seconds a burst may be held back in total, a steady trickle would hold it forever
+MAX_DELAY = 5.0
+# Seconds of quiet for a burst of userdata only, a playstate change on another client
+USERDATA_DELAY = 0.2
+
+UPDATED = "updated"
+USERDATA = "userdata"
+REMOVED = "removed"
+# Writer lanes, the most urgent first
+LANES = (USERDATA, REMOVED, UPDATED)
+
+##################################################################################################
+
+
+class PendingChanges(object):
+    """Library changes of the server waiting to be downloaded, one entry per item.
+
+    A rescan sends bursts of LibraryChanged and UserDataChanged events for the
+    same items. They are held until the burst is over and merged on the way:
+    an item is only downloaded once, a removal cancels the pending update, a
+    userdata change of an item pending a full update is part of that update and
+    a later update brings a removed item back.
+    """
+
+    def __init__(
+        self,
+        delay=DELAY,
+        max_delay=MAX_DELAY,
+        userdata_delay=USERDATA_DELAY,
+        clock=time.time,
+    ):
+
+        self.delay = delay
+        self.max_delay = max_delay
+        self.userdata_delay = userdata_delay
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.pending = OrderedDict()
+        self.first = None
+        self.last = None
+        self.events = 0
+
+    def __len__(self):
+        with self.lock:
+            return len(self.pending)
+
+    def updated(self, item_ids):
+        self.add(item_ids, UPDATED)
+
+    def userdata(self, item_ids):
+        self.add(item_ids, USERDATA)
+
+    def removed(self, item_ids):
+        self.add(item_ids, REMOVED)
+
+    def add(self, item_ids, change):
+        with self.lock:
+            for item_id in item_ids:
+                current = self.pending.get(item_id)
+
+                if change == USERDATA and current is not None:
+                    # Written along with the update, or gone with the removal
+                    continue
+
+                self.pending[item_id] = change
+
+            self.events += len(item_ids)
+            self.last = self.clock()
+
+            if self.first is None:
+                self.first = self.last
+
+    def due(self):
+        """Seconds until the pending changes are ready, None if there are none."""
+        with self.lock:
+            if not self.pending:
+                return None
+
+            delay = self.delay
+
+            if all(change == USERDATA for change in self.pending.values()):
+                delay = self.userdata_delay
+
+            ready = min(self.last + delay, self.first + self.max_delay)
+
+            return max(0, ready - self.clock())
+
+    def ready(self):
+        """Whether the burst is over or has been held back long enough."""
+        return self.due() == 0
+
+    def take(self, force=False):
+        """Hand on the pending changes once ready, returns the lists of updated,
+        userdata and removed item ids in the order they first arrived or None.
+        """
+        if not force and not self.ready():
+            return
+
+        with self.lock:
+            changes = {UPDATED: [], USERDATA: [], REMOVED: []}
+
+            for item_id, change in self.pending.items():
+                changes[change].append(item_id)
+
+            LOG.info(
+                "---[ coalesced %s events: updated:%s userdata:%s removed:%s ]",
+                self.events,
+                len(changes[UPDATED]),
+                len(changes[USERDATA]),
+                len(changes[REMOVED]),
+            )
+            self.pending.clear()
+            self.first = self.last = None
+            self.events = 0
+
+        return changes[UPDATED], changes[USERDATA], changes[REMOVED]
+
+
+def batches(item_ids, limit, workers):
+    """Split item ids into requests of at most limit ids. Few ids are spread
+    over the workers rather than sent as a single request.
+    """
+    if not item_ids:
+        return []
+
+    size = max(1, min(limit, -(-len(item_ids) // workers)))
+
+    return split_list(item_ids, size)
+
+
+class WriterLock(object):
+    """Lock of a Kodi database shared by the writers. It goes to the most urgent
+    lane waiting, so a playstate change only waits for the batch being written
+    rather than for the whole metadata update. Used as a plain lock, it takes
+    the place of a bulk update.
+    """
+
+    def __init__(self):
+
+        self.condition = threading.Condition()
+        self.owner = None
+        self.waiting = dict.fromkeys(LANES, 0)
+        self.writes = 0
+
+    def acquire(self, lane=UPDATED):
+        """Wait for the lock, returns how many times it was released so far."""
+        with self.condition:
+            self.waiting[lane] += 1
+
+            try:
+                while self.owner is not None or self.preempted(lane):
+                    self.condition.wait()
+            finally:
+                self.waiting[lane] -= 1
+
+            self.owner = lane
+
+            return self.writes
+
+    def release(self):
+        with self.condition:
+            self.owner = None
+            self.writes += 1
+            self.condition.notify_all()
+
+            return self.writes
+
+    def __enter__(self):
+        self.acquire()
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+    def preempted(self, lane):
+        """Whether a more urgent lane than lane waits for the lock."""
+        with self.condition:
+            return any(self.waiting[x] for x in LANES[: LANES.index(lane)])
+
+    def lane(self, lane):
+        return Lane(self, lane)
+
+
+class Lane(object):
+    """A writer's hold on a WriterLock, acquired and released like a plain lock.
+    changed tells whether another writer held the lock since the last release.
+    """
+
+    def __init__(self, lock, name):
+
+        self.lock = lock
+        self.name = name
+        self.writes = None
+        self.changed = False
+
+    def acquire(self):
+        writes = self.lock.acquire(self.name)
+        self.changed = self.writes is not None and writes != self.writes
+
+    def release(self):
+        self.writes = self.lock.release()
+
+    def preempted(self):
+        return self.lock.preempted(self.name)
@@ -12,6 +12,7 @@ from .database import get_credentials, save_credentials
 from .dialogs import ServerConnect, UsersConnect, LoginManual, ServerManual
 from .helper import settings, addon_id, event, api, window, LazyLogger, translate
 from .jellyfin import Jellyfin
+from .jellyfin.configuration import DEFAULT_HTTP_POOL_SIZE
 from .jellyfin.connection_manager import CONNECTION_STATE
 from .helper.exceptions import HTTPException
 
@@ -83,6 +84,10 @@ class Connect(object):
             "Jellyfin-Kodi/%s" % self.info["Version"]
         )
         client.config.data["auth.ssl"] = self.get_ssl()
+        # Paging threads and item download workers can run at the same time
+        client.config.data["http.pool_size"] = max(
+            DEFAULT_HTTP_POOL_SIZE, 2 * int(settings("limitThreads") or 3)
+        )
 
         return client
 
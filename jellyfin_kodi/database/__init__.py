@@ -14,10 +14,12 @@ import xbmc
 import xbmcvfs
 
 from . import jellyfin_db
+from . import queries as QU
 from ..helper import translate, settings, window, dialog
 from ..helper.utils import translate_path
 from ..objects import obj
 from ..helper import LazyLogger
+from ..helper.metrics import metrics, TimedCursor
 
 #################################################################################################
 
@@ -25,6 +27,54 @@ LOG = LazyLogger(__name__)
 
 ADDON_DATA = translate_path("special://profile/addon_data/plugin.video.jellyfin/")
 
+# Schema version of the jellyfin database, stored in the version table.
+# Bump it together with a new entry in SCHEMA_MIGRATIONS.
+JELLYFIN_DB_VERSION = 4
+# Secondary indexes for the lookups done while syncing. Without them every
+# parent, library, kodi id or checksum lookup is a full table scan.
+JELLYFIN_INDEXES = [
+    """CREATE INDEX IF NOT EXISTS ix_jellyfin_parent_id
+    ON jellyfin(parent_id, media_type)""",
+    """CREATE INDEX IF NOT EXISTS ix_jellyfin_media_folder
+    ON jellyfin(media_folder, jellyfin_id, jellyfin_type)""",
+    """CREATE INDEX IF NOT EXISTS ix_jellyfin_kodi_id
+    ON jellyfin(kodi_id, media_type)""",
+    """CREATE INDEX IF NOT EXISTS ix_jellyfin_type
+    ON jellyfin(jellyfin_type, jellyfin_id, checksum)""",
+    """CREATE INDEX IF NOT EXISTS ix_jellyfin_parent
+    ON jellyfin(jellyfin_parent_id)""",
+]
+SCHEMA_MIGRATIONS = {
+    2: JELLYFIN_INDEXES,
+    # Pages of a full sync already written, per library and item type, so an
+    # interrupted sync only fetches the missing ranges.
+    3: [
+        """CREATE TABLE IF NOT EXISTS sync_checkpoint(
+        library_id TEXT, item_type TEXT, start_index INTEGER, item_count INTEGER)""",
+        """CREATE INDEX IF NOT EXISTS ix_sync_checkpoint
+        ON sync_checkpoint(library_id, item_type)""",
+    ],
+    # The checksum used to be the UserData json and is now the md5 hex digest
+    # of the item (objects.obj.fingerprint). The column was declared INTEGER,
+    # whose affinity turns a digest such as "12e4..." into a number. SQLite
+    # can't change the type of a column, the table is rebuilt with a TEXT one.
+    4: [
+        "ALTER TABLE jellyfin RENAME TO jellyfin_old",
+        """CREATE TABLE jellyfin(
+        jellyfin_id TEXT UNIQUE, media_folder TEXT, jellyfin_type TEXT, media_type TEXT,
+        kodi_id INTEGER, kodi_fileid INTEGER, kodi_pathid INTEGER, parent_id INTEGER,
+        checksum TEXT, jellyfin_parent_id TEXT)""",
+        """INSERT INTO jellyfin(
+        jellyfin_id, media_folder, jellyfin_type, media_type, kodi_id, kodi_fileid,
+        kodi_pathid, parent_id, checksum, jellyfin_parent_id)
+        SELECT jellyfin_id, media_folder, jellyfin_type, media_type, kodi_id, kodi_fileid,
+        kodi_pathid, parent_id, CAST(checksum AS TEXT), jellyfin_parent_id
+        FROM jellyfin_old""",
+        "DROP TABLE jellyfin_old",
+    ]
+    + JELLYFIN_INDEXES,
+}
+
 #################################################################################################
 
 
@@ -52,6 +102,9 @@ class Database(object):
         self.conn = sqlite3.connect(self.path, timeout=self.timeout)
         self.cursor = self.conn.cursor()
 
+        if metrics.enabled:
+            self.cursor = TimedCursor(self.cursor, metrics)
+
         if self.db_file in ("video", "music", "texture", "jellyfin"):
             self.conn.execute(
                 "PRAGMA journal_mode=WAL"
@@ -173,7 +226,9 @@ class Database(object):
         if self.commit_close and changes:
 
             LOG.debug("[%s] %s rows updated.", self.db_file, changes)
-            self.conn.commit()
+
+            with metrics.timer("commit"):
+                self.conn.commit()
 
         LOG.debug("---<[ database: %s ] %s", self.db_file, id(self.conn))
         self.cursor.close()
@@ -187,7 +242,7 @@ def jellyfin_tables(cursor):
     cursor.execute("""CREATE TABLE IF NOT EXISTS jellyfin(
         jellyfin_id TEXT UNIQUE, media_folder TEXT, jellyfin_type TEXT, media_type TEXT,
         kodi_id INTEGER, kodi_fileid INTEGER, kodi_pathid INTEGER, parent_id INTEGER,
-        checksum INTEGER, jellyfin_parent_id TEXT)""")
+        checksum TEXT, jellyfin_parent_id TEXT)""")
     cursor.execute("""CREATE TABLE IF NOT EXISTS view(
         view_id TEXT UNIQUE, view_name TEXT, media_type TEXT)""")
     cursor.execute("CREATE TABLE IF NOT EXISTS version(idVersion TEXT)")
@@ -200,6 +255,35 @@ def jellyfin_tables(cursor):
         LOG.debug("Add missing column jellyfin_parent_id")
         cursor.execute("ALTER TABLE jellyfin ADD COLUMN jellyfin_parent_id 'TEXT'")
 
+    migrate_jellyfin_tables(cursor)
+
+
+def migrate_jellyfin_tables(cursor):
+    """Apply the schema migrations newer than the version stored in the database."""
+    cursor.execute(QU.get_version)
+    version = cursor.fetchone()
+
+    try:
+        current = int(version[0])
+    except (TypeError, ValueError):
+        # Databases created before the version table was in use
+        current = 1
+
+    if current >= JELLYFIN_DB_VERSION:
+        return
+
+    for target in sorted(SCHEMA_MIGRATIONS):
+        if target <= current:
+            continue
+
+        LOG.info("Migrating jellyfin database to version %s", target)
+
+        for statement in SCHEMA_MIGRATIONS[target]:
+            cursor.execute(statement)
+
+    cursor.execute(QU.delete_version)
+    cursor.execute(QU.add_version, (JELLYFIN_DB_VERSION,))
+
 
 def reset():
     """Reset both the jellyfin database and the kodi database."""
@@ -363,6 +447,23 @@ def save_sync(sync):
         outfile.write(data)
 
 
+def save_sync_metrics(summary):
+    """Export the timings of a sync next to sync.json, one file per sync."""
+    if not xbmcvfs.exists(ADDON_DATA):
+        xbmcvfs.mkdirs(ADDON_DATA)
+
+    started = datetime.datetime.utcfromtimestamp(summary["Started"])
+    path = os.path.join(
+        ADDON_DATA, "sync-metrics-%s.json" % started.strftime("%Y%m%dT%H%M%SZ")
+    )
+
+    with open(path, "wb") as outfile:
+        data = json.dumps(summary, sort_keys=True, indent=4, ensure_ascii=False)
+        outfile.write(data.encode("utf-8"))
+
+    return path
+
+
 def get_credentials():
     if (3, 0) <= sys.version_info < (3, 6):
         LOG.error("Python versions 3.0-3.5 are NOT supported.")
@@ -153,6 +153,24 @@ class JellyfinDatabase:
     def remove_media_by_parent_id(self, *args):
         self.cursor.execute(QU.delete_media_by_parent_id, args)
 
+    def get_checkpoints(self, *args):
+        self.cursor.execute(QU.get_checkpoints, args)
+
+        return self.cursor.fetchall()
+
+    def add_checkpoint(self, *args):
+        self.cursor.execute(QU.add_checkpoint, args)
+
+    def remove_checkpoints(self, library_id, item_type=None):
+
+        if item_type is None:
+            self.cursor.execute(QU.delete_checkpoints, (library_id,))
+        else:
+            self.cursor.execute(QU.delete_checkpoints_by_type, (library_id, item_type))
+
+    def remove_all_checkpoints(self):
+        self.cursor.execute(QU.delete_all_checkpoints)
+
     def get_version(self):
         self.cursor.execute(QU.get_version)
 
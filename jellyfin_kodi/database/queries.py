@@ -2,7 +2,7 @@ from __future__ import division, absolute_import, print_function, unicode_litera
 
 get_item = """
 SELECT      kodi_id, kodi_fileid, kodi_pathid, parent_id, media_type,
-            jellyfin_type, media_folder, jellyfin_parent_id
+            jellyfin_type, media_folder, jellyfin_parent_id, checksum
 FROM        jellyfin
 WHERE       jellyfin_id = ?
 """
@@ -84,6 +84,12 @@ SELECT      jellyfin_id
 FROM        jellyfin
 WHERE       media_type = ?
 """
+get_checkpoints = """
+SELECT      start_index, item_count
+FROM        sync_checkpoint
+WHERE       library_id = ?
+AND         item_type = ?
+"""
 get_version = """
 SELECT      idVersion
 FROM        version
@@ -218,6 +224,10 @@ add_view = """
 INSERT OR REPLACE INTO      view(view_id, view_name, media_type)
 VALUES                      (?, ?, ?)
 """
+add_checkpoint = """
+INSERT INTO     sync_checkpoint(library_id, item_type, start_index, item_count)
+VALUES          (?, ?, ?, ?)
+"""
 add_version = """
 INSERT OR REPLACE INTO      version(idVersion)
 VALUES                      (?)
@@ -273,6 +283,18 @@ delete_media_by_parent_id = """
 DELETE FROM     jellyfin
 WHERE           jellyfin_parent_id = ?
 """
+delete_checkpoints = """
+DELETE FROM     sync_checkpoint
+WHERE           library_id = ?
+"""
+delete_checkpoints_by_type = """
+DELETE FROM     sync_checkpoint
+WHERE           library_id = ?
+AND             item_type = ?
+"""
+delete_all_checkpoints = """
+DELETE FROM     sync_checkpoint
+"""
 delete_version = """
 DELETE FROM     version
 """
@@ -4,14 +4,15 @@ from __future__ import division, absolute_import, print_function, unicode_litera
 #################################################################################################
 
 import threading
+import time
 import concurrent.futures
 from datetime import date
 
 import queue
 
-import requests
-
 from .helper import settings, stop, window, LazyLogger
+from .helper.metrics import metrics
+from .helper.pool import PoolWorker
 from .jellyfin import Jellyfin
 from .jellyfin import api
 from .helper.exceptions import HTTPException
@@ -19,6 +20,16 @@ from .helper.exceptions import HTTPException
 #################################################################################################
 
 LOG = LazyLogger(__name__)
+# Items handed to the caller at once. Pages are decoded as they stream in and
+# split to this size, so memory no longer grows with limitIndex.
+BATCH_SIZE = 50
+# Bounds and latency thresholds (seconds per page) of the adaptive paging.
+MIN_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 500
+FAST_PAGE = 2.0
+SLOW_PAGE = 8.0
+# A range failing this many times in a row stops the sync
+MAX_PAGE_ATTEMPTS = 4
 
 #################################################################################################
 
@@ -46,6 +57,16 @@ def _get(handler, params=None, server_id=None):
     return _http("GET", get_jellyfinserver_url(handler), {"params": params}, server_id)
 
 
+def _get_stream(handler, params=None, server_id=None, **kwargs):
+    """Like _get for Items responses, the items are decoded while they arrive.
+    kwargs are passed on to the request, e.g. server_retry.
+    """
+    request = {"params": params, "stream_items": True}
+    request.update(kwargs)
+
+    return _http("GET", get_jellyfinserver_url(handler), request, server_id)
+
+
 def _post(handler, json=None, params=None, server_id=None):
     return _http(
         "POST",
@@ -66,15 +87,30 @@ def validate_view(library_id, item_id):
     Used to detect grouped libraries.
     """
     try:
-        result = _get(
-            "Users/{UserId}/Items",
-            {"ParentId": library_id, "Recursive": True, "Ids": item_id},
-        )
+        return item_id in get_ids_in_view(library_id, [item_id])
     except Exception as error:
         LOG.exception(error)
         return False
 
-    return bool(len(result["Items"]))
+
+def get_ids_in_view(library_id, item_ids):
+    """The ids of item_ids found under the view, 150 ids per request."""
+    found = set()
+
+    for index in range(0, len(item_ids), 150):
+        result = _get(
+            "Users/{UserId}/Items",
+            {
+                "ParentId": library_id,
+                "Recursive": True,
+                "Ids": ",".join(item_ids[index : index + 150]),
+                "EnableImages": False,
+                "EnableUserData": False,
+            },
+        )
+        found.update(item["Id"] for item in (result or {}).get("Items", []))
+
+    return found
 
 
 def get_single_item(parent_id, media):
@@ -144,7 +180,7 @@ def get_item_count(parent_id, item_type=None):
     return result.get("TotalRecordCount", 1)
 
 
-def get_items(parent_id, item_type=None, basic=False, params=None):
+def get_items(parent_id, item_type=None, basic=False, params=None, completed=None):
 
     query = {
         "url": "Users/{UserId}/Items",
@@ -165,7 +201,21 @@ def get_items(parent_id, item_type=None, basic=False, params=None):
     if params:
         query["params"].update(params)
 
-    for items in _get_items(query):
+    for items in _get_items(query, completed=completed):
+        yield items
+
+
+def get_date_modified(parent_id, date):
+    """Paged counterpart of API.get_date_modified, recursive over the library.
+    Only the ids are requested, the update workers download the items.
+    """
+    for items in get_items(parent_id, None, True, {"MinDateLastSaved": date}):
+        yield items
+
+
+def get_userdata_date_modified(parent_id, date):
+    """Paged counterpart of API.get_userdata_date_modified."""
+    for items in get_items(parent_id, None, True, {"MinDateLastSavedForUser": date}):
         yield items
 
 
@@ -192,17 +242,142 @@ def get_artists(parent_id=None):
         yield items
 
 
+def missing_ranges(start, total, completed):
+    """(begin, end) of the item ranges left between start and total, skipping
+    the (StartIndex, Limit) ranges in completed.
+    """
+    ranges = []
+    position = start
+
+    for done_start, done_count in sorted(completed or ()) + [(total, 0)]:
+        end = min(done_start, total)
+
+        if position < end:
+            ranges.append((position, end))
+
+        position = max(position, done_start + done_count)
+
+    return ranges
+
+
+def take_page(ranges, total, limit):
+    """Cut the next page out of the first range. Pages in front of a completed
+    range stop short of it, the last one keeps the full limit.
+    """
+    begin, end = ranges.pop(0)
+    count = limit if end == total else min(limit, end - begin)
+
+    if begin + count < end:
+        ranges.insert(0, (begin + count, end))
+
+    return begin, count
+
+
+def missing_pages(start, total, completed, limit):
+    """(StartIndex, Limit) of the pages left between start and total, skipping
+    the (StartIndex, Limit) ranges in completed.
+    """
+    ranges = missing_ranges(start, total, completed)
+    pages = []
+
+    while ranges:
+        pages.append(take_page(ranges, total, limit))
+
+    return pages
+
+
+class AdaptivePaging(object):
+    """AIMD control of the page size and of the requests in flight.
+
+    A page answered faster than FAST_PAGE grows the page size by a step and
+    every round of such pages adds a request in flight. A page slower than
+    SLOW_PAGE halves the page size, a server error (5xx, read timeout)
+    halves both. Disabled, it only keeps the statistics.
+    """
+
+    def __init__(self, limit, threads, max_limit, max_threads, enabled=True):
+
+        self.enabled = enabled
+        self.limit = limit
+        self.threads = threads
+        self.min_limit = min(MIN_PAGE_SIZE, limit)
+        self.max_limit = max(max_limit, limit)
+        self.max_threads = max(max_threads, threads)
+        self.step = max(limit // 2, 1)
+        self.lock = threading.Lock()
+        self.round = 0
+        self.requests = 0
+        self.errors = 0
+        self.items = 0
+        self.elapsed = 0.0
+
+    def success(self, elapsed, items):
+        with self.lock:
+            self.requests += 1
+            self.items += items
+            self.elapsed += elapsed
+
+            if not self.enabled:
+                return
+
+            if elapsed > SLOW_PAGE:
+                self.limit = max(self.limit // 2, self.min_limit)
+                self.round = 0
+
+            elif elapsed < FAST_PAGE:
+                self.limit = min(self.limit + self.step, self.max_limit)
+                self.round += 1
+
+                if self.round >= self.threads:
+                    self.threads = min(self.threads + 1, self.max_threads)
+                    self.round = 0
+
+    def failure(self):
+        with self.lock:
+            self.requests += 1
+            self.errors += 1
+
+            if not self.enabled:
+                return
+
+            self.limit = max(self.limit // 2, self.min_limit)
+            self.threads = max(self.threads // 2, 1)
+            self.round = 0
+
+    def __str__(self):
+        return "limit %s, threads %s, %s requests, %s errors, %.0f items/s" % (
+            self.limit,
+            self.threads,
+            self.requests,
+            self.errors,
+            self.items / self.elapsed if self.elapsed else 0,
+        )
+
+
+def is_server_error(error):
+    """Errors meaning the server is overloaded rather than unreachable."""
+    if not isinstance(error, HTTPException):
+        return False
+
+    if error.status == "ReadTimeout":
+        return True
+
+    return isinstance(error.status, int) and error.status >= 500
+
+
 @stop
-def _get_items(query, server_id=None):
+def _get_items(query, server_id=None, completed=None):
     """query = {
         'url': string,
         'params': dict -- opt, include StartIndex to resume
     }
+    completed: (StartIndex, Limit) of pages already processed, they are skipped
     """
     items = {"Items": [], "TotalRecordCount": 0, "RestorePoint": {}}
 
-    limit = min(int(settings("limitIndex") or 50), 50)
+    limit = int(settings("limitIndex") or 50)
     dthreads = int(settings("limitThreads") or 3)
+    readahead = max(int(settings("limitReadAhead") or dthreads), 1)
 
     url = query["url"]
     query.setdefault("params", {})
@@ -227,6 +402,23 @@ def _get_items(query, server_id=None):
 
     else:
         params.setdefault("StartIndex", 0)
+        total = items["TotalRecordCount"]
+        ranges = missing_ranges(params["StartIndex"], total, completed)
+
+        if not ranges:
+            return
+
+        adaptive = bool(settings("adaptivePaging.bool"))
+        paging = AdaptivePaging(
+            limit,
+            dthreads,
+            max(MAX_PAGE_SIZE, limit),
+            min(dthreads * 2, 50),
+            adaptive,
+        )
+        # Let the controller react to an overloaded server instead of the request retrying,
+        # a connection error still gets every retry before the server is deemed unreachable
+        retry = {"server_retry": 1} if adaptive else {}
 
         def get_query_params(params, start, count):
             params_copy = dict(params)
@@ -234,115 +426,230 @@ def _get_items(query, server_id=None):
             params_copy["Limit"] = count
             return params_copy
 
-        query_params = [
-            get_query_params(params, offset, limit)
-            for offset in range(params["StartIndex"], items["TotalRecordCount"], limit)
-        ]
+        # Fetch workers decode pages as they stream in and push them in batches into a bounded
+        # queue, the caller is the single consumer (usually the database writer). The network
+        # keeps paging while the previous batch is being written, and the queue size caps how
+        # much of the library sits in memory. Pages are cut from the missing ranges when a
+        # worker is free, so their size and the requests in flight follow the controller.
+        pages = queue.Queue(readahead)
+        aborted = threading.Event()
+        state = threading.Condition()
+        in_flight = [0]
+        attempts = {}
+
+        def put(result, params=None):
+            while not aborted.is_set():
+                try:
+                    pages.put((params, result), timeout=1)
+                except queue.Full:
+                    continue
+                else:
+                    return True
 
-        # multiprocessing.dummy.Pool completes all requests in multiple threads but has to
-        # complete all tasks before allowing any results to be processed. ThreadPoolExecutor
-        # allows for completed tasks to be processed while other tasks are completed on other
-        # threads. Don't be a dummy.Pool, be a ThreadPoolExecutor
-        with concurrent.futures.ThreadPoolExecutor(dthreads) as p:
-            # dictionary for storing the jobs and their results
-            jobs = {}
+            return False
 
-            # semaphore to avoid fetching complete library to memory
-            thread_buffer = threading.Semaphore(dthreads)
+        def next_page():
+            """Wait for a free slot and cut the next page, None once all is fetched."""
+            with state:
+                while not aborted.is_set():
+                    if ranges and in_flight[0] < paging.threads:
+                        in_flight[0] += 1
 
-            # wrapper function for _get that uses a semaphore
-            def get_wrapper(params):
-                thread_buffer.acquire()
-                return _get(url, params, server_id=server_id)
+                        return take_page(ranges, total, paging.limit)
 
-            # create jobs
-            for param in query_params:
-                job = p.submit(get_wrapper, param)
-                # the query params are later needed again
-                jobs[job] = param
+                    if not ranges and not in_flight[0]:
+                        return None
 
-            # process complete jobs
-            for job in concurrent.futures.as_completed(jobs):
-                # get the result
-                result = job.result() or {"Items": []}
-                query["params"] = jobs[job]
+                    state.wait(1)
 
-                # free job memory
-                del jobs[job]
-                del job
+        def page_done(remainder=None):
+            """Release the slot, hand back what is left of a failed page."""
+            with state:
+                in_flight[0] -= 1
 
-                # Mitigates #216 till the server validates the date provided is valid
-                if result["Items"][0].get("ProductionYear"):
-                    try:
-                        date(result["Items"][0]["ProductionYear"], 1, 1)
-                    except ValueError:
-                        LOG.info(
-                            "#216 mitigation triggered. Setting ProductionYear to None"
-                        )
-                        result["Items"][0]["ProductionYear"] = None
+                if remainder:
+                    ranges.append(remainder)
+                    ranges.sort()
 
-                items["Items"].extend(result["Items"])
-                # Using items to return data and communicate a restore point back to the callee is
-                # a violation of the SRP. TODO: Separate responsibilities.
-                items["RestorePoint"] = query
-                yield items
-                del items["Items"][:]
+                state.notify_all()
 
-                # release the semaphore again
-                thread_buffer.release()
+                return not ranges and not in_flight[0]
 
+        def retry_page(start, end):
+            """Back off after a server error, the range is handed back unless it
+            failed too often. The server used to answer a 500 with an empty page,
+            so a range that keeps failing is skipped instead of failing the sync.
+            """
+            paging.failure()
+            failures = attempts.get(start, 0) + 1
 
-class GetItemWorker(threading.Thread):
+            if failures >= MAX_PAGE_ATTEMPTS:
+                LOG.error("Skipping %s from %s after %s attempts", url, start, failures)
 
-    is_done = False
+                return None
 
-    def __init__(self, server, queue, output):
+            attempts[start] = failures
+            LOG.warning(
+                "Server error for %s from %s, retry with %s", url, start, paging
+            )
 
-        self.server = server
-        self.queue = queue
-        self.output = output
-        threading.Thread.__init__(self)
+            return (start, end)
 
-    def run(self):
-        with requests.Session() as s:
-            while True:
-                try:
-                    item_ids = self.queue.get(timeout=1)
-                except queue.Empty:
+        def fetch_page(begin, count):
+            """Stream the page into batches, returns the range to fetch again if any."""
+            page = get_query_params(params, begin, count)
+            end = min(begin + count, total)
+            start = begin
+            batch = []
+            waited = 0.0
+            started = time.time()
+
+            try:
+                result = _get_stream(url, page, server_id=server_id, **retry)
+
+                if result is None:  # 500 response
+                    return retry_page(start, end)
+
+                for item in result["Items"]:
+                    batch.append(item)
+
+                    if len(batch) == BATCH_SIZE:
+                        blocked = time.time()
+
+                        if not put(
+                            {"Items": batch},
+                            get_query_params(params, start, len(batch)),
+                        ):
+                            # Dropping the stream releases its connection
+                            return
 
-                    self.is_done = True
-                    LOG.info("--<[ q:download/%s ]", id(self))
+                        waited += time.time() - blocked
+                        start += len(batch)
+                        batch = []
 
+            except Exception as error:
+                if is_server_error(error):
+                    return retry_page(start, end)
+
+                put(error)
+
+                return
+
+            paging.success(time.time() - started - waited, start - begin + len(batch))
+            put({"Items": batch}, get_query_params(params, start, len(batch)))
+
+        def worker():
+            while True:
+                page = next_page()
+
+                if page is None:
                     return
 
-                request = {
-                    "type": "GET",
-                    "handler": "Users/{UserId}/Items",
-                    "params": {
-                        "Ids": ",".join(str(x) for x in item_ids),
-                        "Fields": api.info(),
-                    },
-                }
+                remainder = None
 
                 try:
-                    result = self.server.http.request(request, s)
+                    remainder = fetch_page(*page)
+                finally:
+                    if page_done(remainder):
+                        # Every batch is queued, let the consumer know it is the end
+                        put(None)
 
-                    for item in result["Items"]:
-
-                        if item["Type"] in self.output:
-                            self.output[item["Type"]].put(item)
-                except HTTPException as error:
-                    LOG.error("--[ http status: %s ]", error.status)
+        # multiprocessing.dummy.Pool completes all requests in multiple threads but has to
+        # complete all tasks before allowing any results to be processed. ThreadPoolExecutor
+        # allows for completed tasks to be processed while other tasks are completed on other
+        # threads. Don't be a dummy.Pool, be a ThreadPoolExecutor
+        with concurrent.futures.ThreadPoolExecutor(paging.max_threads) as p:
+            for _ in range(paging.max_threads):
+                p.submit(worker)
 
-                    if error.status == "ServerUnreachable":
-                        self.is_done = True
+            try:
+                while True:
+                    metrics.queue_depth("pages", pages.qsize())
+                    params, result = pages.get()
 
+                    if result is None:
                         break
 
+                    if isinstance(result, Exception):
+                        raise result
+
+                    if not result["Items"]:
+                        continue
+
+                    # the query params are later needed again
+                    query["params"] = params
+
+                    # Mitigates #216 till the server validates the date provided is valid
+                    if result["Items"][0].get("ProductionYear"):
+                        try:
+                            date(result["Items"][0]["ProductionYear"], 1, 1)
+                        except ValueError:
+                            LOG.info(
+                                "#216 mitigation triggered. Setting ProductionYear to None"
+                            )
+                            result["Items"][0]["ProductionYear"] = None
+
+                    items["Items"].extend(result["Items"])
+                    # Using items to return data and communicate a restore point back to the callee is
+                    # a violation of the SRP. TODO: Separate responsibilities.
+                    items["RestorePoint"] = query
+                    yield items
+                    del items["Items"][:]
+            finally:
+                # Release the fetch workers if the consumer stopped early,
+                # otherwise the executor would wait on them forever.
+                aborted.set()
+                LOG.info("--[ paging %s ] %s", url, paging)
+
+
+class GetItemWorker(PoolWorker):
+    """Download the items of the id lists queued in work, a list of
+    (queue, output, lookups) with the most urgent queue first.
+    """
+
+    def __init__(self, pool, server, work):
+
+        PoolWorker.__init__(self, pool, [x[0] for x in work])
+        self.server = server
+        self.outputs = {x[0]: x[1:] for x in work}
+
+    def work(self, work_queue, item_ids):
+        # Requests go through the server session so the keep-alive pool is shared
+        output, lookups = self.outputs[work_queue]
+        request = {
+            "type": "GET",
+            "handler": "Users/{UserId}/Items",
+            "params": {
+                "Ids": ",".join(str(x) for x in item_ids),
+                "Fields": api.info(),
+            },
+        }
+
+        try:
+            result = self.server.http.request(request)
+
+            if lookups is not None:
+                try:
+                    # Outside the database lock, before the writers need them
+                    lookups.prefetch(result["Items"])
                 except Exception as error:
-                    LOG.exception(error)
+                    LOG.warning("Unable to prefetch lookups: %s", error)
+
+            for item in result["Items"]:
+
+                if item["Type"] in output:
+                    output[item["Type"]].put(item)
+        except HTTPException as error:
+            LOG.error("--[ http status: %s ]", error.status)
+
+            if error.status == "ServerUnreachable":
+                work_queue.task_done()
+
+                return True
+
+        except Exception as error:
+            LOG.exception(error)
 
-                self.queue.task_done()
+        work_queue.task_done()
 
-                if window("jellyfin_should_stop.bool"):
-                    break
+        return window("jellyfin_should_stop.bool")
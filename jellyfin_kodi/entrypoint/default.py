@@ -27,6 +27,7 @@ from ..helper import (
     JSONRPC,
     LazyLogger,
 )
+from ..helper.metrics import report
 from ..helper.utils import (
     JsonDebugPrinter,
     translate_path,
@@ -205,6 +206,8 @@ class Events(object):
             path_replacements()
         elif mode == "backup":
             backup()
+        elif mode == "syncmetrics":
+            sync_metrics()
         elif mode == "restartservice":
             window("jellyfin.restart.bool", True)
         elif (
@@ -1270,6 +1273,18 @@ def delete_item():
     context.Context(delete=True)
 
 
+def sync_metrics():
+    """Timings of the last sync, recorded when enabled in the settings."""
+    summary = window("jellyfin_sync_metrics.json")
+
+    if not summary:
+        dialog("ok", "{jellyfin}", translate(33267))
+
+        return
+
+    xbmcgui.Dialog().textviewer(translate(33266), report(summary), usemono=True)
+
+
 def backup():
     """Jellyfin backup."""
     from ..helper.utils import delete_folder, copytree
@@ -22,6 +22,7 @@ from .. import monitor
 from ..views import Views
 from ..helper import (
     translate,
+    playutils,
     window,
     settings,
     event,
@@ -83,6 +84,7 @@ class Service(xbmc.Monitor):
         LOG.info("Log Level: %s", self.settings["log_level"])
 
         verify_kodi_defaults()
+        playutils.check_device_profile()
 
         window("jellyfin.connected.bool", True)
         settings("groupedSets.bool", objects.utils.get_grouped_set())
@@ -421,6 +423,8 @@ class Service(xbmc.Monitor):
         if window("jellyfin_should_stop.bool"):
             return
 
+        playutils.check_device_profile()
+
         if settings("logLevel") != self.settings["log_level"]:
 
             log_level = settings("logLevel")
@@ -523,6 +527,9 @@ class Service(xbmc.Monitor):
         for prop in properties:
             window(prop, clear=True)
 
+        if self.monitor is not None:
+            self.monitor.player.reporter.stop()
+
         Jellyfin.close_all()
 
         if self.library_thread is not None:
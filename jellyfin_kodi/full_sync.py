@@ -4,15 +4,18 @@ from __future__ import division, absolute_import, print_function, unicode_litera
 ##################################################################################################
 
 from contextlib import contextmanager
+import concurrent.futures
 import datetime
 
 import xbmc
 
 from . import downloader as server
 from .objects import Movies, TVShows, MusicVideos, Music
-from .database import Database, get_sync, save_sync, jellyfin_db
+from .objects.utils import Lookups
+from .database import Database, get_sync, save_sync, save_sync_metrics, jellyfin_db
 from .helper import translate, settings, window, progress, dialog, LazyLogger, xmls
 from .helper.utils import get_screensaver, set_screensaver
+from .helper.metrics import metrics, report
 from .helper.exceptions import (
     LibraryException,
     LibraryExitException,
@@ -66,6 +69,9 @@ class FullSync(object):
         self.running = True
         window("jellyfin_sync.bool", True)
 
+        if settings("syncMetrics.bool"):
+            metrics.start()
+
         return self
 
     def libraries(self, libraries=None, update=False):
@@ -73,6 +79,11 @@ class FullSync(object):
         self.direct_path = settings("useDirectPaths") == "1"
         self.update_library = update
         self.sync = get_sync()
+        self.lookups = Lookups(self.server)
+
+        if not self.sync["Libraries"]:
+            # Nothing left to resume, pages of older syncs are stale
+            self.remove_checkpoints()
 
         if libraries:
             # Can be a single ID or a comma separated list
@@ -139,6 +150,7 @@ class FullSync(object):
                 else:
                     self.sync["Libraries"] = []
                     self.sync["RestorePoint"] = {}
+                    self.remove_checkpoints()
         else:
             LOG.info("generate full sync")
             libraries = []
@@ -305,49 +317,86 @@ class FullSync(object):
 
     @contextmanager
     def video_database_locks(self):
-        with self.library.database_lock:
+        with metrics.acquire(self.library.database_lock, "lock.video"):
             with Database() as videodb:
                 with Database("jellyfin") as jellyfindb:
                     yield videodb, jellyfindb
 
+    def get_checkpoints(self, library_id, item_type):
+        """Pages already written by an interrupted sync of this library."""
+        with Database("jellyfin") as jellyfindb:
+            return jellyfin_db.JellyfinDatabase(jellyfindb.cursor).get_checkpoints(
+                library_id, item_type
+            )
+
+    def add_checkpoint(self, obj, library, item_type, items):
+        """Mark a page as written, in the same transaction as its items."""
+        params = items["RestorePoint"]["params"]
+        metrics.add_items(len(items["Items"]))
+        obj.jellyfin_db.add_checkpoint(
+            library["Id"], item_type, params["StartIndex"], params["Limit"]
+        )
+
+    def remove_checkpoints(self, library_id=None, item_type=None):
+        with Database("jellyfin") as jellyfindb:
+            db = jellyfin_db.JellyfinDatabase(jellyfindb.cursor)
+
+            if library_id is None:
+                db.remove_all_checkpoints()
+            else:
+                db.remove_checkpoints(library_id, item_type)
+
     @progress()
     def movies(self, library, dialog):
         """Process movies from a single library."""
         processed_ids = []
 
+        completed = self.get_checkpoints(library["Id"], "Movie")
+
         for items in server.get_items(
-            library["Id"], "Movie", False, self.sync["RestorePoint"].get("params")
+            library["Id"], "Movie", False, completed=completed
         ):
 
+            self.lookups.prefetch(items["Items"], library)
+
             with self.video_database_locks() as (videodb, jellyfindb):
                 obj = Movies(
                     self.server, jellyfindb, videodb, self.direct_path, library
                 )
+                obj.lookups = self.lookups
 
                 self.sync["RestorePoint"] = items["RestorePoint"]
                 start_index = items["RestorePoint"]["params"]["StartIndex"]
 
-                for index, movie in enumerate(items["Items"]):
+                with obj.bulk():
+                    for index, movie in enumerate(items["Items"]):
 
-                    dialog.update(
-                        int(
-                            (
-                                float(start_index + index)
-                                / float(items["TotalRecordCount"])
-                            )
-                            * 100
-                        ),
-                        heading="%s: %s" % (translate("addon_name"), library["Name"]),
-                        message=movie["Name"],
-                    )
-                    obj.movie(movie)
-                    processed_ids.append(movie["Id"])
+                        dialog.update(
+                            int(
+                                (
+                                    float(start_index + index)
+                                    / float(items["TotalRecordCount"])
+                                )
+                                * 100
+                            ),
+                            heading="%s: %s"
+                            % (translate("addon_name"), library["Name"]),
+                            message=movie["Name"],
+                        )
+                        obj.movie(movie)
+                        processed_ids.append(movie["Id"])
+
+                self.add_checkpoint(obj, library, "Movie", items)
 
         with self.video_database_locks() as (videodb, jellyfindb):
             obj = Movies(self.server, jellyfindb, videodb, self.direct_path, library)
             obj.item_ids = processed_ids
 
-            if self.update_library:
+            obj.jellyfin_db.remove_checkpoints(library["Id"], "Movie")
+
+            if self.update_library and completed:
+                LOG.info("Resumed sync of %s, skipping removals", library["Name"])
+            elif self.update_library:
                 self.movies_compare(library, obj, jellyfindb)
 
     def movies_compare(self, library, obj, jellyfinydb):
@@ -366,35 +415,48 @@ class FullSync(object):
         """Process tvshows and episodes from a single library."""
         processed_ids = []
 
-        for items in server.get_items(
-            library["Id"], "Series", False, self.sync["RestorePoint"].get("params")
-        ):
+        completed = self.get_checkpoints(library["Id"], "Series")
+
+        pages = server.get_items(library["Id"], "Series", False, completed=completed)
+
+        for items, shows in self.prefetch_shows(pages):
+
+            # The write loop below only consumes what is already downloaded
+            self.lookups.prefetch(items["Items"], library)
+            concurrent.futures.wait(shows.values())
 
             with self.video_database_locks() as (videodb, jellyfindb):
                 obj = TVShows(
                     self.server, jellyfindb, videodb, self.direct_path, library, True
                 )
+                obj.lookups = self.lookups
 
                 self.sync["RestorePoint"] = items["RestorePoint"]
                 start_index = items["RestorePoint"]["params"]["StartIndex"]
 
-                for index, show in enumerate(items["Items"]):
+                with obj.bulk():
+                    for index, show in enumerate(items["Items"]):
 
-                    percent = int(
-                        (float(start_index + index) / float(items["TotalRecordCount"]))
-                        * 100
-                    )
-                    message = show["Name"]
-                    dialog.update(
-                        percent,
-                        heading="%s: %s" % (translate("addon_name"), library["Name"]),
-                        message=message,
-                    )
+                        percent = int(
+                            (
+                                float(start_index + index)
+                                / float(items["TotalRecordCount"])
+                            )
+                            * 100
+                        )
+                        message = show["Name"]
+                        dialog.update(
+                            percent,
+                            heading="%s: %s"
+                            % (translate("addon_name"), library["Name"]),
+                            message=message,
+                        )
+
+                        seasons, episodes = shows[show["Id"]].result()
 
-                    if obj.tvshow(show) is not False:
+                        if obj.tvshow(show, seasons=seasons) is not False:
 
-                        for episodes in server.get_episode_by_show(show["Id"]):
-                            for episode in episodes["Items"]:
+                            for episode in episodes:
                                 if episode.get("Path"):
                                     dialog.update(
                                         percent,
@@ -402,16 +464,70 @@ class FullSync(object):
                                         % (message, episode["Name"][:10]),
                                     )
                                     obj.episode(episode)
-                    processed_ids.append(show["Id"])
+                        processed_ids.append(show["Id"])
+
+                self.add_checkpoint(obj, library, "Series", items)
 
         with self.video_database_locks() as (videodb, jellyfindb):
             obj = TVShows(
                 self.server, jellyfindb, videodb, self.direct_path, library, True
             )
             obj.item_ids = processed_ids
-            if self.update_library:
+            obj.jellyfin_db.remove_checkpoints(library["Id"], "Series")
+
+            if self.update_library and completed:
+                LOG.info("Resumed sync of %s, skipping removals", library["Name"])
+            elif self.update_library:
                 self.tvshows_compare(library, obj, jellyfindb)
 
+    def prefetch_shows(self, pages):
+        """Download the seasons and episodes of each page of series concurrently and
+        outside the database lock. The next page is downloaded while the current one
+        is written. Yields (items, {series id: future of (seasons, episodes)}).
+        """
+
+        def fetch(show_id):
+            seasons = self.server.jellyfin.get_seasons(show_id)["Items"]
+            episodes = []
+
+            for page in server.get_episode_by_show(show_id):
+                episodes.extend(page["Items"])
+
+            return seasons, episodes
+
+        executor = concurrent.futures.ThreadPoolExecutor(
+            int(settings("limitThreads") or 3)
+        )
+        ahead = None
+
+        try:
+            for items in pages:
+                # The downloader reuses its page, keep a copy while it waits its turn
+                items = dict(
+                    items,
+                    Items=list(items["Items"]),
+                    RestorePoint=dict(items["RestorePoint"]),
+                )
+                shows = {
+                    show["Id"]: executor.submit(fetch, show["Id"])
+                    for show in items["Items"]
+                }
+
+                current, ahead = ahead, (items, shows)
+
+                if current is not None:
+                    yield current
+
+            if ahead is not None:
+                current, ahead = ahead, None
+                yield current
+        finally:
+            # Stopped early, drop the downloads that did not start yet
+            for future in ahead[1].values() if ahead else ():
+                future.cancel()
+
+            executor.shutdown(wait=True)
+
     def tvshows_compare(self, library, obj, jellyfindb):
         """Compare entries from library to what's in the jellyfindb. Remove surplus"""
         db = jellyfin_db.JellyfinDatabase(jellyfindb.cursor)
@@ -431,8 +547,10 @@ class FullSync(object):
         """Process musicvideos from a single library."""
         processed_ids = []
 
+        completed = self.get_checkpoints(library["Id"], "MusicVideo")
+
         for items in server.get_items(
-            library["Id"], "MusicVideo", False, self.sync["RestorePoint"].get("params")
+            library["Id"], "MusicVideo", False, completed=completed
         ):
 
             with self.video_database_locks() as (videodb, jellyfindb):
@@ -443,28 +561,36 @@ class FullSync(object):
                 self.sync["RestorePoint"] = items["RestorePoint"]
                 start_index = items["RestorePoint"]["params"]["StartIndex"]
 
-                for index, mvideo in enumerate(items["Items"]):
+                with obj.bulk():
+                    for index, mvideo in enumerate(items["Items"]):
 
-                    dialog.update(
-                        int(
-                            (
-                                float(start_index + index)
-                                / float(items["TotalRecordCount"])
-                            )
-                            * 100
-                        ),
-                        heading="%s: %s" % (translate("addon_name"), library["Name"]),
-                        message=mvideo["Name"],
-                    )
-                    obj.musicvideo(mvideo)
-                    processed_ids.append(mvideo["Id"])
+                        dialog.update(
+                            int(
+                                (
+                                    float(start_index + index)
+                                    / float(items["TotalRecordCount"])
+                                )
+                                * 100
+                            ),
+                            heading="%s: %s"
+                            % (translate("addon_name"), library["Name"]),
+                            message=mvideo["Name"],
+                        )
+                        obj.musicvideo(mvideo)
+                        processed_ids.append(mvideo["Id"])
+
+                self.add_checkpoint(obj, library, "MusicVideo", items)
 
         with self.video_database_locks() as (videodb, jellyfindb):
             obj = MusicVideos(
                 self.server, jellyfindb, videodb, self.direct_path, library
             )
             obj.item_ids = processed_ids
-            if self.update_library:
+            obj.jellyfin_db.remove_checkpoints(library["Id"], "MusicVideo")
+
+            if self.update_library and completed:
+                LOG.info("Resumed sync of %s, skipping removals", library["Name"])
+            elif self.update_library:
                 self.musicvideos_compare(library, obj, jellyfindb)
 
     def musicvideos_compare(self, library, obj, jellyfindb):
@@ -481,7 +607,7 @@ class FullSync(object):
     @progress()
     def music(self, library, dialog):
         """Process artists, album, songs from a single library."""
-        with self.library.music_database_lock:
+        with metrics.acquire(self.library.music_database_lock, "lock.music"):
             with Database("music") as musicdb:
                 with Database("jellyfin") as jellyfindb:
                     obj = Music(
@@ -504,14 +630,18 @@ class FullSync(object):
                     """
                     artists = server.get_artists(library_id)
                     for batch in artists:
-                        for item in batch["Items"]:
-                            LOG.debug("Artist: {}".format(item.get("Name")))
-                            percent = int((float(count) / float(total_items)) * 100)
-                            dialog.update(
-                                percent, message="Artist: {}".format(item.get("Name"))
-                            )
-                            obj.artist(item)
-                            count += 1
+                        metrics.add_items(len(batch["Items"]))
+
+                        with obj.bulk():
+                            for item in batch["Items"]:
+                                LOG.debug("Artist: {}".format(item.get("Name")))
+                                percent = int((float(count) / float(total_items)) * 100)
+                                dialog.update(
+                                    percent,
+                                    message="Artist: {}".format(item.get("Name")),
+                                )
+                                obj.artist(item)
+                                count += 1
 
                     albums = server.get_items(
                         library_id,
@@ -519,33 +649,39 @@ class FullSync(object):
                         params={"SortBy": "AlbumArtist"},
                     )
                     for batch in albums:
-                        for item in batch["Items"]:
-                            LOG.debug("Album: {}".format(item.get("Name")))
-                            percent = int((float(count) / float(total_items)) * 100)
-                            dialog.update(
-                                percent,
-                                message="Album: {} - {}".format(
-                                    item.get("AlbumArtist", ""), item.get("Name")
-                                ),
-                            )
-                            obj.album(item)
-                            count += 1
+                        metrics.add_items(len(batch["Items"]))
+
+                        with obj.bulk():
+                            for item in batch["Items"]:
+                                LOG.debug("Album: {}".format(item.get("Name")))
+                                percent = int((float(count) / float(total_items)) * 100)
+                                dialog.update(
+                                    percent,
+                                    message="Album: {} - {}".format(
+                                        item.get("AlbumArtist", ""), item.get("Name")
+                                    ),
+                                )
+                                obj.album(item)
+                                count += 1
 
                     songs = server.get_items(
                         library_id, item_type="Audio", params={"SortBy": "AlbumArtist"}
                     )
                     for batch in songs:
-                        for item in batch["Items"]:
-                            LOG.debug("Song: {}".format(item.get("Name")))
-                            percent = int((float(count) / float(total_items)) * 100)
-                            dialog.update(
-                                percent,
-                                message="Track: {} - {}".format(
-                                    item.get("AlbumArtist", ""), item.get("Name")
-                                ),
-                            )
-                            obj.song(item)
-                            count += 1
+                        metrics.add_items(len(batch["Items"]))
+
+                        with obj.bulk():
+                            for item in batch["Items"]:
+                                LOG.debug("Song: {}".format(item.get("Name")))
+                                percent = int((float(count) / float(total_items)) * 100)
+                                dialog.update(
+                                    percent,
+                                    message="Track: {} - {}".format(
+                                        item.get("AlbumArtist", ""), item.get("Name")
+                                    ),
+                                )
+                                obj.song(item)
+                                count += 1
 
                     if self.update_library:
                         self.music_compare(library, obj, jellyfindb)
@@ -567,8 +703,10 @@ class FullSync(object):
     @progress(translate(33018))
     def boxsets(self, library, dialog=None):
         """Process all boxsets."""
+        completed = self.get_checkpoints(library["Id"], "BoxSet")
+
         for items in server.get_items(
-            library["Id"], "BoxSet", False, self.sync["RestorePoint"].get("params")
+            library["Id"], "BoxSet", False, completed=completed
         ):
 
             with self.video_database_locks() as (videodb, jellyfindb):
@@ -595,6 +733,10 @@ class FullSync(object):
                     )
                     obj.boxset(boxset)
 
+                self.add_checkpoint(obj, library, "BoxSet", items)
+
+        self.remove_checkpoints(library["Id"], "BoxSet")
+
     def refresh_boxsets(self, library):
         """Delete all existing boxsets and re-add."""
         with self.video_database_locks() as (videodb, jellyfindb):
@@ -619,11 +761,13 @@ class FullSync(object):
                 settings("MusicRescan.bool", False)
 
             if items:
-                with (
+                lock = (
                     self.library.music_database_lock
                     if media == "music"
                     else self.library.database_lock
-                ):
+                )
+
+                with metrics.acquire(lock, "lock.%s" % media):
                     with Database(media) as kodidb:
 
                         count = 0
@@ -709,4 +853,19 @@ class FullSync(object):
             xbmc.executebuiltin("InhibitIdleShutdown(false)")
             set_screensaver(value=self.screensaver)
 
+        if metrics.enabled:
+            self.report_metrics()
+
         LOG.info("--<[ fullsync ]")
+
+    def report_metrics(self):
+        """Log the timings of the sync and keep them for the syncmetrics route."""
+        summary = metrics.stop()
+        LOG.info("Sync metrics:\n%s", report(summary))
+        window("jellyfin_sync_metrics.json", summary)
+
+        if settings("syncMetricsExport.bool"):
+            try:
+                LOG.info("Sync metrics exported to %s", save_sync_metrics(summary))
+            except (IOError, OSError) as error:
+                LOG.warning("Unable to export sync metrics: %s", error)
@@ -7,6 +7,7 @@ import json
 
 from . import settings, LazyLogger
 from .utils import translate_path
+from .metrics import metrics
 
 ##################################################################################################
 
@@ -78,6 +79,7 @@ class API(object):
     def media_streams(self, video, audio, subtitles):
         return {"video": video or [], "audio": audio or [], "subtitle": subtitles or []}
 
+    @metrics.timed("api.video_streams")
     def video_streams(self, tracks, container=None):
 
         if container:
@@ -129,6 +131,7 @@ class API(object):
 
         return tracks
 
+    @metrics.timed("api.audio_streams")
     def audio_streams(self, tracks):
 
         for track in tracks:
@@ -187,6 +190,7 @@ class API(object):
         }
         return studios.get(studio_name.lower(), studio_name)
 
+    @metrics.timed("api.get_overview")
     def get_overview(self, overview=None):
 
         overview = overview or self.item.get("Overview")
@@ -214,6 +218,7 @@ class API(object):
 
         return mpaa
 
+    @metrics.timed("api.get_file_path")
     def get_file_path(self, path=None):
 
         if path is None:
@@ -256,6 +261,7 @@ class API(object):
         """Get jellyfin user profile picture."""
         return "%s/Users/%s/Images/Primary?Format=original" % (self.server, user_id)
 
+    @metrics.timed("api.get_people_artwork")
     def get_people_artwork(self, people):
         """Get people (actor, director, etc) artwork."""
         for person in people:
@@ -271,6 +277,7 @@ class API(object):
 
         return people
 
+    @metrics.timed("api.get_all_artwork")
     def get_all_artwork(self, obj, parent_info=False):
         """Get all artwork possible. If parent_info is True,
         it will fill missing artwork with parent artwork.
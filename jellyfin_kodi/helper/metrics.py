@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+#################################################################################################
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+#################################################################################################
+
+# First table a statement reads or writes
+TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+(\w+)", re.IGNORECASE)
+
+#################################################################################################
+
+
+class Metrics(object):
+    """Per stage timings and queue depths of a sync, shared by every thread.
+
+    Recording is off until start(), the instrumented code then only pays for
+    a flag check.
+    """
+
+    def __init__(self):
+
+        self.lock = threading.Lock()
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.stages = {}
+            self.queues = {}
+            self.items = 0
+
+    def start(self):
+        self.reset()
+        self.enabled = True
+
+    def stop(self):
+        """Stop recording, returns the summary of the run."""
+        self.enabled = False
+
+        return self.summary()
+
+    def record(self, stage, seconds, count=1):
+
+        if not self.enabled:
+            return
+
+        with self.lock:
+            stage = self.stages.setdefault(stage, [0, 0.0, 0.0])
+            stage[0] += count
+            stage[1] += seconds
+            stage[2] = max(stage[2], seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        started = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            if self.enabled:
+                self.record(stage, time.perf_counter() - started)
+
+    def timed(self, stage):
+        """Decorator recording each call under stage."""
+
+        def decorator(func):
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+
+                if not self.enabled:
+                    return func(*args, **kwargs)
+
+                with self.timer(stage):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    @contextmanager
+    def acquire(self, lock, stage):
+        """Hold lock, recording the wait under stage."""
+        with self.timer(stage):
+            lock.acquire()
+
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def queue_depth(self, name, depth):
+
+        if self.enabled:
+            with self.lock:
+                self.queues[name] = max(self.queues.get(name, 0), depth)
+
+    def add_items(self, count):
+
+        if self.enabled:
+            with self.lock:
+                self.items += count
+
+    def summary(self):
+        with self.lock:
+            elapsed = time.time() - self.started
+
+            return {
+                "Started": self.started,
+                "Elapsed": round(elapsed, 3),
+                "Items": self.items,
+                "ItemsPerSecond": round(self.items / elapsed, 2) if elapsed else 0,
+                "Stages": {
+                    name: {
+                        "Count": count,
+                        "TotalMs": round(total * 1000, 1),
+                        "AverageMs": round(total * 1000 / count, 3) if count else 0,
+                        "MaxMs": round(longest * 1000, 1),
+                    }
+                    for name, (count, total, longest) in self.stages.items()
+                },
+                "MaxQueueDepths": dict(self.queues),
+            }
+
+
+def report(summary):
+    """Readable lines of a summary, the slowest stages first."""
+    lines = [
+        "%s items in %.1fs, %.1f items/s"
+        % (summary["Items"], summary["Elapsed"], summary["ItemsPerSecond"])
+    ]
+    stages = sorted(
+        summary["Stages"].items(), key=lambda stage: stage[1]["TotalMs"], reverse=True
+    )
+
+    for name, stage in stages:
+        lines.append(
+            "%-24s %8d x %9.3f ms = %10.1f ms (max %.1f ms)"
+            % (
+                name,
+                stage["Count"],
+                stage["AverageMs"],
+                stage["TotalMs"],
+                stage["MaxMs"],
+            )
+        )
+
+    for name, depth in sorted(summary["MaxQueueDepths"].items()):
+        lines.append("%-24s max depth %d" % (name, depth))
+
+    return "\n".join(lines)
+
+
+class TimedCursor(object):
+    """sqlite3 cursor recording each statement under sql.<table>."""
+
+    tables = {}
+
+    def __init__(self, cursor, metrics):
+        object.__setattr__(self, "cursor", cursor)
+        object.__setattr__(self, "metrics", metrics)
+
+    def stage(self, sql):
+        table = self.tables.get(sql)
+
+        if table is None:
+            match = TABLE.search(sql)
+            table = self.tables[sql] = "sql.%s" % (
+                match.group(1) if match else sql.split(None, 1)[0].lower()
+            )
+
+        return table
+
+    def execute(self, sql, *args):
+        with self.metrics.timer(self.stage(sql)):
+            self.cursor.execute(sql, *args)
+
+        return self
+
+    def executemany(self, sql, *args):
+        with self.metrics.timer(self.stage(sql)):
+            self.cursor.executemany(sql, *args)
+
+        return self
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.cursor, name, value)
+
+
+metrics = Metrics()
@@ -3,7 +3,14 @@ from __future__ import division, absolute_import, print_function, unicode_litera
 
 #################################################################################################
 
+import copy
+import hashlib
+import json
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from uuid import uuid4
 
 import requests
@@ -18,6 +25,26 @@ from . import translate, settings, window, dialog, api, LazyLogger
 #################################################################################################
 
 LOG = LazyLogger(__name__)
+# Settings the device profile is built from
+PROFILE_SETTINGS = (
+    "maxBitrate",
+    "audioPreferredCodec",
+    "audioMaxChannels",
+    "videoPreferredCodec",
+    "transcode_h265",
+    "transcode_h265_rext",
+    "transcode_mpeg2",
+    "transcode_vc1",
+    "transcode_vp9",
+    "transcode_av1",
+    "transcodeHi10P",
+)
+# Device profile of the current settings, keyed by their fingerprint
+PROFILES = {}
+# Seconds a started playback waits for the properties of its play
+LATE_PLAY = 30
+# Seconds between two looks at the plays set up by another process
+LATE_POLL = 0.5
 
 
 class Transcode(object):
@@ -31,12 +58,217 @@ class Transcode(object):
 #################################################################################################
 
 
+class PlayRegistry(object):
+    """Properties of the plays set up for the player, keyed by path.
+
+    Plays set up in the process of the player are handed over under a
+    condition. The plugin resolving a play runs in a process of its own, its
+    plays go through the jellyfin_play window property and are picked up from
+    there, the property is polled while a started playback waits for them.
+    """
+
+    def __init__(self):
+
+        self.condition = threading.Condition()
+        self.plays = OrderedDict()
+        self.served = False
+        self.waiting = None
+        self.polling = False
+
+    def serve(self):
+        """A player of this process takes the plays."""
+        self.served = True
+
+    def add(self, play):
+        if not self.served:
+            current = window("jellyfin_play.json") or []
+            current.append(play)
+            window("jellyfin_play.json", current)
+
+            return
+
+        with self.condition:
+            self.plays[play["Path"]] = play
+            self.condition.notify_all()
+
+            if self.waiting is None:
+                return
+
+            path, late, deadline = self.waiting
+
+            if time.time() > deadline:
+                LOG.info("--[ play ] gave up waiting for %s", path)
+                self.waiting = None
+
+                return
+
+            if play["Path"] != path:
+                return
+
+            self.waiting = None
+            play = self.pop(path)
+
+        late(play)
+
+    def take(self, path, timeout=0, late=None):
+        """Properties of the play of path, the first ones set if none match.
+        Waits up to timeout seconds for them to be set. If there are none yet,
+        late is called with those of path if they are set within LATE_PLAY
+        seconds.
+        """
+        deadline = time.time() + timeout
+
+        with self.condition:
+            self.waiting = None
+
+            while True:
+                self.load()
+
+                if self.plays:
+                    return self.pop(path)
+
+                remaining = deadline - time.time()
+
+                if remaining <= 0:
+                    break
+
+                self.condition.wait(remaining)
+
+            if late is not None:
+                self.waiting = (path, late, time.time() + LATE_PLAY)
+
+                if not self.polling:
+                    self.polling = True
+                    threading.Thread(target=self.poll).start()
+
+    def poll(self):
+        """Look for the plays of another process until the waiting playback
+        gets its play, moves on or gives up. The plugin resolves the play
+        being started, its play is taken even if the path doesn't match.
+        """
+        while True:
+            with self.condition:
+                play = None
+
+                if self.waiting is not None:
+                    path, late, deadline = self.waiting
+                    loaded = self.load()
+
+                    if time.time() > deadline:
+                        LOG.info("--[ play ] gave up waiting for %s", path)
+                        self.waiting = None
+                    elif path in self.plays or loaded:
+                        self.waiting = None
+                        play = self.plays.pop(path, None) or self.plays.pop(
+                            loaded[0]["Path"]
+                        )
+                    else:
+                        self.condition.wait(LATE_POLL)
+
+                        continue
+
+                if play is None:
+                    self.polling = False
+
+                    return
+
+            late(play)
+
+    def forget(self):
+        """Playback moved on, nobody waits for a play anymore."""
+        with self.condition:
+            self.waiting = None
+
+    def get(self, path):
+        """Properties of the play of path, left for the player."""
+        with self.condition:
+            self.load()
+
+            return self.plays.get(path)
+
+    def pop(self, path):
+        play = self.plays.pop(path, None)
+
+        if play is None:
+            play = self.plays.popitem(last=False)[1]
+
+        return play
+
+    def load(self):
+        """Take over the plays set up by another process, returns them."""
+        plays = window("jellyfin_play.json") or []
+
+        if plays:
+            window("jellyfin_play", clear=True)
+
+            for play in plays:
+                self.plays[play["Path"]] = play
+
+        return plays
+
+    def clear(self):
+        with self.condition:
+            self.plays.clear()
+            self.waiting = None
+            window("jellyfin_play", clear=True)
+
+
+PLAYS = PlayRegistry()
+
+
+def profile_fingerprint():
+    """Hash of the settings the device profile is built from, the same in
+    every process.
+    """
+    values = json.dumps([settings(name) for name in PROFILE_SETTINGS])
+
+    return hashlib.sha1(values.encode("utf-8")).hexdigest()
+
+
+def cached_device_profile():
+    """Device profile built since the settings last changed, by this process
+    or by another one through the jellyfin_device_profile window property.
+    None if there is none.
+    """
+    if not PROFILES:
+        cached = window("jellyfin_device_profile.json")
+
+        if cached:
+            PROFILES[cached["Fingerprint"]] = cached["Profile"]
+
+    for profile in PROFILES.values():
+        return profile
+
+
+def cache_device_profile(fingerprint, profile):
+    PROFILES.clear()
+    PROFILES[fingerprint] = profile
+    window(
+        "jellyfin_device_profile.json",
+        {"Fingerprint": fingerprint, "Profile": profile},
+    )
+    LOG.info("--[ device profile ] %s", fingerprint)
+
+
+def check_device_profile():
+    """Forget the cached device profile if the settings it was built from
+    changed. The service runs it once settings change.
+    """
+    fingerprint = profile_fingerprint()
+
+    if cached_device_profile() is None or fingerprint in PROFILES:
+        return
+
+    LOG.info("--[ device profile ] settings changed")
+    PROFILES.clear()
+    window("jellyfin_device_profile", clear=True)
+
+
 def set_properties(item, method, server_id=None):
     """Set all properties for playback detection."""
     info = item.get("PlaybackInfo") or {}
 
-    current = window("jellyfin_play.json") or []
-    current.append(
+    PLAYS.add(
         {
             "Type": item["Type"],
             "Id": item["Id"],
@@ -53,10 +285,56 @@ def set_properties(item, method, server_id=None):
             "SubtitleStreamIndex": info.get("SubtitleStreamIndex"),
             "CurrentPosition": info.get("CurrentPosition"),
             "CurrentEpisode": info.get("CurrentEpisode"),
+            "MediaSegments": info.get("MediaSegments"),
+            "Requested": info.get("Requested"),
         }
     )
 
-    window("jellyfin_play.json", current)
+
+class Prefetch(object):
+    """Requests of a play that don't wait on each other's answer. They are
+    sent together as soon as the play starts, so the play waits for the
+    slowest of them rather than for all of them one after the other.
+    """
+
+    def __init__(self, workers=4):
+
+        self.workers = workers
+        self.executor = None
+        self.requests = {}
+
+    def start(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers)
+
+        return self.executor
+
+    def submit(self, name, call, *args):
+        self.requests[name] = self.start().submit(call, *args)
+
+    def get(self, name, call, *args):
+        """Answer of the request name, made now by call if it wasn't sent."""
+        request = self.requests.pop(name, None)
+
+        if request is None:
+            return call(*args)
+
+        return request.result()
+
+    def map(self, call, items):
+        """call for every item at once, returns the answers in order."""
+        if len(items) < 2:
+            return [call(x) for x in items]
+
+        return list(self.start().map(call, items))
+
+    def close(self):
+        """Answers nobody asked for are left to finish on their own."""
+        self.requests.clear()
+
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
 
 
 class PlayUtils(object):
@@ -423,7 +701,40 @@ class PlayUtils(object):
         return bitrate[int(settings("audioBitrate") or 6)] * 1000
 
     def get_device_profile(self):
-        """Get device profile based on the add-on settings."""
+        """Get device profile based on the add-on settings. It is built once
+        and cached until they change, see check_device_profile.
+        """
+        profile = cached_device_profile()
+
+        if profile is None:
+            fingerprint = profile_fingerprint()
+            profile = self.build_device_profile()
+            cache_device_profile(fingerprint, profile)
+
+        profile = copy.deepcopy(profile)
+
+        if self.info["ForceTranscode"]:
+            profile["DirectPlayProfiles"] = []
+
+        if self.item["Type"] == "TvChannel":
+            profile["TranscodingProfiles"].insert(
+                0,
+                {
+                    "Container": "ts",
+                    "Type": "Video",
+                    "AudioCodec": "mp3,aac",
+                    "VideoCodec": "h264",
+                    "Context": "Streaming",
+                    "Protocol": "hls",
+                    "MaxAudioChannels": "2",
+                    "MinSegments": "1",
+                    "BreakOnNonKeyFrames": True,
+                },
+            )
+
+        return profile
+
+    def build_device_profile(self):
         profile = {
             "Name": "Kodi",
             "MaxStaticBitrate": self.get_max_bitrate(),
@@ -499,25 +810,6 @@ class PlayUtils(object):
                 }
             )
 
-        if self.info["ForceTranscode"]:
-            profile["DirectPlayProfiles"] = []
-
-        if self.item["Type"] == "TvChannel":
-            profile["TranscodingProfiles"].insert(
-                0,
-                {
-                    "Container": "ts",
-                    "Type": "Video",
-                    "AudioCodec": "mp3,aac",
-                    "VideoCodec": "h264",
-                    "Context": "Streaming",
-                    "Protocol": "hls",
-                    "MaxAudioChannels": "2",
-                    "MinSegments": "1",
-                    "BreakOnNonKeyFrames": True,
-                },
-            )
-
         return profile
 
     def set_external_subs(self, source, listitem):
@@ -562,7 +854,11 @@ class PlayUtils(object):
                     )
 
                     try:
-                        subs.append(self.download_external_subs(url, filename))
+                        subs.append(
+                            self.download_external_subs(
+                                url, filename, self.api_client.client.session
+                            )
+                        )
                     except Exception as error:
                         LOG.exception(error)
                         subs.append(url)
@@ -576,9 +872,10 @@ class PlayUtils(object):
         self.item["PlaybackInfo"]["Subtitles"] = mapping
 
     @classmethod
-    def download_external_subs(cls, src, filename):
+    def download_external_subs(cls, src, filename, session=None):
         """Download external subtitles to temp folder
         to be able to have proper names to streams.
+        Reuses the server session connections when one is given.
         """
         temp = translate_path(
             "special://profile/addon_data/plugin.video.jellyfin/temp/"
@@ -590,7 +887,9 @@ class PlayUtils(object):
         path = os.path.join(temp, filename)
 
         try:
-            response = requests.get(src, stream=True, verify=settings("sslverify.bool"))
+            response = (session or requests).get(
+                src, stream=True, verify=settings("sslverify.bool")
+            )
             response.raise_for_status()
         except Exception as error:
             LOG.exception(error)
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+#################################################################################################
+
+import threading
+from abc import ABCMeta, abstractmethod
+from contextlib import ExitStack
+
+import queue
+
+from .lazylogger import LazyLogger
+
+#################################################################################################
+
+LOG = LazyLogger(__name__)
+
+# Worker states
+BUSY = "busy"  # working an item
+READY = "ready"  # waiting, still holding what it opened during the burst
+IDLE = "idle"  # waiting, nothing held
+STOPPED = "stopped"
+
+#################################################################################################
+
+
+class WorkQueue(queue.Queue):
+    """Queue of a pool, a put wakes a worker waiting on it."""
+
+    def __init__(self, pool):
+        queue.Queue.__init__(self)
+        self.pool = pool
+
+    def put(self, item, block=True, timeout=None):
+        queue.Queue.put(self, item, block, timeout)
+        self.pool.wake(self)
+
+
+class WorkerPool(object):
+    """Threads living as long as the pool, each working items of its queues.
+
+    Waiting threads sleep on a condition until an item is put in one of their
+    queues, nothing polls. Workers keep their connections from one item to the
+    next and let go of them once every queue is empty and every worker waits.
+    The owner sleeps in wait() until notify() or a worker changes state.
+    """
+
+    def __init__(self):
+
+        self.lock = threading.RLock()
+        self.changed = threading.Condition(self.lock)
+        self.signalled = False
+        self.stopping = False
+        self.workers = []
+        self.queues = []
+
+    def queue(self):
+        work_queue = WorkQueue(self)
+        self.queues.append(work_queue)
+
+        return work_queue
+
+    def add(self, worker):
+        with self.lock:
+            self.workers.append(worker)
+
+        worker.start()
+        LOG.info("-->[ pool/%s ] %s", type(worker).__name__, id(worker))
+
+    def wake(self, work_queue):
+        """Wake the waiting workers of work_queue."""
+        with self.lock:
+            for worker in self.workers:
+                if worker.state in (READY, IDLE) and work_queue in worker.queues:
+                    worker.condition.notify()
+
+    def take(self, worker):
+        """Wait for the next item of worker, returns (queue, item) or None once
+        the pool stops.
+        """
+        with self.lock:
+            while not self.stopping:
+                for work_queue in worker.queues:
+                    try:
+                        item = work_queue.get_nowait()
+                    except queue.Empty:
+                        continue
+
+                    self.set_state(worker, BUSY)
+
+                    return work_queue, item
+
+                if worker.state == BUSY:
+                    self.set_state(worker, READY)
+
+                if worker.state == READY and self.drained():
+                    worker.release()
+                    self.set_state(worker, IDLE)
+
+                worker.condition.wait()
+
+    def set_state(self, worker, state):
+        if worker.state == state:
+            return
+
+        worker.state = state
+
+        if state == READY and self.drained():
+            # The burst is over, the others can let go of their connections too
+            for other in self.workers:
+                if other.state == READY:
+                    other.condition.notify()
+
+        if state in (IDLE, STOPPED):
+            self.notify()
+
+    def drained(self):
+        """Every queue is empty and no worker is busy."""
+        with self.lock:
+            return not any(worker.state == BUSY for worker in self.workers) and not any(
+                work_queue.qsize() for work_queue in self.queues
+            )
+
+    def idle(self):
+        """Drained, and every worker let go of its connections."""
+        with self.lock:
+            return self.drained() and all(
+                worker.state in (IDLE, STOPPED) for worker in self.workers
+            )
+
+    def notify(self):
+        """Wake the owner in wait()."""
+        with self.lock:
+            self.signalled = True
+            self.changed.notify_all()
+
+    def wait(self, timeout=None):
+        """Sleep until notify(), a worker changes state or timeout seconds pass.
+        No timeout sleeps until something happens.
+        """
+        with self.lock:
+            if not self.signalled:
+                self.changed.wait(timeout)
+
+            self.signalled = False
+
+    def stop(self):
+        """Let the workers finish their item and exit."""
+        with self.lock:
+            self.stopping = True
+
+            for worker in self.workers:
+                worker.condition.notify()
+
+        LOG.info("--<[ pool ] %s workers", len(self.workers))
+
+
+class PoolWorker(threading.Thread, metaclass=ABCMeta):
+    """A thread of a WorkerPool working the items of queues, the first queue
+    with an item goes first. Subclasses implement work().
+    """
+
+    state = IDLE
+    stack = None
+
+    def __init__(self, pool, queues):
+
+        self.pool = pool
+        self.queues = list(queues)
+        self.condition = threading.Condition(pool.lock)
+        threading.Thread.__init__(self)
+
+    def run(self):
+
+        try:
+            while True:
+                work = self.pool.take(self)
+
+                if work is None:
+                    break
+
+                try:
+                    if self.work(*work):
+                        break
+                except Exception as error:
+                    LOG.exception(error)
+        finally:
+            with self.pool.lock:
+                self.release()
+                self.pool.set_state(self, STOPPED)
+
+            LOG.info("--<[ pool/%s ] %s", type(self).__name__, id(self))
+
+    @abstractmethod
+    def work(self, work_queue, item):
+        """Work item taken from work_queue, returns True to stop the worker."""
+
+    def enter(self, context):
+        """Enter context and keep it until the burst is over."""
+        if self.stack is None:
+            self.stack = ExitStack()
+
+        return self.stack.enter_context(context)
+
+    def release(self):
+        """Exit what was entered during the burst."""
+        if self.stack is not None:
+            stack, self.stack = self.stack, None
+            stack.close()
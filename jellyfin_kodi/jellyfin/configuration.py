@@ -14,6 +14,7 @@ from ..helper import LazyLogger
 LOG = LazyLogger(__name__)
 DEFAULT_HTTP_MAX_RETRIES = 3
 DEFAULT_HTTP_TIMEOUT = 30
+DEFAULT_HTTP_POOL_SIZE = 10
 
 #################################################################################################
 
@@ -58,9 +59,11 @@ class Config(object):
         user_agent=None,
         max_retries=DEFAULT_HTTP_MAX_RETRIES,
         timeout=DEFAULT_HTTP_TIMEOUT,
+        pool_size=DEFAULT_HTTP_POOL_SIZE,
     ):
 
         LOG.debug("Begin http constructor.")
         self.data["http.max_retries"] = max_retries
         self.data["http.timeout"] = timeout
+        self.data["http.pool_size"] = pool_size
         self.data["http.user_agent"] = user_agent
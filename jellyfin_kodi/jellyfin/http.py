@@ -10,16 +10,42 @@ import requests
 
 from ..helper.utils import JsonDebugPrinter
 from ..helper import LazyLogger
+from ..helper.metrics import metrics
 from ..helper.exceptions import HTTPException
-from .utils import clean_none_dict_values
+from .configuration import DEFAULT_HTTP_POOL_SIZE
+from .utils import clean_none_dict_values, stream_json_list
 
 #################################################################################################
 
 LOG = LazyLogger(__name__)
+STREAM_CHUNK_SIZE = 64 * 1024
 
 #################################################################################################
 
 
+class PooledAdapter(requests.adapters.HTTPAdapter):
+    """Keep-alive connection pool of a server session, counting how many
+    connections were opened and how many requests reused one.
+    """
+
+    def __init__(self, pool_size, max_retries):
+        requests.adapters.HTTPAdapter.__init__(
+            self, pool_maxsize=pool_size, max_retries=max_retries
+        )
+
+    def stats(self):
+        opened = requests_sent = 0
+
+        for key in self.poolmanager.pools.keys():
+            pool = self.poolmanager.pools.get(key)
+
+            if pool is not None:
+                opened += pool.num_connections
+                requests_sent += pool.num_requests
+
+        return {"opened": opened, "reused": max(requests_sent - opened, 0)}
+
+
 class HTTP(object):
 
     session = None
@@ -31,16 +57,16 @@ class HTTP(object):
         self.config = client.config
 
     def start_session(self):
-
+        """One session per server, shared by every thread talking to it.
+        The pool is sized by http.pool_size so concurrent paging threads
+        keep their connections instead of discarding them.
+        """
         self.session = requests.Session()
 
         max_retries = self.config.data["http.max_retries"]
-        self.session.mount(
-            "http://", requests.adapters.HTTPAdapter(max_retries=max_retries)
-        )
-        self.session.mount(
-            "https://", requests.adapters.HTTPAdapter(max_retries=max_retries)
-        )
+        pool_size = self.config.data.get("http.pool_size", DEFAULT_HTTP_POOL_SIZE)
+        self.session.mount("http://", PooledAdapter(pool_size, max_retries))
+        self.session.mount("https://", PooledAdapter(pool_size, max_retries))
 
     def stop_session(self):
 
@@ -48,11 +74,25 @@ class HTTP(object):
             return
 
         try:
-            LOG.info("--<[ session/%s ]", id(self.session))
+            LOG.info("--<[ session/%s ] %s", id(self.session), self.connection_stats())
             self.session.close()
         except Exception as error:
             LOG.warning("The requests session could not be terminated: %s", error)
 
+    def connection_stats(self):
+        """Connections opened and reused by the current session."""
+        stats = {"opened": 0, "reused": 0}
+
+        if self.session is None:
+            return stats
+
+        for adapter in self.session.adapters.values():
+            if isinstance(adapter, PooledAdapter):
+                for key, value in adapter.stats().items():
+                    stats[key] += value
+
+        return stats
+
     def _replace_user_info(self, string):
 
         if "{server}" in string:
@@ -79,6 +119,9 @@ class HTTP(object):
         json: request body (optional)
         headers: (optional),
         verify: ssl certificate, True (verify using device built-in library) or False
+        stream_items: return {"Items": generator} decoding the items as they arrive (optional)
+        retry: attempts left after a failure (optional)
+        server_retry: attempts left after a read timeout or 502, defaults to retry (optional)
         """
         if not data:
             raise AttributeError("Request cannot be empty")
@@ -86,17 +129,30 @@ class HTTP(object):
         data = self._request(data)
         LOG.debug("--->[ http ] %s", JsonDebugPrinter(data))
         retry = data.pop("retry", 5)
+        server_retry = data.pop("server_retry", retry)
+        stream = data.pop("stream_items", False)
+
+        if stream:
+            data["stream"] = True
 
         while True:
 
             try:
-                r = self._requests(
-                    session or self.session or requests, data.pop("type", "GET"), **data
-                )
-                r.content  # release the connection
-
-                if not self.keep_alive and self.session is not None:
-                    self.stop_session()
+                with metrics.timer("http"):
+                    r = self._requests(
+                        session or self.session or requests,
+                        data.pop("type", "GET"),
+                        **data
+                    )
+                if not stream:
+                    r.content  # release the connection
+
+                    if not self.keep_alive and self.session is not None:
+                        self.stop_session()
+                elif not r.ok:
+                    # Nothing is streamed from an error, release the connection
+                    r.content
+                    r.close()
 
                 r.raise_for_status()
 
@@ -117,9 +173,9 @@ class HTTP(object):
                 raise HTTPException("ServerUnreachable", error)
 
             except requests.exceptions.ReadTimeout as error:
-                if retry:
+                if server_retry:
 
-                    retry -= 1
+                    server_retry -= 1
                     time.sleep(1)
 
                     continue
@@ -163,9 +219,9 @@ class HTTP(object):
                     return
 
                 elif r.status_code == 502:
-                    if retry:
+                    if server_retry:
 
-                        retry -= 1
+                        server_retry -= 1
                         time.sleep(1)
 
                         continue
@@ -179,10 +235,19 @@ class HTTP(object):
                 )
 
             else:
+                if stream:
+                    self.config.data["server-time"] = r.headers.get("Date")
+                    LOG.debug("---<[ http ][stream]")
+
+                    return {"Items": self._stream_items(r)}
+
                 try:
                     self.config.data["server-time"] = r.headers.get("Date")
                     elapsed = int(r.elapsed.total_seconds() * 1000)
-                    response = r.json()
+
+                    with metrics.timer("json"):
+                        response = r.json()
+
                     LOG.debug("---<[ http ][%s ms]", elapsed)
                     LOG.debug(JsonDebugPrinter(response))
 
@@ -193,6 +258,63 @@ class HTTP(object):
                     # Empty json
                     return
 
+    def _stream_items(self, r):
+        """Items of a streamed response, the connection is released once
+        they are consumed or the generator is closed.
+
+        The body is read after request() returned, a read failing halfway or a
+        truncated body raises HTTPException("ReadTimeout") so the caller can
+        fetch what is left again.
+        """
+        try:
+            if metrics.enabled:
+                yield from self._timed_stream_items(r)
+            else:
+                for item in stream_json_list(r.iter_content(STREAM_CHUNK_SIZE)):
+                    yield item
+        except (requests.exceptions.RequestException, ValueError) as error:
+            LOG.error("--[ http ][stream] %s", error)
+
+            raise HTTPException("ReadTimeout", error)
+        finally:
+            r.close()
+
+    def _timed_stream_items(self, r):
+        """Streamed items, the time spent waiting on the network is recorded
+        apart from the time spent decoding.
+        """
+        network = [0.0]
+
+        def chunks():
+            content = r.iter_content(STREAM_CHUNK_SIZE)
+
+            while True:
+                started = time.perf_counter()
+                chunk = next(content, None)
+                network[0] += time.perf_counter() - started
+
+                if chunk is None:
+                    return
+
+                yield chunk
+
+        items = stream_json_list(chunks())
+
+        while True:
+            waited = network[0]
+            started = time.perf_counter()
+            item = next(items, None)
+            elapsed = time.perf_counter() - started
+            waited = network[0] - waited
+
+            metrics.record("http.stream", waited)
+            metrics.record("json.stream", elapsed - waited)
+
+            if item is None:
+                return
+
+            yield item
+
     def _request(self, data):
 
         if "url" not in data:
@@ -1,6 +1,11 @@
+import codecs
+import json
+import re
 from collections import namedtuple
 from collections.abc import Iterable, Mapping, MutableMapping
 
+SEPARATORS = re.compile(r"[\s,]*")
+
 
 def clean_none_dict_values(obj):
     """
@@ -43,6 +48,61 @@ def clean_none_dict_values(obj):
     return obj
 
 
+def _drop_none(pairs):
+    return {key: value for key, value in pairs if value is not None}
+
+
+def stream_json_list(chunks, key="Items"):
+    """
+    Yield the elements of the top level list `key` of a JSON object while
+    the chunks (bytes) arrive, without holding the whole document.
+    Keys with a value of None are dropped while decoding, the same result
+    as clean_none_dict_values on the loaded response.
+    """
+    decoder = json.JSONDecoder(object_pairs_hook=_drop_none)
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    marker = '"%s"' % key
+    buffer = ""
+    position = 0
+    started = False
+
+    for chunk in chunks:
+        buffer = buffer[position:] + utf8.decode(chunk)
+        position = 0
+
+        if not started:
+            index = buffer.find(marker)
+            bracket = buffer.find("[", index + len(marker)) if index != -1 else -1
+
+            if bracket == -1:
+                # Keep the marker, or enough to match one split across chunks
+                position = index if index != -1 else max(len(buffer) - len(marker), 0)
+                continue
+
+            position = bracket + 1
+            started = True
+
+        while True:
+            position = SEPARATORS.match(buffer, position).end()
+
+            if position == len(buffer):
+                break
+
+            if buffer[position] == "]":
+                return
+
+            try:
+                value, position = decoder.raw_decode(buffer, position)
+            except ValueError:
+                # Element not complete yet
+                break
+
+            yield value
+
+    if started:
+        raise ValueError("Truncated JSON list %s" % key)
+
+
 def sqlite_namedtuple_factory(cursor, row):
     """
     Usage:
@@ -4,6 +4,8 @@ from __future__ import division, absolute_import, print_function, unicode_litera
 ##################################################################################################
 
 import threading
+import time
+from abc import abstractmethod
 from datetime import datetime, timedelta
 
 import queue
@@ -11,14 +13,29 @@ import queue
 import xbmc
 import xbmcgui
 
+from .changes import (
+    PendingChanges,
+    WriterLock,
+    batches,
+    UPDATED,
+    USERDATA,
+    REMOVED,
+)
 from .objects import Movies, TVShows, MusicVideos, Music
+from .objects.utils import Lookups
 from .objects.kodi import Movies as KodiDb
-from .database import Database, jellyfin_db, get_sync, save_sync
+from .database import Database, jellyfin_db, get_sync, save_sync, JELLYFIN_DB_VERSION
 from .full_sync import FullSync
 from .views import Views
-from .downloader import GetItemWorker
+from .downloader import (
+    GetItemWorker,
+    get_date_modified,
+    get_userdata_date_modified,
+)
 from .helper import translate, api, stop, settings, window, dialog, event, LazyLogger
-from .helper.utils import split_list, set_screensaver, get_screensaver
+from .helper.utils import set_screensaver, get_screensaver
+from .helper.metrics import metrics
+from .helper.pool import WorkerPool, PoolWorker
 from .helper.exceptions import (
     LibraryException,
     LibraryExitException,
@@ -29,9 +46,12 @@ from .jellyfin import Jellyfin
 ##################################################################################################
 
 LOG = LazyLogger(__name__)
-LIMIT = int(settings("limitIndex") or 15)
+# Ids per item request, bounded by the url length rather than memory
+LIMIT = min(int(settings("limitIndex") or 15), 100)
 DTHREADS = int(settings("limitThreads") or 3)
-TARGET_DB_VERSION = 1
+# Items a writer commits per hold of the database lock
+BATCH = 50
+MUSIC = ("Audio", "MusicArtist", "AlbumArtist", "MusicAlbum")
 
 ##################################################################################################
 
@@ -53,35 +73,34 @@ class Library(threading.Thread):
         self.monitor = monitor
         self.player = monitor.monitor.player
         self.server = Jellyfin().get_client()
-        self.updated_queue = queue.Queue()
-        self.userdata_queue = queue.Queue()
-        self.removed_queue = queue.Queue()
+        self.lookups = Lookups(self.server)
+        self.changes = PendingChanges()
+        self.pool = WorkerPool()
+        self.updated_queue = self.pool.queue()
+        self.userdata_queue = self.pool.queue()
+        self.removed_queue = self.pool.queue()
         self.updated_output = self.__new_queues__()
         self.userdata_output = self.__new_queues__()
         self.removed_output = self.__new_queues__()
-        self.notify_output = queue.Queue()
+        self.notify_output = self.pool.queue()
 
-        self.jellyfin_threads = []
-        self.download_threads = []
-        self.notify_threads = []
-        self.writer_threads = {"updated": [], "userdata": [], "removed": []}
-        self.database_lock = threading.Lock()
-        self.music_database_lock = threading.Lock()
+        self.database_lock = WriterLock()
+        self.music_database_lock = WriterLock()
 
         threading.Thread.__init__(self)
 
     def __new_queues__(self):
         return {
-            "Movie": queue.Queue(),
-            "BoxSet": queue.Queue(),
-            "MusicVideo": queue.Queue(),
-            "Series": queue.Queue(),
-            "Season": queue.Queue(),
-            "Episode": queue.Queue(),
-            "MusicAlbum": queue.Queue(),
-            "MusicArtist": queue.Queue(),
-            "AlbumArtist": queue.Queue(),
-            "Audio": queue.Queue(),
+            "Movie": self.pool.queue(),
+            "BoxSet": self.pool.queue(),
+            "MusicVideo": self.pool.queue(),
+            "Series": self.pool.queue(),
+            "Season": self.pool.queue(),
+            "Episode": self.pool.queue(),
+            "MusicAlbum": self.pool.queue(),
+            "MusicArtist": self.pool.queue(),
+            "AlbumArtist": self.pool.queue(),
+            "Audio": self.pool.queue(),
         }
 
     def run(self):
@@ -93,23 +112,48 @@ class Library(threading.Thread):
 
         window("jellyfin_startup.bool", True)
 
-        while not self.stop_thread:
+        try:
+            while not self.stop_thread:
 
-            try:
-                self.service()
-            except LibraryException as error:
-                LOG.warning(error)
-                break
-            except Exception as error:
-                LOG.exception(error)
+                try:
+                    self.service()
+                except LibraryException as error:
+                    LOG.warning(error)
+                    break
+                except Exception as error:
+                    LOG.exception(error)
 
-                break
+                    break
 
-            if self.monitor.waitForAbort(2):
-                break
+                self.wait()
+        finally:
+            self.pool.stop()
 
         LOG.info("---<[ library ]")
 
+    def wait(self):
+        """Sleep until the service has something to do. While idle only new
+        changes or stop_client() wake it up, nothing runs on a timer.
+        """
+        timeouts = []
+        due = self.changes.due()
+
+        if due is not None:
+            timeouts.append(due if self.sync_allowed() else 2)
+
+        if self.pending_refresh:
+            # Progress of the running sync
+            timeouts.append(2)
+
+        self.pool.wait(min(timeouts) if timeouts else None)
+
+    def sync_allowed(self):
+        return (
+            not self.player.isPlayingVideo()
+            or settings("syncDuringPlay.bool")
+            or xbmc.getCondVisibility("VideoPlayer.Content(livetv)")
+        )
+
     def test_databases(self):
         """Open the databases to test if the file exists."""
         with Database("video"), Database("music"):
@@ -125,7 +169,7 @@ class Library(threading.Thread):
 
             if not db_version:
                 # Make sure we always have a version in the database
-                db.add_version((TARGET_DB_VERSION))
+                db.add_version(JELLYFIN_DB_VERSION)
 
         # Video Database Migrations
         with Database("video") as videodb:
@@ -138,35 +182,15 @@ class Library(threading.Thread):
     @stop
     def service(self):
         """If error is encountered, it will rerun this function.
-        Start new "daemon threads" to process library updates.
-        (actual daemon thread is not supported in Kodi)
+        Hand the pending changes to the workers and follow the sync progress.
         """
-        self.download_threads = [
-            thread for thread in self.download_threads if not thread.is_done
-        ]
-        self.writer_threads["updated"] = [
-            thread for thread in self.writer_threads["updated"] if not thread.is_done
-        ]
-        self.writer_threads["userdata"] = [
-            thread for thread in self.writer_threads["userdata"] if not thread.is_done
-        ]
-        self.writer_threads["removed"] = [
-            thread for thread in self.writer_threads["removed"] if not thread.is_done
-        ]
+        if self.sync_allowed():
 
-        if (
-            not self.player.isPlayingVideo()
-            or settings("syncDuringPlay.bool")
-            or xbmc.getCondVisibility("VideoPlayer.Content(livetv)")
-        ):
-
-            self.worker_downloads()
-            self.worker_sort()
+            if metrics.enabled:
+                self.sample_queues()
 
-            self.worker_updates()
-            self.worker_userdata()
-            self.worker_remove()
-            self.worker_notify()
+            self.start_workers()
+            self.queue_changes()
 
         if self.pending_refresh:
             window("jellyfin_sync.bool", True)
@@ -219,13 +243,7 @@ class Library(threading.Thread):
                 self.screensaver = get_screensaver()
                 set_screensaver(value="")
 
-        if (
-            self.pending_refresh
-            and not self.download_threads
-            and not self.writer_threads["updated"]
-            and not self.writer_threads["userdata"]
-            and not self.writer_threads["removed"]
-        ):
+        if self.pending_refresh and not len(self.changes) and self.pool.idle():
             self.pending_refresh = False
             self.save_last_sync()
             self.total_updates = 0
@@ -254,6 +272,7 @@ class Library(threading.Thread):
 
     def stop_client(self):
         self.stop_thread = True
+        self.pool.notify()
 
     def enable_pending_refresh(self):
         """When there's an active thread. Let the main thread know."""
@@ -275,124 +294,82 @@ class Library(threading.Thread):
 
         return total
 
-    def worker_downloads(self):
-        """Get items from jellyfin and place them in the appropriate queues."""
-        for work_queue in (
-            (self.updated_queue, self.updated_output),
-            (self.userdata_queue, self.userdata_output),
+    def sample_queues(self):
+        """Record how deep the queues in front of the writers get."""
+        for name, queues in (
+            ("updated", self.updated_output),
+            ("userdata", self.userdata_output),
+            ("removed", self.removed_output),
         ):
-            if work_queue[0].qsize() and len(self.download_threads) < DTHREADS:
+            for media in queues:
+                metrics.queue_depth("%s.%s" % (name, media), queues[media].qsize())
 
-                new_thread = GetItemWorker(self.server, work_queue[0], work_queue[1])
-                new_thread.start()
-                LOG.info("-->[ q:download/%s ]", id(new_thread))
-                self.download_threads.append(new_thread)
+    def queue_changes(self):
+        """Hand the coalesced server changes to the download and sort workers."""
+        changes = self.changes.take()
 
-    def worker_sort(self):
-        """Get items based on the local jellyfin database and place item in appropriate queues."""
-        if self.removed_queue.qsize() and len(self.jellyfin_threads) < 2:
+        if changes is None:
+            return
 
-            new_thread = SortWorker(self.removed_queue, self.removed_output)
-            new_thread.start()
-            LOG.info("-->[ q:sort/%s ]", id(new_thread))
+        updated, userdata, removed = changes
 
-    def worker_updates(self):
-        """Update items in the Kodi database."""
-        for queues in self.updated_output:
-            queue = self.updated_output[queues]
+        for item_ids in batches(updated, LIMIT, DTHREADS):
+            self.updated_queue.put(item_ids)
 
-            if queue.qsize() and not len(self.writer_threads["updated"]):
+        for item_ids in batches(userdata, LIMIT, DTHREADS):
+            self.userdata_queue.put(item_ids)
 
-                if queues in ("Audio", "MusicArtist", "AlbumArtist", "MusicAlbum"):
-                    new_thread = UpdateWorker(
-                        queue,
-                        self.notify_output,
-                        self.music_database_lock,
-                        "music",
-                        self.server,
-                        self.direct_path,
-                    )
-                else:
-                    new_thread = UpdateWorker(
-                        queue,
-                        self.notify_output,
-                        self.database_lock,
-                        "video",
-                        self.server,
-                        self.direct_path,
-                    )
+        for item_id in removed:
+            self.removed_queue.put(item_id)
 
-                new_thread.start()
-                LOG.info("-->[ q:updated/%s/%s ]", queues, id(new_thread))
-                self.writer_threads["updated"].append(new_thread)
-                self.enable_pending_refresh()
+        self.total_updates += len(updated) + len(userdata) + len(removed)
+        self.enable_pending_refresh()
 
-    def worker_userdata(self):
-        """Update userdata in the Kodi database."""
-        for queues in self.userdata_output:
-            queue = self.userdata_output[queues]
-
-            if queue.qsize() and not len(self.writer_threads["userdata"]):
-
-                if queues in ("Audio", "MusicArtist", "AlbumArtist", "MusicAlbum"):
-                    new_thread = UserDataWorker(
-                        queue,
-                        self.music_database_lock,
-                        "music",
-                        self.server,
-                        self.direct_path,
-                    )
-                else:
-                    new_thread = UserDataWorker(
-                        queue,
-                        self.database_lock,
-                        "video",
-                        self.server,
-                        self.direct_path,
-                    )
-
-                new_thread.start()
-                LOG.info("-->[ q:userdata/%s/%s ]", queues, id(new_thread))
-                self.writer_threads["userdata"].append(new_thread)
-                self.enable_pending_refresh()
+    def start_workers(self):
+        """Start the workers once, they wait for items as long as the library runs."""
+        if self.pool.workers:
+            return
 
-    def worker_remove(self):
-        """Remove items from the Kodi database."""
-        for queues in self.removed_output:
-            queue = self.removed_output[queues]
+        userdata = (self.userdata_queue, self.userdata_output, None)
+        updated = (self.updated_queue, self.updated_output, self.lookups)
 
-            if queue.qsize() and not len(self.writer_threads["removed"]):
+        for _ in range(DTHREADS):
+            self.pool.add(GetItemWorker(self.pool, self.server, [userdata, updated]))
 
-                if queues in ("Audio", "MusicArtist", "AlbumArtist", "MusicAlbum"):
-                    new_thread = RemovedWorker(
-                        queue,
-                        self.music_database_lock,
-                        "music",
-                        self.server,
-                        self.direct_path,
-                    )
-                else:
-                    new_thread = RemovedWorker(
-                        queue,
-                        self.database_lock,
-                        "video",
-                        self.server,
-                        self.direct_path,
-                    )
+        # Userdata gets a thread of its own rather than wait for the update
+        self.pool.add(GetItemWorker(self.pool, self.server, [userdata]))
+        self.pool.add(SortWorker(self.pool, self.removed_queue, self.removed_output))
 
-                new_thread.start()
-                LOG.info("-->[ q:removed/%s/%s ]", queues, id(new_thread))
-                self.writer_threads["removed"].append(new_thread)
-                self.enable_pending_refresh()
+        for database, lock in (
+            ("video", self.database_lock),
+            ("music", self.music_database_lock),
+        ):
+            args = (lock, database, self.server, self.direct_path)
+            userdata = self.database_queues(self.userdata_output, database)
+            removed = self.database_queues(self.removed_output, database)
+
+            self.pool.add(UserDataWorker(self.pool, userdata, *args))
+            self.pool.add(RemovedWorker(self.pool, removed, *args))
+            self.pool.add(
+                UpdateWorker(
+                    self.pool,
+                    self.database_queues(self.updated_output, database),
+                    self.notify_output,
+                    *args,
+                    lookups=self.lookups
+                )
+            )
 
-    def worker_notify(self):
-        """Notify the user of new additions."""
-        if self.notify_output.qsize() and not len(self.notify_threads):
+        self.pool.add(NotifyWorker(self.pool, self.notify_output, self.player))
 
-            new_thread = NotifyWorker(self.notify_output, self.player)
-            new_thread.start()
-            LOG.info("-->[ q:notify/%s ]", id(new_thread))
-            self.notify_threads.append(new_thread)
+    @staticmethod
+    def database_queues(output, database):
+        """The queues of output written to the video or music database."""
+        return [
+            output[media]
+            for media in output
+            if (media in MUSIC) == (database == "music")
+        ]
 
     def startup(self):
         """Run at startup.
@@ -436,11 +413,21 @@ class Library(threading.Thread):
 
                     LOG.info("--<[ retrieve changes ]")
 
+                    return True
+
                 # is False
                 else:
                     dialog("ok", "{jellyfin}", translate(33099))
                     settings("kodiCompanion.bool", False)
-                    return True
+
+            if settings("SyncInstallRunDone.bool"):
+
+                if not self.delta_sync():
+                    dialog("ok", "{jellyfin}", translate(33128))
+
+                    raise Exception("Failed to retrieve latest updates")
+
+                LOG.info("--<[ retrieve changes ]")
 
             return True
 
@@ -530,6 +517,69 @@ class Library(threading.Thread):
 
         return True
 
+    def delta_sync(self):
+        """Without the Kodi Sync Queue plugin, ask each synced library for the
+        items saved since the last sync. Costs one page per changed batch
+        instead of a download of the whole library.
+
+        Removed items are not reported by the server this way, they are
+        picked up by the next library update.
+        """
+        last_sync = settings("LastIncrementalSync")
+
+        if not last_sync:
+            return True
+
+        sync = get_sync()
+        whitelist = [x.replace("Mixed:", "") for x in sync["Whitelist"]]
+        LOG.info("--[ retrieve changes/delta ] %s", last_sync)
+
+        try:
+            updated = []
+            userdata = []
+
+            for library_id in whitelist:
+                for items in get_date_modified(library_id, last_sync):
+                    updated.extend(item["Id"] for item in items["Items"])
+
+                for items in get_userdata_date_modified(library_id, last_sync):
+                    userdata.extend(item["Id"] for item in items["Items"])
+
+            # A full update writes the userdata as well
+            updated = list(dict.fromkeys(updated))
+            known = set(updated)
+            userdata = [
+                {"ItemId": item_id}
+                for item_id in dict.fromkeys(userdata)
+                if item_id not in known
+            ]
+
+            total = len(updated) + len(userdata)
+
+            if total > int(settings("syncIndicator") or 99):
+
+                """Inverse yes no, in case the dialog is forced closed by Kodi."""
+                if dialog(
+                    "yesno",
+                    "{jellyfin}",
+                    translate(33172).replace("{number}", str(total)),
+                    nolabel=translate(107),
+                    yeslabel=translate(106),
+                ):
+                    LOG.warning("Large updates skipped.")
+
+                    return True
+
+            self.updated(updated)
+            self.userdata(userdata)
+
+        except Exception as error:
+            LOG.exception(error)
+
+            return False
+
+        return True
+
     def save_last_sync(self):
         _raw_time = self.server.config.data["server-time"]
 
@@ -657,364 +707,306 @@ class Library(threading.Thread):
         return True
 
     def userdata(self, data):
-        """Add item_id to userdata queue."""
+        """Add item_id to the pending userdata changes."""
         if not data:
             return
 
-        items = [x["ItemId"] for x in data]
-
-        for item in split_list(items, LIMIT):
-            self.userdata_queue.put(item)
-
-        self.total_updates += len(items)
-        LOG.info("---[ userdata:%s ]", len(items))
+        self.changes.userdata([x["ItemId"] for x in data])
+        self.pool.notify()
+        LOG.info("---[ userdata:%s ]", len(data))
 
     def updated(self, data):
-        """Add item_id to updated queue."""
+        """Add item_id to the pending updates."""
         if not data:
             return
 
-        for item in split_list(data, LIMIT):
-            self.updated_queue.put(item)
-
-        self.total_updates += len(data)
+        self.changes.updated(data)
+        self.pool.notify()
         LOG.info("---[ updated:%s ]", len(data))
 
     def removed(self, data):
-        """Add item_id to removed queue."""
+        """Add item_id to the pending removals."""
         if not data:
             return
 
-        for item in data:
-
-            if item in list(self.removed_queue.queue):
-                continue
-
-            self.removed_queue.put(item)
-
-        self.total_updates += len(data)
+        self.changes.removed(data)
+        self.pool.notify()
         LOG.info("---[ removed:%s ]", len(data))
 
 
-class UpdateWorker(threading.Thread):
+class WriterWorker(PoolWorker):
+    """Write the items of the queues to a Kodi database, one batch per hold of
+    the lock. Each batch is committed before the lock is released, so a more
+    urgent lane waits for the item being written instead of the whole queue.
+    The connections stay open until the burst is over.
+    """
 
-    is_done = False
+    lane = None
+    opened = None
 
-    def __init__(
-        self, queue, notify, lock, database, server=None, direct_path=None, *args
-    ):
-        self.queue = queue
-        self.notify_output = notify
-        self.notify = settings("newContent.bool")
+    def __init__(self, pool, queues, lock, database, server, direct_path):
+
+        PoolWorker.__init__(self, pool, queues)
         self.lock = lock
-        self.database = Database(database)
-        self.args = args
+        self.access = lock.lane(self.lane)
+        self.database = database
         self.server = server
         self.direct_path = direct_path
-        threading.Thread.__init__(self)
 
-    def run(self):
-        with self.lock, self.database as kodidb, Database("jellyfin") as jellyfindb:
-            default_args = (self.server, jellyfindb, kodidb, self.direct_path)
-            if kodidb.db_file == "video":
-                movies = Movies(*default_args)
-                tvshows = TVShows(*default_args)
-                musicvideos = MusicVideos(*default_args)
-            elif kodidb.db_file == "music":
-                music = Music(*default_args)
-            else:
-                # this should not happen
-                LOG.error(
-                    '"{}" is not a valid Kodi library type.'.format(kodidb.db_file)
-                )
-                return
-
-            while True:
-
-                try:
-                    item = self.queue.get(timeout=1)
-                except queue.Empty:
-                    break
-
-                try:
-                    LOG.debug("{} - {}".format(item["Type"], item["Name"]))
-                    if item["Type"] == "Movie":
-                        movies.movie(item)
-                    elif item["Type"] == "BoxSet":
-                        movies.boxset(item)
-                    elif item["Type"] == "Series":
-                        tvshows.tvshow(item)
-                    elif item["Type"] == "Season":
-                        tvshows.season(item)
-                    elif item["Type"] == "Episode":
-                        tvshows.episode(item)
-                    elif item["Type"] == "MusicVideo":
-                        musicvideos.musicvideo(item)
-                    elif item["Type"] == "MusicAlbum":
-                        music.album(item)
-                    elif item["Type"] == "MusicArtist":
-                        music.artist(item)
-                    elif item["Type"] == "AlbumArtist":
-                        music.albumartist(item)
-                    elif item["Type"] == "Audio":
-                        music.song(item)
-
-                    if self.notify:
-                        self.notify_output.put(
-                            (item["Type"], api.API(item).get_naming())
-                        )
-                except LibraryException as error:
-                    # TODO: Fixme; We're catching all LibraryException here,
-                    # but silently ignoring any that isn't the exit condition.
-                    # Investigate what would be appropriate behavior here.
-                    if isinstance(error, LibraryExitException):
-                        break
-                    LOG.warning("Ignoring exception %s", error)
-                except Exception as error:
-                    LOG.exception(error)
-
-                self.queue.task_done()
-
-                if window("jellyfin_should_stop.bool"):
-                    break
+    def writers(self, default_args):
+        """Create the objects writing the items of the database."""
+        if self.database == "video":
+            self.movies = Movies(*default_args)
+            self.tvshows = TVShows(*default_args)
+            self.musicvideos = MusicVideos(*default_args)
 
-        LOG.info("--<[ q:updated/%s ]", id(self))
-        self.is_done = True
+            return self.movies, self.tvshows, self.musicvideos
 
+        self.music = Music(*default_args)
 
-class UserDataWorker(threading.Thread):
+        return (self.music,)
 
-    is_done = False
+    @abstractmethod
+    def write(self, item):
+        """Write item to the Kodi database."""
 
-    def __init__(self, queue, lock, database, server, direct_path):
+    def work(self, work_queue, item):
+        start = time.time()
 
-        self.queue = queue
-        self.lock = lock
-        self.database = Database(database)
-        self.server = server
-        self.direct_path = direct_path
-
-        threading.Thread.__init__(self)
-
-    def run(self):
-
-        with self.lock, self.database as kodidb, Database("jellyfin") as jellyfindb:
-            default_args = (self.server, jellyfindb, kodidb, self.direct_path)
-            if kodidb.db_file == "video":
-                movies = Movies(*default_args)
-                tvshows = TVShows(*default_args)
-            elif kodidb.db_file == "music":
-                music = Music(*default_args)
-            else:
-                # this should not happen
-                LOG.error(
-                    '"{}" is not a valid Kodi library type.'.format(kodidb.db_file)
+        with metrics.acquire(self.access, "lock.%s" % self.database):
+            if self.opened is None:
+                self.kodidb = self.enter(Database(self.database))
+                self.jellyfindb = self.enter(Database("jellyfin"))
+                self.opened = self.writers(
+                    (self.server, self.jellyfindb, self.kodidb, self.direct_path)
                 )
-                return
-
-            while True:
-
-                try:
-                    item = self.queue.get(timeout=1)
-                except queue.Empty:
-                    break
+            elif self.access.changed:
+                for writer in self.opened:
+                    writer.forget_lookups()
 
-                try:
-                    if item["Type"] == "Movie":
-                        movies.userdata(item)
-                    elif item["Type"] in ["Series", "Season", "Episode"]:
-                        tvshows.userdata(item)
-                    elif item["Type"] == "MusicAlbum":
-                        music.album(item)
-                    elif item["Type"] == "MusicArtist":
-                        music.artist(item)
-                    elif item["Type"] == "AlbumArtist":
-                        music.albumartist(item)
-                    elif item["Type"] == "Audio":
-                        music.userdata(item)
-                except LibraryException as error:
-                    # TODO: Fixme; We're catching all LibraryException here,
-                    # but silently ignoring any that isn't the exit condition.
-                    # Investigate what would be appropriate behavior here.
-                    if isinstance(error, LibraryExitException):
-                        break
-                    LOG.warning("Ignoring exception %s", error)
-                except Exception as error:
-                    LOG.exception(error)
+            done = self.batch(work_queue, item)
 
-                self.queue.task_done()
+            with metrics.timer("commit"):
+                self.kodidb.conn.commit()
+                self.jellyfindb.conn.commit()
 
-                if window("jellyfin_should_stop.bool"):
-                    break
+        metrics.record("lane.%s" % self.lane, time.time() - start)
 
-        LOG.info("--<[ q:userdata/%s ]", id(self))
-        self.is_done = True
+        return done
 
+    def release(self):
+        self.opened = None
+        PoolWorker.release(self)
 
-class SortWorker(threading.Thread):
+    def batch(self, work_queue, item):
+        """Write item and the items queued behind it, up to BATCH items or until
+        a more urgent lane waits. Returns whether the worker should stop.
+        """
+        count = 0
 
-    is_done = False
+        while True:
 
-    def __init__(self, queue, output, *args):
+            count += 1
 
-        self.queue = queue
-        self.output = output
-        self.args = args
-        threading.Thread.__init__(self)
+            try:
+                self.write(item)
+            except LibraryException as error:
+                # TODO: Fixme; We're catching all LibraryException here,
+                # but silently ignoring any that isn't the exit condition.
+                # Investigate what would be appropriate behavior here.
+                if isinstance(error, LibraryExitException):
+                    work_queue.task_done()
 
-    def run(self):
+                    return True
+                LOG.warning("Ignoring exception %s", error)
+            except Exception as error:
+                LOG.exception(error)
 
-        with Database("jellyfin") as jellyfindb:
-            database = jellyfin_db.JellyfinDatabase(jellyfindb.cursor)
+            work_queue.task_done()
 
-            while True:
+            if window("jellyfin_should_stop.bool"):
+                return True
 
-                try:
-                    item_id = self.queue.get(timeout=1)
-                except queue.Empty:
-                    break
+            if self.access.preempted():
+                LOG.debug("--[ q:%s ] yield after %s items", self.lane, count)
 
-                try:
-                    media = database.get_media_by_id(item_id)
-                    if media:
-                        self.output[media].put({"Id": item_id, "Type": media})
-                    else:
-                        items = database.get_media_by_parent_id(item_id)
-
-                        if not items:
-                            LOG.info(
-                                "Could not find media %s in the jellyfin database.",
-                                item_id,
-                            )
-                        else:
-                            for item in items:
-                                self.output[item[1]].put(
-                                    {"Id": item[0], "Type": item[1]}
-                                )
-                except Exception as error:
-                    LOG.exception(error)
+                return False
 
-                self.queue.task_done()
+            if count == BATCH:
+                return False
 
-                if window("jellyfin_should_stop.bool"):
-                    break
+            try:
+                item = work_queue.get_nowait()
+            except queue.Empty:
+                return False
 
-        LOG.info("--<[ q:sort/%s ]", id(self))
-        self.is_done = True
 
+class UpdateWorker(WriterWorker):
 
-class RemovedWorker(threading.Thread):
+    lane = UPDATED
+    notify = False
 
-    is_done = False
+    def __init__(
+        self,
+        pool,
+        queues,
+        notify,
+        lock,
+        database,
+        server=None,
+        direct_path=None,
+        lookups=None,
+    ):
+        self.notify_output = notify
+        self.lookups = lookups
+        WriterWorker.__init__(self, pool, queues, lock, database, server, direct_path)
 
-    def __init__(self, queue, lock, database, server, direct_path):
+    def writers(self, default_args):
+        self.notify = settings("newContent.bool")
+        writers = WriterWorker.writers(self, default_args)
+
+        if self.lookups is not None:
+            for writer in writers:
+                writer.lookups = self.lookups
+
+        return writers
+
+    def write(self, item):
+
+        LOG.debug("{} - {}".format(item["Type"], item["Name"]))
+        if item["Type"] == "Movie":
+            self.movies.movie(item)
+        elif item["Type"] == "BoxSet":
+            self.movies.boxset(item)
+        elif item["Type"] == "Series":
+            self.tvshows.tvshow(item)
+        elif item["Type"] == "Season":
+            self.tvshows.season(item)
+        elif item["Type"] == "Episode":
+            self.tvshows.episode(item)
+        elif item["Type"] == "MusicVideo":
+            self.musicvideos.musicvideo(item)
+        elif item["Type"] == "MusicAlbum":
+            self.music.album(item)
+        elif item["Type"] == "MusicArtist":
+            self.music.artist(item)
+        elif item["Type"] == "AlbumArtist":
+            self.music.albumartist(item)
+        elif item["Type"] == "Audio":
+            self.music.song(item)
+
+        if self.notify:
+            self.notify_output.put((item["Type"], api.API(item).get_naming()))
+
+
+class UserDataWorker(WriterWorker):
+
+    lane = USERDATA
+
+    def write(self, item):
+
+        if item["Type"] == "Movie":
+            self.movies.userdata(item)
+        elif item["Type"] in ["Series", "Season", "Episode"]:
+            self.tvshows.userdata(item)
+        elif item["Type"] == "MusicAlbum":
+            self.music.album(item)
+        elif item["Type"] == "MusicArtist":
+            self.music.artist(item)
+        elif item["Type"] == "AlbumArtist":
+            self.music.albumartist(item)
+        elif item["Type"] == "Audio":
+            self.music.userdata(item)
+
+
+class SortWorker(PoolWorker):
+    """Find the items of the removed ids in the jellyfin database."""
+
+    database = None
+
+    def __init__(self, pool, queue, output):
+
+        PoolWorker.__init__(self, pool, [queue])
+        self.output = output
 
-        self.queue = queue
-        self.lock = lock
-        self.database = Database(database)
-        self.server = server
-        self.direct_path = direct_path
-        threading.Thread.__init__(self)
+    def work(self, work_queue, item_id):
 
-    def run(self):
+        if self.database is None:
+            jellyfindb = self.enter(Database("jellyfin"))
+            self.database = jellyfin_db.JellyfinDatabase(jellyfindb.cursor)
 
-        with self.lock, self.database as kodidb, Database("jellyfin") as jellyfindb:
-            default_args = (self.server, jellyfindb, kodidb, self.direct_path)
-            if kodidb.db_file == "video":
-                movies = Movies(*default_args)
-                tvshows = TVShows(*default_args)
-                musicvideos = MusicVideos(*default_args)
-            elif kodidb.db_file == "music":
-                music = Music(*default_args)
+        try:
+            media = self.database.get_media_by_id(item_id)
+            if media:
+                self.output[media].put({"Id": item_id, "Type": media})
             else:
-                # this should not happen
-                LOG.error(
-                    '"{}" is not a valid Kodi library type.'.format(kodidb.db_file)
-                )
-                return
-
-            while True:
+                items = self.database.get_media_by_parent_id(item_id)
 
-                try:
-                    item = self.queue.get(timeout=1)
-                except queue.Empty:
-                    break
+                if not items:
+                    LOG.info(
+                        "Could not find media %s in the jellyfin database.",
+                        item_id,
+                    )
+                else:
+                    for item in items:
+                        self.output[item[1]].put({"Id": item[0], "Type": item[1]})
+        except Exception as error:
+            LOG.exception(error)
 
-                if item["Type"] == "Movie":
-                    obj = movies.remove
-                elif item["Type"] in ["Series", "Season", "Episode"]:
-                    obj = tvshows.remove
-                elif item["Type"] in [
-                    "MusicAlbum",
-                    "MusicArtist",
-                    "AlbumArtist",
-                    "Audio",
-                ]:
-                    obj = music.remove
-                elif item["Type"] == "MusicVideo":
-                    obj = musicvideos.remove
+        work_queue.task_done()
 
-                try:
-                    obj(item["Id"])
-                except LibraryException as error:
-                    # TODO: Fixme; We're catching all LibraryException here,
-                    # but silently ignoring any that isn't the exit condition.
-                    # Investigate what would be appropriate behavior here.
-                    if isinstance(error, LibraryExitException):
-                        break
-                    LOG.warning("Ignoring exception %s", error)
-                except Exception as error:
-                    LOG.exception(error)
-                finally:
-                    self.queue.task_done()
+        return window("jellyfin_should_stop.bool")
 
-                if window("jellyfin_should_stop.bool"):
-                    break
-
-        LOG.info("--<[ q:removed/%s ]", id(self))
-        self.is_done = True
+    def release(self):
+        self.database = None
+        PoolWorker.release(self)
 
 
-class NotifyWorker(threading.Thread):
+class RemovedWorker(WriterWorker):
 
-    is_done = False
+    lane = REMOVED
 
-    def __init__(self, queue, player):
+    def write(self, item):
 
-        self.queue = queue
-        self.video_time = int(settings("newvideotime")) * 1000
-        self.music_time = int(settings("newmusictime")) * 1000
-        self.player = player
-        threading.Thread.__init__(self)
+        if item["Type"] == "Movie":
+            self.movies.remove(item["Id"])
+        elif item["Type"] in ["Series", "Season", "Episode"]:
+            self.tvshows.remove(item["Id"])
+        elif item["Type"] in [
+            "MusicAlbum",
+            "MusicArtist",
+            "AlbumArtist",
+            "Audio",
+        ]:
+            self.music.remove(item["Id"])
+        elif item["Type"] == "MusicVideo":
+            self.musicvideos.remove(item["Id"])
 
-    def run(self):
 
-        while True:
+class NotifyWorker(PoolWorker):
+    def __init__(self, pool, queue, player):
 
-            try:
-                item = self.queue.get(timeout=3)
-            except queue.Empty:
-                break
+        PoolWorker.__init__(self, pool, [queue])
+        self.player = player
 
-            time = self.music_time if item[0] == "Audio" else self.video_time
+    def work(self, work_queue, item):
 
-            if time and (
-                not self.player.isPlayingVideo()
-                or xbmc.getCondVisibility("VideoPlayer.Content(livetv)")
-            ):
-                dialog(
-                    "notification",
-                    heading="%s %s" % (translate(33049), item[0]),
-                    message=item[1],
-                    icon="{jellyfin}",
-                    time=time,
-                    sound=False,
-                )
+        time = int(settings("newmusictime" if item[0] == "Audio" else "newvideotime"))
+        time *= 1000
 
-            self.queue.task_done()
+        if time and (
+            not self.player.isPlayingVideo()
+            or xbmc.getCondVisibility("VideoPlayer.Content(livetv)")
+        ):
+            dialog(
+                "notification",
+                heading="%s %s" % (translate(33049), item[0]),
+                message=item[1],
+                icon="{jellyfin}",
+                time=time,
+                sound=False,
+            )
 
-            if window("jellyfin_should_stop.bool"):
-                break
+        work_queue.task_done()
 
-        LOG.info("--<[ q:notify/%s ]", id(self))
-        self.is_done = True
+        return window("jellyfin_should_stop.bool")
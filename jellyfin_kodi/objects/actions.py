@@ -6,6 +6,7 @@ from __future__ import division, absolute_import, print_function, unicode_litera
 import threading
 import sys
 import json
+import time
 from datetime import timedelta
 
 import xbmc
@@ -58,6 +59,7 @@ class Actions(object):
         self.server = self.api_client.config.data["auth.server"]
 
         self.stack = []
+        self.prefetch = playutils.Prefetch()
 
     def get_playlist(self, item):
 
@@ -70,15 +72,23 @@ class Actions(object):
         """Play requested item"""
         listitem = xbmcgui.ListItem()
         LOG.info("[ play/%s ] %s", item["Id"], item["Name"])
+        requested = time.time()
+        self.prefetch_play(item)
 
-        transcode = transcode or settings("playFromTranscode.bool")
-        play = playutils.PlayUtils(
-            item, transcode, self.server_id, self.server, self.api_client
-        )
-        source = play.select_source(play.get_sources())
-        play.set_external_subs(source, listitem)
+        try:
+            transcode = transcode or settings("playFromTranscode.bool")
+            play = playutils.PlayUtils(
+                item, transcode, self.server_id, self.server, self.api_client
+            )
+            source = play.select_source(play.get_sources())
+            play.set_external_subs(source, listitem)
+            item["PlaybackInfo"]["Requested"] = requested
 
-        self.set_playlist(item, listitem, db_id, transcode)
+            self.set_playlist(item, listitem, db_id, transcode)
+        finally:
+            self.prefetch.close()
+
+        LOG.info("--[ prepared play/%s ] %.3fs", item["Id"], time.time() - requested)
 
         # Using playlist approach for Cinema mode
         if len(self.stack) > 1:
@@ -89,6 +99,21 @@ class Actions(object):
             if len(sys.argv) > 1:
                 xbmcplugin.setResolvedUrl(int(sys.argv[1]), True, self.stack[0][1])
 
+    def prefetch_play(self, item):
+        """Send what the play will need along with its PlaybackInfo."""
+        if settings("enableCinema.bool") and not item.get("resumePlayback"):
+            self.prefetch.submit("intros", self.api_client.get_intros, item["Id"])
+
+        if item.get("PartCount"):
+            self.prefetch.submit(
+                "parts", self.api_client.get_additional_parts, item["Id"]
+            )
+
+        if item["MediaType"] == "Video" and settings("mediaSegmentsEnabled.bool"):
+            self.prefetch.submit(
+                "segments", self.api_client.get_media_segments, item["Id"]
+            )
+
     def set_playlist(self, item, listitem, db_id=None, transcode=False):
         """Verify seektime, set intros, set main item and set additional parts.
         Detect the seektime for video type content.
@@ -112,6 +137,13 @@ class Actions(object):
             self._set_intros(item)
 
         self.set_listitem(item, listitem, db_id, None)
+
+        if "segments" in self.prefetch.requests:
+            # Handed on to the player rather than asked again once it plays
+            item["PlaybackInfo"]["MediaSegments"] = self.prefetch.get(
+                "segments", self.api_client.get_media_segments, item["Id"]
+            )
+
         playutils.set_properties(item, item["PlaybackInfo"]["Method"], self.server_id)
         self.stack.append([item["PlaybackInfo"]["Path"], listitem])
 
@@ -120,7 +152,7 @@ class Actions(object):
 
     def _set_intros(self, item):
         """if we have any play them when the movie/show is not being resumed."""
-        intros = self.api_client.get_intros(item["Id"])
+        intros = self.prefetch.get("intros", self.api_client.get_intros, item["Id"])
 
         if intros["Items"]:
             enabled = True
@@ -134,15 +166,20 @@ class Actions(object):
                     LOG.info("Skip trailers.")
 
             if enabled:
-                for intro in intros["Items"]:
+                plays = [
+                    playutils.PlayUtils(
+                        intro, False, self.server_id, self.server, self.api_client
+                    )
+                    for intro in intros["Items"]
+                ]
+                sources = self.prefetch.map(lambda x: x.get_sources(), plays)
+
+                for intro, play, found in zip(intros["Items"], plays, sources):
 
                     listitem = xbmcgui.ListItem()
                     LOG.info("[ intro/%s ] %s", intro["Id"], intro["Name"])
 
-                    play = playutils.PlayUtils(
-                        intro, False, self.server_id, self.server, self.api_client
-                    )
-                    play.select_source(play.get_sources())
+                    play.select_source(found)
                     self.set_listitem(intro, listitem, intro=True)
                     listitem.setPath(intro["PlaybackInfo"]["Path"])
                     playutils.set_properties(
@@ -204,16 +241,23 @@ class Actions(object):
 
     def _set_additional_parts(self, item_id):
         """Create listitems and add them to the stack of playlist."""
-        parts = self.api_client.get_additional_parts(item_id)
-        for part in parts["Items"]:
+        parts = self.prefetch.get(
+            "parts", self.api_client.get_additional_parts, item_id
+        )
+        plays = [
+            playutils.PlayUtils(
+                part, False, self.server_id, self.server, self.api_client
+            )
+            for part in parts["Items"]
+        ]
+        sources = self.prefetch.map(lambda x: x.get_sources(), plays)
+
+        for part, play, found in zip(parts["Items"], plays, sources):
 
             listitem = xbmcgui.ListItem()
             LOG.info("[ part/%s ] %s", part["Id"], part["Name"])
 
-            play = playutils.PlayUtils(
-                part, False, self.server_id, self.server, self.api_client
-            )
-            source = play.select_source(play.get_sources())
+            source = play.select_source(found)
             play.set_external_subs(source, listitem)
             self.set_listitem(part, listitem)
             listitem.setPath(part["PlaybackInfo"]["Path"])
@@ -228,6 +272,7 @@ class Actions(object):
     ):
         """Play a list of items. Creates a new playlist. Add additional items as plugin listing."""
         item = items["Items"][0]
+        requested = time.time()
         playlist = self.get_playlist(item)
         player = xbmc.Player()
 
@@ -264,6 +309,7 @@ class Actions(object):
         item["PlaybackInfo"]["SubtitleStreamIndex"] = subtitle or item[
             "PlaybackInfo"
         ].get("SubtitleStreamIndex")
+        item["PlaybackInfo"]["Requested"] = requested
 
         self.set_listitem(item, listitem, None, True if seektime else False)
         listitem.setPath(item["PlaybackInfo"]["Path"])
@@ -14,71 +14,142 @@ LOG = LazyLogger(__name__)
 ##################################################################################################
 
 
+# Kodi art types of the Jellyfin images
+KODI = {
+    "Primary": ["thumb", "poster"],
+    "Banner": "banner",
+    "Logo": "clearlogo",
+    "Art": "clearart",
+    "Thumb": "landscape",
+    "Disc": "discart",
+    "Backdrop": "fanart",
+}
+# Media ids per query when reading the art of many items
+CHUNK_SIZE = 500
+
+##################################################################################################
+
+
+def diff_art(existing, wanted):
+    """Rows to insert and to update turning existing into wanted, both
+    {(media_id, media_type, type): url}.
+    """
+    inserts = []
+    updates = []
+
+    for key, url in wanted.items():
+
+        if key not in existing:
+            inserts.append(key + (url,))
+        elif existing[key] != url:
+            updates.append((url,) + key)
+
+    return inserts, updates
+
+
 class Artwork(object):
 
     def __init__(self, cursor):
 
         self.cursor = cursor
 
+    @staticmethod
+    def skip(image_url, media, image):
+        return (
+            not image_url or image == "poster" and media in ("song", "artist", "album")
+        )
+
     def update(self, image_url, kodi_id, media, image):
-        """Update artwork in the video database.
-        Delete current entry before updating with the new one.
+        """Update artwork in the video database."""
+        self.update_many([(image_url, kodi_id, media, image)])
+
+    def update_many(self, rows):
+        """Update (image_url, kodi_id, media, image) rows. The current urls are
+        read with one query per media and image type.
         """
-        if not image_url or image == "poster" and media in ("song", "artist", "album"):
-            return
-
-        try:
-            self.cursor.execute(
-                QU.get_art,
-                (
-                    kodi_id,
-                    media,
-                    image,
-                ),
-            )
-            url = self.cursor.fetchone()[0]
-        except TypeError:
-
-            LOG.debug("ADD to kodi_id %s art: %s", kodi_id, image_url)
-            self.cursor.execute(QU.add_art, (kodi_id, media, image, image_url))
-        else:
-            if url != image_url:
-                LOG.info("UPDATE to kodi_id %s art: %s", kodi_id, image_url)
-                self.cursor.execute(QU.update_art, (image_url, kodi_id, media, image))
-
-    def add(self, artwork, *args):
-        """Add all artworks."""
-        KODI = {
-            "Primary": ["thumb", "poster"],
-            "Banner": "banner",
-            "Logo": "clearlogo",
-            "Art": "clearart",
-            "Thumb": "landscape",
-            "Disc": "discart",
-            "Backdrop": "fanart",
-        }
+        wanted = {}
+        groups = {}
 
-        for art in KODI:
+        for image_url, kodi_id, media, image in rows:
 
-            if art == "Backdrop":
-                self.cursor.execute(QU.get_backdrops, args + ("fanart%",))
+            if not self.skip(image_url, media, image):
+                wanted[(kodi_id, media, image)] = image_url
+                groups.setdefault((media, image), set()).add(kodi_id)
+
+        existing = {}
 
-                if len(self.cursor.fetchall()) > len(artwork["Backdrop"]):
-                    self.cursor.execute(QU.delete_backdrops, args + ("fanart_",))
+        for (media, image), kodi_ids in groups.items():
+            kodi_ids = sorted(kodi_ids)
 
-                for index, backdrop in enumerate(artwork["Backdrop"]):
+            for index in range(0, len(kodi_ids), CHUNK_SIZE):
+                chunk = kodi_ids[index : index + CHUNK_SIZE]
+                sql = QU.get_art_many.replace("{Ids}", ",".join("?" * len(chunk)))
+                self.cursor.execute(sql, (media, image) + tuple(chunk))
 
-                    if index:
-                        self.update(*(backdrop,) + args + ("%s%s" % ("fanart", index),))
-                    else:
-                        self.update(*(backdrop,) + args + ("fanart",))
+                for kodi_id, url in self.cursor.fetchall():
+                    existing[(kodi_id, media, image)] = url
+
+        self.write(existing, wanted)
+
+    def add(self, artwork, kodi_id, media):
+        """Add all artworks. The current art of the item is read once, only the
+        changes are written.
+        """
+        self.cursor.execute(QU.get_art_url, (kodi_id, media))
+        existing = {
+            (kodi_id, media, image): url for url, image in self.cursor.fetchall()
+        }
+        wanted = {}
+        backdrops = artwork.get("Backdrop") or []
+
+        def want(image_url, image):
+            if not self.skip(image_url, media, image):
+                wanted[(kodi_id, media, image)] = image_url
+
+        for art in KODI:
+
+            if art == "Backdrop":
+                for index, backdrop in enumerate(backdrops):
+                    want(backdrop, "%s%s" % ("fanart", index) if index else "fanart")
 
             elif art == "Primary":
                 for kodi_image in KODI["Primary"]:
-                    self.update(*(artwork["Primary"],) + args + (kodi_image,))
+                    want(artwork.get("Primary"), kodi_image)
 
             elif artwork.get(art):
-                self.update(*(artwork[art],) + args + (KODI[art],))
+                want(artwork[art], KODI[art])
+
+        # Backdrops removed on the server, fanart itself is only ever replaced
+        deletes = []
+
+        for key in existing:
+            index = key[2][len("fanart") :]
+
+            if key[2].startswith("fanart") and index.isdigit():
+                if int(index) >= len(backdrops):
+                    deletes.append(key)
+
+        self.write(existing, wanted, deletes)
+
+    def write(self, existing, wanted, deletes=()):
+        inserts, updates = diff_art(existing, wanted)
+
+        if deletes:
+            self.cursor.executemany(QU.delete_art_type, deletes)
+
+        if inserts:
+            self.cursor.executemany(QU.add_art, inserts)
+
+        if updates:
+            self.cursor.executemany(QU.update_art, updates)
+
+        if inserts or updates or deletes:
+            LOG.debug(
+                "--[ art ] %s added, %s updated, %s deleted",
+                len(inserts),
+                len(updates),
+                len(deletes),
+            )
 
     def delete(self, *args):
         """Delete artwork from kodi database"""
@@ -3,6 +3,10 @@ from __future__ import division, absolute_import, print_function, unicode_litera
 
 ##################################################################################################
 
+from collections import OrderedDict
+from contextlib import contextmanager
+from sqlite3 import DatabaseError
+
 from ...helper import values, LazyLogger, kodi_version
 
 from . import artwork
@@ -11,14 +15,96 @@ from . import queries as QU
 ##################################################################################################
 
 LOG = LazyLogger(__name__)
+# Entries kept per lookup table, the least recently used are dropped first
+LOOKUP_CACHE_SIZE = 10000
+# COLLATE NOCASE only folds the ASCII letters
+NOCASE = {code: code + 32 for code in range(ord("A"), ord("Z") + 1)}
 
 ##################################################################################################
 
 
+class LookupCache(object):
+    """Name to id cache of the lookup tables (genre, studio, tag, country, path),
+    bounded to size entries per table. Names compare like the COLLATE NOCASE
+    queries do, paths are exact.
+    """
+
+    def __init__(self, size=LOOKUP_CACHE_SIZE):
+        self.size = size
+        self.tables = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(table, name):
+
+        if table == "path" or not isinstance(name, str):
+            return name
+
+        return name.translate(NOCASE)
+
+    def get(self, table, name):
+        entries = self.tables.get(table)
+        key = self.key(table, name)
+
+        if entries is None or key not in entries:
+            self.misses += 1
+
+            return None
+
+        self.hits += 1
+        entries.move_to_end(key)
+
+        return entries[key]
+
+    def set(self, table, name, row_id):
+        entries = self.tables.setdefault(table, OrderedDict())
+        entries[self.key(table, name)] = row_id
+        entries.move_to_end(self.key(table, name))
+
+        if len(entries) > self.size:
+            entries.popitem(last=False)
+
+    def discard(self, table, row_id):
+        """Forget the names pointing to row_id."""
+        entries = self.tables.get(table, {})
+
+        for key in [key for key, value in entries.items() if value == row_id]:
+            del entries[key]
+
+    def preload(self, cursor, queries):
+        """Load the lookup tables, queries = {table: sql returning (name, id)}."""
+        for table, sql in queries.items():
+            try:
+                cursor.execute(sql, (self.size,))
+            except DatabaseError as error:
+                LOG.debug("Unable to preload %s: %s", table, error)
+
+                continue
+
+            entries = self.tables[table] = OrderedDict()
+
+            for name, row_id in cursor.fetchall():
+                entries.setdefault(self.key(table, name), row_id)
+
+    def clear(self):
+        self.tables.clear()
+
+
 class Kodi(object):
 
+    # Lookup tables loaded at the start of each bulk block
+    lookup_tables = {
+        "genre": QU.get_all_genres,
+        "studio": QU.get_all_studios,
+        "tag": QU.get_all_tags,
+    }
+
     def __init__(self):
         self.artwork = artwork.Artwork(self.cursor)
+        self._bulk = None
+        self._bulk_deletes = set()
+        self._lookup = LookupCache()
 
         try:
             self.cursor.execute(QU.get_all_people)
@@ -28,6 +114,94 @@ class Kodi(object):
         else:
             self._people_cache = dict(self.cursor.fetchall())
 
+    @contextmanager
+    def bulk(self):
+        """Collect the link table writes (genres, studios, countries, people, streams)
+        of a batch of items and send them with one executemany() per statement
+        when the block exits. Nothing inside the block may read those tables back.
+        The lookup tables are loaded up front, so known names cost no query.
+        """
+        self._bulk = {}
+        self._lookup.preload(self.cursor, self.lookup_tables)
+
+        try:
+            yield self
+            self.flush_bulk()
+        except Exception:
+            # The transaction may not survive, neither may the ids it created.
+            # The link writes of the failed batch are dropped, not flushed.
+            self._bulk.clear()
+            self._bulk_deletes.clear()
+            self._lookup.clear()
+            raise
+        finally:
+            self._bulk = None
+            LOG.debug(
+                "--[ lookup ] %s hits, %s misses",
+                self._lookup.hits,
+                self._lookup.misses,
+            )
+
+    def forget_lookups(self):
+        """Another connection wrote to the database, the cached ids may be gone."""
+        self._lookup.clear()
+
+    def lookup_id(self, table, sql, name):
+        """Id of name in a lookup table, from the cache or else the database."""
+        row_id = self._lookup.get(table, name)
+
+        if row_id is None:
+            self.cursor.execute(sql, (name,))
+            row = self.cursor.fetchone()
+
+            if row is not None:
+                row_id = row[0]
+                self._lookup.set(table, name, row_id)
+
+        return row_id
+
+    def flush_bulk(self):
+
+        if not self._bulk:
+            return
+
+        for sql, rows in self._bulk.items():
+            self.cursor.executemany(sql, rows)
+
+        LOG.debug(
+            "--[ bulk ] %s statements, %s rows",
+            len(self._bulk),
+            sum(len(rows) for rows in self._bulk.values()),
+        )
+        self._bulk.clear()
+        self._bulk_deletes.clear()
+
+    def execute_link(self, sql, args, delete=False):
+        """Execute now, or defer to the end of the bulk block. Statements are
+        grouped per sql in the order they were first seen, so the deletes that
+        clear an item's links always run before the inserts of the batch.
+        """
+        if self._bulk is None:
+            self.cursor.execute(sql, args)
+
+            return
+
+        if delete:
+            if (sql, args) in self._bulk_deletes:
+                # Same item written twice in one batch, keep the statement order intact
+                self.flush_bulk()
+
+            self._bulk_deletes.add((sql, args))
+
+        self._bulk.setdefault(sql, []).append(args)
+
+    def executemany_link(self, sql, rows):
+
+        if self._bulk is None:
+            self.cursor.executemany(sql, rows)
+        else:
+            self._bulk.setdefault(sql, []).extend(rows)
+
     def create_entry_path(self):
         self.cursor.execute(QU.create_path)
 
@@ -65,26 +239,29 @@ class Kodi(object):
 
             path_id = self.create_entry_path()
             self.cursor.execute(QU.add_path, (path_id,) + args)
+            self._lookup.set("path", args[0], path_id)
 
         return path_id
 
     def get_path(self, *args):
-
-        try:
-            self.cursor.execute(QU.get_path, args)
-
-            return self.cursor.fetchone()[0]
-        except TypeError:
-            return
+        return self.lookup_id("path", QU.get_path, *args)
 
     def update_path_parent_id(self, path_id, parent_path_id):
         self.cursor.execute(QU.update_path_parent_id, (parent_path_id, path_id))
 
     def update_path(self, *args):
         self.cursor.execute(QU.update_path, args)
+        self.cache_path(args[0], args[-1])
+
+    def cache_path(self, path, path_id):
+        """Follow a path renamed in place."""
+        if self._lookup.get("path", path) != path_id:
+            self._lookup.discard("path", path_id)
+            self._lookup.set("path", path, path_id)
 
     def remove_path(self, *args):
         self.cursor.execute(QU.delete_path, args)
+        self._lookup.discard("path", args[0])
 
     def add_file(self, filename, path_id):
 
@@ -124,6 +301,8 @@ class Kodi(object):
 
     def add_people(self, people, *args):
 
+        thumbnails = []
+
         def add_thumbnail(person_id, person, person_type):
 
             if person["imageurl"]:
@@ -135,7 +314,7 @@ class Kodi(object):
                     # Kodi doesn't differentiate gueststars from actors like Jellyfin does.
                     art = "actor"
 
-                self.artwork.update(person["imageurl"], person_id, art, "thumb")
+                thumbnails.append((person["imageurl"], person_id, art, "thumb"))
 
         cast_order = 1
 
@@ -178,7 +357,9 @@ class Kodi(object):
             add_thumbnail(person_id, person, person_type)
 
         for sql, parameters in bulk_updates.items():
-            self.cursor.executemany(sql, parameters)
+            self.executemany_link(sql, parameters)
+
+        self.artwork.update_many(thumbnails)
 
     def add_person(self, *args):
         self.cursor.execute(QU.add_person, args)
@@ -203,10 +384,10 @@ class Kodi(object):
 
     def add_genres(self, genres, *args):
         """Delete current genres first for clean slate."""
-        self.cursor.execute(QU.delete_genres, args)
+        self.execute_link(QU.delete_genres, args, delete=True)
 
         for genre in genres:
-            self.cursor.execute(QU.update_genres, (self.get_genre(genre),) + args)
+            self.execute_link(QU.update_genres, (self.get_genre(genre),) + args)
 
     def add_genre(self, *args):
 
@@ -216,20 +397,20 @@ class Kodi(object):
         return genre_id
 
     def get_genre(self, *args):
+        genre_id = self.lookup_id("genre", QU.get_genre, *args)
 
-        try:
-            self.cursor.execute(QU.get_genre, args)
+        if genre_id is None:
+            genre_id = self.add_genre(*args)
+            self._lookup.set("genre", args[0], genre_id)
 
-            return self.cursor.fetchone()[0]
-        except TypeError:
-            return self.add_genre(*args)
+        return genre_id
 
     def add_studios(self, studios, *args):
 
         for studio in studios:
 
             studio_id = self.get_studio(studio)
-            self.cursor.execute(QU.update_studios, (studio_id,) + args)
+            self.execute_link(QU.update_studios, (studio_id,) + args)
 
     def add_studio(self, *args):
 
@@ -239,19 +420,19 @@ class Kodi(object):
         return studio_id
 
     def get_studio(self, *args):
+        studio_id = self.lookup_id("studio", QU.get_studio, *args)
 
-        try:
-            self.cursor.execute(QU.get_studio, args)
+        if studio_id is None:
+            studio_id = self.add_studio(*args)
+            self._lookup.set("studio", args[0], studio_id)
 
-            return self.cursor.fetchone()[0]
-        except TypeError:
-            return self.add_studio(*args)
+        return studio_id
 
     def add_streams(self, file_id, streams, runtime):
         """First remove any existing entries
         Then re-add video, audio and subtitles.
         """
-        self.cursor.execute(QU.delete_streams, (file_id,))
+        self.execute_link(QU.delete_streams, (file_id,), delete=True)
 
         if streams:
             for track in streams["video"]:
@@ -277,15 +458,15 @@ class Kodi(object):
 
     def add_stream_video(self, *args):
         if kodi_version() < 20:
-            self.cursor.execute(QU.add_stream_video_19, args)
+            self.execute_link(QU.add_stream_video_19, args)
         else:
-            self.cursor.execute(QU.add_stream_video, args)
+            self.execute_link(QU.add_stream_video, args)
 
     def add_stream_audio(self, *args):
-        self.cursor.execute(QU.add_stream_audio, args)
+        self.execute_link(QU.add_stream_audio, args)
 
     def add_stream_sub(self, *args):
-        self.cursor.execute(QU.add_stream_sub, args)
+        self.execute_link(QU.add_stream_sub, args)
 
     def add_playstate(self, file_id, playcount, date_played, resume, *args):
         """Delete the existing resume point.
@@ -324,23 +505,20 @@ class Kodi(object):
         return tag_id
 
     def get_tag(self, tag, *args):
+        tag_id = self.lookup_id("tag", QU.get_tag, tag)
 
-        try:
-            self.cursor.execute(QU.get_tag, (tag,))
-            tag_id = self.cursor.fetchone()[0]
-        except TypeError:
+        if tag_id is None:
             tag_id = self.add_tag(tag)
+            self._lookup.set("tag", tag, tag_id)
 
         self.cursor.execute(QU.update_tag, (tag_id,) + args)
 
         return tag_id
 
     def remove_tag(self, tag, *args):
+        tag_id = self.lookup_id("tag", QU.get_tag, tag)
 
-        try:
-            self.cursor.execute(QU.get_tag, (tag,))
-            tag_id = self.cursor.fetchone()[0]
-        except TypeError:
+        if tag_id is None:
             return
 
         self.cursor.execute(QU.delete_tag, (tag_id,) + args)
@@ -20,6 +20,7 @@ LOG = LazyLogger(__name__)
 class Movies(Kodi):
 
     itemtype: int
+    lookup_tables = dict(Kodi.lookup_tables, country=QU.get_all_countries)
 
     def __init__(self, cursor):
 
@@ -111,20 +112,20 @@ class Movies(Kodi):
     def add_countries(self, countries, *args):
 
         for country in countries:
-            self.cursor.execute(QU.update_country, (self.get_country(country),) + args)
+            self.execute_link(QU.update_country, (self.get_country(country),) + args)
 
     def add_country(self, *args):
         self.cursor.execute(QU.add_country, args)
         return self.cursor.lastrowid
 
     def get_country(self, *args):
+        country_id = self.lookup_id("country", QU.get_country, *args)
 
-        try:
-            self.cursor.execute(QU.get_country, args)
+        if country_id is None:
+            country_id = self.add_country(*args)
+            self._lookup.set("country", args[0], country_id)
 
-            return self.cursor.fetchone()[0]
-        except TypeError:
-            return self.add_country(*args)
+        return country_id
 
     def add_boxset(self, *args):
         self.cursor.execute(QU.add_set, args)
@@ -17,6 +17,8 @@ LOG = LazyLogger(__name__)
 
 class Music(Kodi):
 
+    lookup_tables = {"genre": QU.get_all_genres}
+
     def __init__(self, cursor):
 
         self.cursor = cursor
@@ -49,9 +51,10 @@ class Music(Kodi):
 
     def update_path(self, *args):
         self.cursor.execute(QU.update_path, args)
+        self.cache_path(args[0], args[-1])
 
     def add_role(self, *args):
-        self.cursor.execute(QU.update_role, args)
+        self.execute_link(QU.update_role, args)
 
     def get(self, artist_id, name, musicbrainz):
         """Get artist or create the entry."""
@@ -98,10 +101,10 @@ class Music(Kodi):
             self.cursor.execute(QU.update_artist82, args)
 
     def link(self, *args):
-        self.cursor.execute(QU.update_link, args)
+        self.execute_link(QU.update_link, args)
 
     def add_discography(self, *args):
-        self.cursor.execute(QU.update_discography, args)
+        self.execute_link(QU.update_discography, args)
 
     def validate_artist(self, *args):
 
@@ -229,7 +232,7 @@ class Music(Kodi):
             self.cursor.execute(QU.update_song74, args)
 
     def link_song_artist(self, *args):
-        self.cursor.execute(QU.update_song_artist, args)
+        self.execute_link(QU.update_song_artist, args)
 
     def link_song_album(self, *args):
         if self.version_id < 72:
@@ -243,29 +246,29 @@ class Music(Kodi):
         Album_genres was removed in kodi 18
         """
         if media == "album" and self.version_id < 72:
-            self.cursor.execute(QU.delete_genres_album, (kodi_id,))
+            self.execute_link(QU.delete_genres_album, (kodi_id,), delete=True)
 
             for genre in genres:
 
                 genre_id = self.get_genre(genre)
-                self.cursor.execute(QU.update_genre_album, (genre_id, kodi_id))
+                self.execute_link(QU.update_genre_album, (genre_id, kodi_id))
 
         if media == "song":
-            self.cursor.execute(QU.delete_genres_song, (kodi_id,))
+            self.execute_link(QU.delete_genres_song, (kodi_id,), delete=True)
 
             for genre in genres:
 
                 genre_id = self.get_genre(genre)
-                self.cursor.execute(QU.update_genre_song, (genre_id, kodi_id))
+                self.execute_link(QU.update_genre_song, (genre_id, kodi_id))
 
     def get_genre(self, *args):
+        genre_id = self.lookup_id("genre", QU.get_genre, *args)
 
-        try:
-            self.cursor.execute(QU.get_genre, args)
+        if genre_id is None:
+            genre_id = self.add_genre(*args)
+            self._lookup.set("genre", args[0], genre_id)
 
-            return self.cursor.fetchone()[0]
-        except TypeError:
-            return self.add_genre(*args)
+        return genre_id
 
     def add_genre(self, *args):
 
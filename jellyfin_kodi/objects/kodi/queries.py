@@ -80,6 +80,26 @@ get_all_people = """
 SELECT      name, actor_id
 FROM        actor
 """
+get_all_genres = """
+SELECT      name, genre_id
+FROM        genre
+LIMIT       ?
+"""
+get_all_studios = """
+SELECT      name, studio_id
+FROM        studio
+LIMIT       ?
+"""
+get_all_tags = """
+SELECT      name, tag_id
+FROM        tag
+LIMIT       ?
+"""
+get_all_countries = """
+SELECT      name, country_id
+FROM        country
+LIMIT       ?
+"""
 get_person = """
 SELECT      actor_id
 FROM        actor
@@ -196,6 +216,13 @@ FROM        art
 WHERE       media_id = ?
 AND         media_type = ?
 """
+get_art_many = """
+SELECT      media_id, url
+FROM        art
+WHERE       media_type = ?
+AND         type = ?
+AND         media_id IN ({Ids})
+"""
 get_show_by_unique_id = """
 SELECT      idShow
 FROM        tvshow_view
@@ -842,6 +869,12 @@ WHERE           media_id = ?
 AND             media_type = ?
 AND             type LIKE ?
 """
+delete_art_type = """
+DELETE FROM     art
+WHERE           media_id = ?
+AND             media_type = ?
+AND             type = ?
+"""
 get_missing_versions = """
 SELECT          idFile,idMovie
 FROM            movie
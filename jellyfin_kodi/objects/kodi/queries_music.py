@@ -89,6 +89,11 @@ FROM        genre
 WHERE       strGenre = ?
             COLLATE NOCASE
 """
+get_all_genres = """
+SELECT      strGenre, idGenre
+FROM        genre
+LIMIT       ?
+"""
 get_total_episodes = """
 SELECT      totalCount
 FROM        tvshowcounts
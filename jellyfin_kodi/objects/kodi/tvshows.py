@@ -111,7 +111,7 @@ class TVShows(Kodi):
         self.cursor.execute(QU.update_tvshow, args)
 
     def link(self, *args):
-        self.cursor.execute(QU.update_tvshow_link, args)
+        self.execute_link(QU.update_tvshow_link, args)
 
     def get_season(self, name, *args):
 
@@ -18,10 +18,10 @@ from ..helper import (
     Local,
 )
 from ..helper import LazyLogger
-from ..helper.utils import find_library
 from ..helper.exceptions import PathValidationException
 
 from .obj import Objects
+from .utils import Lookups
 from .kodi import Movies as KodiDb, queries as QU
 
 ##################################################################################################
@@ -44,6 +44,7 @@ class Movies(KodiDb):
         self.objects = Objects()
         self.item_ids = []
         self.library = library
+        self.lookups = Lookups(server)
 
         KodiDb.__init__(self, videodb.cursor)
 
@@ -57,7 +58,7 @@ class Movies(KodiDb):
             "address"
         ]
         API = api.API(item, server_address)
-        obj = self.objects.map(item, "Movie")
+        obj = self.objects.map(item, "Movie", self.lookups.fingerprint(item))
         update = True
 
         try:
@@ -70,7 +71,7 @@ class Movies(KodiDb):
             update = False
             LOG.debug("MovieId %s not found", obj["Id"])
 
-            library = self.library or find_library(self.server, item)
+            library = self.library or self.lookups.library(item)
             if not library:
                 # This item doesn't belong to a whitelisted library
                 return
@@ -86,6 +87,12 @@ class Movies(KodiDb):
                     "MovieId %s missing from kodi. repairing the entry.", obj["MovieId"]
                 )
 
+        if update and e_item[8] == obj["Checksum"]:
+            LOG.debug("MovieId %s unchanged, skipping", obj["MovieId"])
+            self.item_ids.append(obj["Id"])
+
+            return
+
         obj["Path"] = API.get_file_path(obj["Path"])
         obj["Genres"] = obj["Genres"] or []
         obj["Studios"] = [
@@ -194,7 +201,7 @@ class Movies(KodiDb):
         try:
             if obj["LocalTrailer"]:
 
-                trailer = self.server.jellyfin.get_local_trailers(obj["Id"])
+                trailer = self.lookups.trailer(obj["Id"])
                 obj["Trailer"] = (
                     "plugin://plugin.video.jellyfin/trailer?id=%s&mode=play"
                     % trailer[0]["Id"]
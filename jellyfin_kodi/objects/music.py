@@ -7,10 +7,10 @@ import datetime
 
 from ..database import jellyfin_db, queries as QUEM
 from ..helper import api, stop, validate, jellyfin_item, values, Local, LazyLogger
-from ..helper.utils import find_library
 from ..helper.exceptions import PathValidationException
 
 from .obj import Objects
+from .utils import Lookups
 from .kodi import Music as KodiDb, queries_music as QU
 
 ##################################################################################################
@@ -33,6 +33,7 @@ class Music(KodiDb):
         self.objects = Objects()
         self.item_ids = []
         self.library = library
+        self.lookups = Lookups(server)
 
         KodiDb.__init__(self, musicdb.cursor)
 
@@ -56,7 +57,7 @@ class Music(KodiDb):
         except TypeError:
             update = False
 
-            library = library or self.library or find_library(self.server, item)
+            library = library or self.library or self.lookups.library(item)
             if not library:
                 # This item doesn't belong to a whitelisted library
                 return
@@ -74,6 +75,12 @@ class Music(KodiDb):
                     obj["ArtistId"],
                 )
 
+        if update and e_item[8] == obj["Checksum"]:
+            LOG.debug("ArtistId %s unchanged, skipping", obj["ArtistId"])
+            self.item_ids.append(obj["Id"])
+
+            return
+
         obj["LastScraped"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         obj["ArtistType"] = "MusicArtist"
         obj["Genre"] = " / ".join(obj["Genres"] or [])
@@ -139,7 +146,7 @@ class Music(KodiDb):
         except TypeError:
             update = False
 
-            library = self.library or find_library(self.server, item)
+            library = self.library or self.lookups.library(item)
             if not library:
                 # This item doesn't belong to a whitelisted library
                 return
@@ -156,6 +163,12 @@ class Music(KodiDb):
                     "AlbumId %s missing from kodi. repairing the entry.", obj["AlbumId"]
                 )
 
+        if update and e_item[8] == obj["Checksum"]:
+            LOG.debug("AlbumId %s unchanged, skipping", obj["AlbumId"])
+            self.item_ids.append(obj["Id"])
+
+            return
+
         obj["Rating"] = 0
         obj["LastScraped"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         obj["Runtime"] = (obj["Runtime"] or 0) / 10000000.0
@@ -272,7 +285,7 @@ class Music(KodiDb):
         except TypeError:
             update = False
 
-            library = self.library or find_library(self.server, item)
+            library = self.library or self.lookups.library(item)
             if not library:
                 # This item doesn't belong to a whitelisted library
                 return
@@ -289,6 +302,12 @@ class Music(KodiDb):
                     "SongId %s missing from kodi. repairing the entry.", obj["SongId"]
                 )
 
+        if update and e_item[8] == obj["Checksum"]:
+            LOG.debug("SongId %s unchanged, skipping", obj["SongId"])
+            self.item_ids.append(obj["Id"])
+
+            return
+
         self.get_song_path_filename(obj, API)
 
         obj["Rating"] = 0
@@ -9,10 +9,10 @@ from urllib.parse import urlencode
 
 from ..database import jellyfin_db, queries as QUEM
 from ..helper import api, stop, validate, jellyfin_item, values, Local, LazyLogger
-from ..helper.utils import find_library
 from ..helper.exceptions import PathValidationException
 
 from .obj import Objects
+from .utils import Lookups
 from .kodi import MusicVideos as KodiDb, queries as QU
 
 ##################################################################################################
@@ -35,6 +35,7 @@ class MusicVideos(KodiDb):
         self.objects = Objects()
         self.item_ids = []
         self.library = library
+        self.lookups = Lookups(server)
 
         KodiDb.__init__(self, videodb.cursor)
 
@@ -63,7 +64,7 @@ class MusicVideos(KodiDb):
         except TypeError:
             update = False
 
-            library = self.library or find_library(self.server, item)
+            library = self.library or self.lookups.library(item)
             if not library:
                 # This item doesn't belong to a whitelisted library
                 return
@@ -81,6 +82,12 @@ class MusicVideos(KodiDb):
                     obj["MvideoId"],
                 )
 
+        if update and e_item[8] == obj["Checksum"]:
+            LOG.debug("MvideoId %s unchanged, skipping", obj["MvideoId"])
+            self.item_ids.append(obj["Id"])
+
+            return
+
         if (obj.get("ProductionYear") or 0) > 9999:
             obj["ProductionYear"] = int(str(obj["ProductionYear"])[:4])
 
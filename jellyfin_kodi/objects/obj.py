@@ -3,10 +3,12 @@ from __future__ import division, absolute_import, print_function, unicode_litera
 
 ##################################################################################################
 
+import hashlib
 import json
 import os
 
 from ..helper import LazyLogger
+from ..helper.metrics import metrics
 
 ##################################################################################################
 
@@ -26,13 +28,20 @@ class Objects(object):
         self.__dict__ = self._shared_state
 
     def mapping(self):
-        """Load objects mapping."""
+        """Load objects mapping and compile it into lookup plans."""
         file_dir = os.path.dirname(__file__)
 
         with open(os.path.join(file_dir, "obj_map.json")) as infile:
             self.objects = json.load(infile)
 
-    def map(self, item, mapping_name):
+        self.plans = {
+            name: compile_mapping(mapping)
+            for name, mapping in self.objects.items()
+            if isinstance(mapping, dict)
+        }
+
+    @metrics.timed("map")
+    def map(self, item, mapping_name, checksum=None):
         """Syntax to traverse the item dictionary.
         This of the query almost as a url.
 
@@ -44,59 +53,39 @@ class Objects(object):
         ":": indicates it's a list of elements [], i.e. MediaSources/0/MediaStreams:?$Name
             MediaStreams is a list.
         "/": indicates where to go directly
+
+        The queries are parsed once by mapping(), see compile_mapping().
+        checksum is the fingerprint of item, when it is known already.
         """
         self.mapped_item = {}
 
         if not mapping_name:
             raise Exception("execute mapping() first")
 
-        mapping = self.objects[mapping_name]
-
-        for key, value in mapping.items():
+        for key, params in self.plans[mapping_name]:
 
             self.mapped_item[key] = None
-            params = value.split(",")
-
-            for param in params:
-
-                obj = item
-                obj_param = param
-                obj_key = ""
-                obj_filters = {}
-
-                if "?" in obj_param:
-
-                    if "$" in obj_param:
-                        obj_param, obj_key = obj_param.rsplit("$", 1)
-
-                    obj_param, filters = obj_param.rsplit("?", 1)
-
-                    if filters:
-                        for filter in filters.split("&"):
-                            filter_key, filter_value = filter.split("=")
-                            obj_filters[filter_key] = filter_value
-
-                if ":" in obj_param:
-                    result = []
 
-                    for d in self.__recursiveloop__(obj, obj_param):
+            for kind, path, obj_filters, obj_key in params:
 
-                        if not obj_filters or self.__filters__(d, obj_filters):
-                            result.append(d)
+                if kind == LOOP:
+                    obj = [
+                        d
+                        for d in loop(item, path)
+                        if not obj_filters or match(d, obj_filters)
+                    ]
+                    obj_filters = None
 
-                    obj = result
-                    obj_filters = {}
+                elif kind == PATH:
+                    obj = walk(item, path)
 
-                elif "/" in obj_param:
-                    obj = self.__recursive__(obj, obj_param)
-
-                elif obj is item and obj is not None:
-                    obj = item.get(obj_param)
+                else:
+                    obj = item.get(path) if item is not None else item
 
-                if obj_filters and obj and not self.__filters__(obj, obj_filters):
+                if obj_filters and obj and not match(obj, obj_filters):
                     obj = None
 
-                if obj is None and len(params) != params.index(param):
+                if obj is None:
                     continue
 
                 if obj_key:
@@ -118,49 +107,123 @@ class Objects(object):
             self.mapped_item["ProviderName"] = self.objects.get(
                 "%sProviderName" % mapping_name
             )
-            self.mapped_item["Checksum"] = json.dumps(item["UserData"])
+            if mapping_name.endswith("UserData"):
+                self.mapped_item["Checksum"] = json.dumps(item["UserData"])
+            else:
+                self.mapped_item["Checksum"] = checksum or fingerprint(item)
 
         return self.mapped_item
 
-    def __recursiveloop__(self, obj, keys):
 
-        first, rest = keys.split(":", 1)
-        obj = self.__recursive__(obj, first)
+def fingerprint(item):
+    """Digest of the whole server json of an item.
+
+    Stored as the checksum of full writes so an update can skip items
+    that did not change, in a TEXT column since schema version 4. Userdata
+    writes keep storing the bare UserData, which never matches, so the next
+    update rewrites the item.
+    """
+    data = json.dumps(item, sort_keys=True, separators=(",", ":"))
+
+    return hashlib.md5(data.encode("utf-8")).hexdigest()
+
+
+KEY, PATH, LOOP = range(3)
+
+
+def compile_mapping(mapping):
+    """Parse each query of a mapping into a tuple of fallbacks.
+
+    Every fallback is (kind, path, filters, key):
+    KEY reads a top level key, PATH walks a tuple of steps (list indexes
+    are already ints) and LOOP walks to a list and keeps the elements
+    passing filters. Filters are (key, value, inverse) tuples.
+    """
+    return tuple(
+        (key, tuple(compile_param(param) for param in value.split(",")))
+        for key, value in mapping.items()
+    )
+
+
+def compile_param(param):
+
+    obj_key = ""
+    obj_filters = {}
+
+    if "?" in param:
+
+        if "$" in param:
+            param, obj_key = param.rsplit("$", 1)
+
+        param, filters = param.rsplit("?", 1)
+
+        if filters:
+            for filter in filters.split("&"):
+                filter_key, filter_value = filter.split("=")
+                obj_filters[filter_key] = filter_value
+
+    filters = tuple(compile_filter(key, value) for key, value in obj_filters.items())
+
+    if ":" in param:
+        first, rest = param.split(":", 1)
+        # Nested lists are not supported, they never yield anything
+        return LOOP, (compile_path(first), bool(rest)), filters, obj_key
+
+    if "/" in param:
+        return PATH, compile_path(param), filters, obj_key
+
+    return KEY, param, filters, obj_key
+
+
+def compile_path(keys):
+    return tuple(
+        int(string) if string.isdigit() else string for string in keys.split("/")
+    )
+
+
+def compile_filter(key, value):
+
+    inverse = False
+
+    if value.startswith("!"):
+
+        inverse = True
+        value = value.split("!", 1)[1]
+
+    if value.lower() == "null":
+        value = None
+
+    return key, value, inverse
 
-        if obj:
-            for item in obj:
-                if rest:
-                    self.__recursiveloop__(item, rest)
-                else:
-                    yield item
 
-    def __recursive__(self, obj, keys):
+def walk(obj, path):
 
-        for string in keys.split("/"):
+    for step in path:
 
-            if not obj:
-                return
+        if not obj:
+            return
 
-            obj = obj[int(string)] if string.isdigit() else obj.get(string)
+        obj = obj[step] if isinstance(step, int) else obj.get(step)
 
-        return obj
+    return obj
 
-    def __filters__(self, obj, filters):
 
-        result = False
+def loop(obj, path):
 
-        for key, value in filters.items():
+    steps, nested = path
+    obj = walk(obj, steps)
 
-            inverse = False
+    if obj and not nested:
+        for item in obj:
+            yield item
 
-            if value.startswith("!"):
 
-                inverse = True
-                value = value.split("!", 1)[1]
+def match(obj, filters):
 
-            if value.lower() == "null":
-                value = None
+    result = False
 
-            result = obj.get(key) != value if inverse else obj.get(key) == value
+    # Only the last filter decides, same as the original interpreter
+    for key, value, inverse in filters:
+        result = obj.get(key) != value if inverse else obj.get(key) == value
 
-        return result
+    return result
@@ -20,10 +20,10 @@ from ..helper import (
     Local,
 )
 from ..helper import LazyLogger
-from ..helper.utils import find_library
 from ..helper.exceptions import PathValidationException
 
 from .obj import Objects
+from .utils import Lookups
 from .kodi import TVShows as KodiDb, queries as QU
 
 ##################################################################################################
@@ -55,17 +55,18 @@ class TVShows(KodiDb):
         self.objects = Objects()
         self.item_ids = []
         self.library = library
+        self.lookups = Lookups(server)
 
         KodiDb.__init__(self, videodb.cursor)
 
     @stop
     @jellyfin_item
-    def tvshow(self, item, e_item):
+    def tvshow(self, item, e_item, seasons=None):
         """If item does not exist, entry will be added.
         If item exists, entry will be updated.
 
         If the show is empty, try to remove it.
-        Process seasons.
+        Process seasons, downloaded unless given.
         Apply series pooling.
         """
         server_address = self.server.auth.get_server_info(self.server.auth.server_id)[
@@ -84,7 +85,7 @@ class TVShows(KodiDb):
             update = False
             LOG.debug("ShowId %s not found", obj["Id"])
 
-            library = self.library or find_library(self.server, item)
+            library = self.library or self.lookups.library(item)
             if not library:
                 # This item doesn't belong to a whitelisted library
                 return
@@ -149,7 +150,10 @@ class TVShows(KodiDb):
 
         season_episodes = {}
 
-        for season in self.server.jellyfin.get_seasons(obj["Id"])["Items"]:
+        if seasons is None:
+            seasons = self.server.jellyfin.get_seasons(obj["Id"])["Items"]
+
+        for season in seasons:
 
             if season["SeriesId"] != obj["Id"]:
                 obj["SeriesId"] = season["SeriesId"]
@@ -255,7 +259,7 @@ class TVShows(KodiDb):
         """
         try:
             if obj["LocalTrailer"]:
-                trailer = self.server.jellyfin.get_local_trailers(obj["Id"])
+                trailer = self.lookups.trailer(obj["Id"])
                 obj["Trailer"] = (
                     "plugin://plugin.video.jellyfin/trailer?id=%s&mode=play"
                     % trailer[0]["Id"]
@@ -345,7 +349,7 @@ class TVShows(KodiDb):
             "address"
         ]
         API = api.API(item, server_address)
-        obj = self.objects.map(item, "Episode")
+        obj = self.objects.map(item, "Episode", self.lookups.fingerprint(item))
         update = True
 
         if obj["Location"] == "Virtual":
@@ -366,7 +370,7 @@ class TVShows(KodiDb):
             update = False
             LOG.debug("EpisodeId %s not found", obj["Id"])
 
-            library = self.library or find_library(self.server, item)
+            library = self.library or self.lookups.library(item)
             if not library:
                 # This item doesn't belong to a whitelisted library
                 return
@@ -381,6 +385,12 @@ class TVShows(KodiDb):
                     obj["EpisodeId"],
                 )
 
+        if update and e_item[8] == obj["Checksum"]:
+            LOG.debug("EpisodeId %s unchanged, skipping", obj["EpisodeId"])
+            self.item_ids.append(obj["Id"])
+
+            return
+
         obj["Path"] = API.get_file_path(obj["Path"])
         obj["Index"] = obj["Index"] or -1
         obj["Writers"] = " / ".join(obj["Writers"] or [])
@@ -547,7 +557,7 @@ class TVShows(KodiDb):
 
         else:
             # We need LibraryId
-            library = self.library or find_library(self.server, obj)
+            library = self.library or self.lookups.library(obj)
             obj["LibraryId"] = library["Id"]
             obj["Path"] = "plugin://plugin.video.jellyfin/%s/%s/" % (
                 obj["LibraryId"],
@@ -570,7 +580,7 @@ class TVShows(KodiDb):
         if obj["ShowId"] is None:
 
             try:
-                self.tvshow(self.server.jellyfin.get_item(obj["SeriesId"]))
+                self.tvshow(self.lookups.get_series(obj["SeriesId"]))
                 obj["ShowId"] = self.jellyfin_db.get_item_by_id(
                     *values(obj, QUEM.get_item_series_obj)
                 )[0]
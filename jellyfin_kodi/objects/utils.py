@@ -3,12 +3,20 @@ from __future__ import division, absolute_import, print_function, unicode_litera
 
 #################################################################################################
 
-from ..helper import JSONRPC
+import concurrent.futures
+
+from .. import database, downloader as server
+from ..database import jellyfin_db
+from ..helper import JSONRPC, settings
 from ..helper import LazyLogger
+from ..helper.utils import find_library
+from .obj import fingerprint
 
 #################################################################################################
 
 LOG = LazyLogger(__name__)
+# Unclaimed answers kept per lookup before they are dropped
+LOOKUPS_SIZE = 5000
 
 #################################################################################################
 
@@ -19,3 +27,147 @@ def get_grouped_set():
         {"setting": "videolibrary.groupmoviesets"}
     )
     return result.get("result", {}).get("value", False)
+
+
+class Lookups(object):
+    """Server lookups the writers need for some items: the local trailers, a
+    series missing from the database and the library of a new item.
+
+    prefetch() resolves them for a page of items with batched requests, outside
+    the database lock. The writers take the answers, whatever was not prefetched
+    is still requested on the spot. One instance is shared by the writers of a sync.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.trailers = {}
+        self.series = {}
+        self.libraries = {}
+        self.fingerprints = {}
+
+    def prefetch(self, items, library=None):
+        """Resolve the lookups the writers will need for items. With library set,
+        the writers know the library of new items already.
+        """
+        trailers = []
+        series = set()
+        new = []
+        views = {}
+
+        for cache in (self.trailers, self.series, self.libraries, self.fingerprints):
+            if len(cache) > LOOKUPS_SIZE:
+                # Leftovers of items that were never written
+                cache.clear()
+
+        with database.Database("jellyfin") as jellyfindb:
+            db = jellyfin_db.JellyfinDatabase(jellyfindb.cursor)
+
+            for item in items:
+                e_item = db.get_item_by_id(item["Id"])
+
+                if e_item is None:
+                    new.append(item["Id"])
+
+                # Unchanged movies are skipped before their trailer is needed,
+                # the writer takes the fingerprint over
+                if item.get("LocalTrailerCount"):
+                    unchanged = False
+
+                    if item["Type"] != "Series" and e_item is not None:
+                        digest = fingerprint(item)
+                        self.fingerprints[item["Id"]] = (item, digest)
+                        unchanged = e_item[8] == digest
+
+                    if not unchanged:
+                        trailers.append(item["Id"])
+
+                if item["Type"] in ("Season", "Episode") and item.get("SeriesId"):
+                    if db.get_item_by_id(item["SeriesId"]) is None:
+                        series.add(item["SeriesId"])
+
+            if library is None and new:
+                for view_id in database.get_sync()["Whitelist"]:
+                    view_id = view_id.replace("Mixed:", "")
+
+                    try:
+                        views[view_id] = db.get_view_name(view_id)
+                    except TypeError:
+                        continue
+
+        self.prefetch_trailers(trailers)
+
+        if series:
+            try:
+                result = self.server.jellyfin.get_items(list(series))
+            except Exception as error:
+                LOG.warning("Unable to prefetch series: %s", error)
+            else:
+                for item in result["Items"]:
+                    self.series[item["Id"]] = item
+
+        for view_id, view_name in views.items():
+            if not new:
+                break
+
+            try:
+                found = server.get_ids_in_view(view_id, new)
+            except Exception as error:
+                LOG.warning("Unable to prefetch the library %s: %s", view_name, error)
+
+                continue
+
+            for item_id in found:
+                self.libraries[item_id] = {"Id": view_id, "Name": view_name}
+
+            new = [item_id for item_id in new if item_id not in found]
+
+    def prefetch_trailers(self, item_ids):
+        """There is no batched request for local trailers, they are requested
+        concurrently instead.
+        """
+        if not item_ids:
+            return
+
+        def fetch(item_id):
+            try:
+                self.trailers[item_id] = self.server.jellyfin.get_local_trailers(
+                    item_id
+                )
+            except Exception as error:
+                LOG.warning("Unable to prefetch the trailer of %s: %s", item_id, error)
+
+        threads = min(int(settings("limitThreads") or 3), len(item_ids))
+
+        with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+            list(executor.map(fetch, item_ids))
+
+    def trailer(self, item_id):
+        """Local trailers of the item."""
+        if item_id in self.trailers:
+            return self.trailers.pop(item_id)
+
+        return self.server.jellyfin.get_local_trailers(item_id)
+
+    def fingerprint(self, item):
+        """Fingerprint of the item, the one prefetch() computed if it was
+        given this very item.
+        """
+        cached = self.fingerprints.pop(item["Id"], None)
+
+        if cached is not None and cached[0] is item:
+            return cached[1]
+
+        return fingerprint(item)
+
+    def get_series(self, series_id):
+        if series_id in self.series:
+            return self.series.pop(series_id)
+
+        return self.server.jellyfin.get_item(series_id)
+
+    def library(self, item):
+        """Whitelisted library of the item, {} if there is none."""
+        if item["Id"] in self.libraries:
+            return self.libraries.pop(item["Id"])
+
+        return find_library(self.server, item)
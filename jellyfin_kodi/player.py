@@ -4,16 +4,20 @@ from __future__ import division, absolute_import, print_function, unicode_litera
 #################################################################################################
 
 import os
+import threading
+import time
 
 import xbmc
 import xbmcvfs
 
 from .objects.obj import Objects
 from .helper import translate, api, window, settings, dialog, event, JSONRPC
+from .helper import playutils
 from .jellyfin import Jellyfin
 from .helper import LazyLogger
 from .helper.utils import translate_path
-from .segments import SegmentChecker
+from .segments import SegmentChecker, SegmentIndex, MARGIN
+from .progress import ProgressReporter
 
 #################################################################################################
 
@@ -30,9 +34,14 @@ class Player(xbmc.Player):
     skip_prompted = set()
     skip_dialog = None
     segment_checker = None
+    starting = None
+    speed = 1
 
     def __init__(self):
         xbmc.Player.__init__(self)
+        playutils.PLAYS.serve()
+        self.reporter = ProgressReporter()
+        self.reporter.start()
 
     def get_playing_file(self):
         try:
@@ -50,61 +59,66 @@ class Player(xbmc.Player):
         return file in self.played
 
     def onPlayBackStarted(self):
-        """We may need to wait for info to be set in kodi monitor.
-        Accounts for scenario where Kodi starts playback and exits immediately.
+        """Accounts for scenario where Kodi starts playback and exits immediately.
         First, ensure previous playback terminated correctly in Jellyfin.
         """
+        # Kodi runs the callbacks one after the other, this is the first word
+        # of the new playback
+        self.starting = time.time()
+        playutils.PLAYS.forget()
 
         self.stop_playback()
         self._reset_state(restart=True)
-        count = 0
-        monitor = xbmc.Monitor()
+        self.start()
 
-        try:
-            current_file = self.getPlayingFile()
+    def onAVStarted(self):
+        """The file is known by now if it wasn't when playback started."""
+        if self.starting is not None:
+            self.start()
 
-        except Exception:
+    def start(self):
+        """Find the properties of the started play. Those set by the kodi
+        monitor or the plugin once playback started are handed on as soon as
+        they arrive. The playing file may take a few seconds to be known.
+        """
+        monitor = xbmc.Monitor()
 
-            while count < 5:
-                try:
-                    current_file = self.getPlayingFile()
-                    count = 0
-                    break
-                except Exception:
-                    count += 1
+        for _ in range(5):
+            try:
+                current_file = self.getPlayingFile()
 
+                break
+            except Exception:
                 if monitor.waitForAbort(1):
                     return
-            else:
-                LOG.info("Cancel playback report")
-
-                return
-
-        items = window("jellyfin_play.json")
-        item = None
-
-        while not items:
+        else:
+            LOG.info("Playing file not known yet")
 
-            if monitor.waitForAbort(2):
-                return
+            return
 
-            items = window("jellyfin_play.json")
-            count += 1
+        started, self.starting = self.starting, None
+        item = playutils.PLAYS.take(
+            current_file,
+            late=lambda item: self.start_playback(current_file, item, started),
+        )
 
-            if count == 20:
-                LOG.info("Could not find jellyfin prop...")
+        if item is None:
+            LOG.info("--[ play ] waiting for the properties of %s", current_file)
 
-                return
+            return
 
-        for item in items:
-            if item["Path"] == current_file:
-                items.pop(items.index(item))
+        self.start_playback(current_file, item, started)
 
-                break
-        else:
-            item = items.pop(0)
+    def start_playback(self, current_file, item, started):
+        """Report the started play to the server."""
+        monitor = xbmc.Monitor()
 
-        window("jellyfin_play.json", items)
+        if item.get("Requested"):
+            LOG.info(
+                "--[ first frame/%s ] %.3fs after the play request",
+                item["Id"],
+                started - item["Requested"],
+            )
 
         self.set_item(current_file, item)
         # Detect current audio/subtitle state from Kodi player
@@ -123,18 +137,15 @@ class Player(xbmc.Player):
             "AudioStreamIndex": item["AudioStreamIndex"],
             "SubtitleStreamIndex": item["SubtitleStreamIndex"],
         }
-        try:
-            item["Server"].jellyfin.session_playing(data)
-        except Exception as e:
-            LOG.warning("Failed to report session playing: %s", e)
+        self.reporter.playing(item["ServerId"], data)
         window("jellyfin.skip.%s.bool" % item["Id"], True)
 
         # Immediate skip check for segments starting at 0:00
         if settings("mediaSegmentsEnabled.bool"):
             try:
                 self._fetch_skip_segments(item)
-                current_pos = int(self.getTime())
-                self.check_skip_segments(item, current_pos)
+                self._reschedule_segment_checker()
+                self._prefetch_next_segments()
             except Exception:
                 pass  # Player may not be ready yet
 
@@ -326,6 +337,7 @@ class Player(xbmc.Player):
 
             self.get_file_info(current_file)["Paused"] = True
             self.report_playback()
+            self._reschedule_segment_checker()
             LOG.debug("-->[ paused ]")
 
     def onPlayBackResumed(self):
@@ -335,6 +347,7 @@ class Player(xbmc.Player):
 
             self.get_file_info(current_file)["Paused"] = False
             self.report_playback()
+            self._reschedule_segment_checker()
             LOG.debug("--<[ paused ]")
 
     def onPlayBackSeek(self, time, seek_offset):
@@ -345,14 +358,11 @@ class Player(xbmc.Player):
             LOG.info("--[ seek ]")
 
             # Check skip segments immediately after seek
-            if settings("mediaSegmentsEnabled.bool"):
-                try:
-                    current_file = self.get_playing_file()
-                    item = self.get_file_info(current_file)
-                    current_pos = int(self.getTime())
-                    self.check_skip_segments(item, current_pos)
-                except Exception:
-                    pass
+            self._reschedule_segment_checker()
+
+    def onPlayBackSpeedChanged(self, speed):
+        self.speed = speed
+        self._reschedule_segment_checker()
 
     def report_playback(self, report=True, finish=False):
         """Report playback progress to jellyfin server.
@@ -421,15 +431,11 @@ class Player(xbmc.Player):
             "SubtitleStreamIndex": item["SubtitleStreamIndex"],
         }
 
-        try:
-            item["Server"].jellyfin.session_progress(data)
-        except Exception:
-            LOG.info("--[ report playback ] %s", data)
-            pass
+        self.reporter.progress(item["ServerId"], data, urgent=report)
 
     def onPlayBackStopped(self):
         """Will be called when user stops playing a file."""
-        window("jellyfin_play", clear=True)
+        playutils.PLAYS.clear()
         self.stop_playback()
         LOG.info("--<[ playback ]")
 
@@ -464,18 +470,24 @@ class Player(xbmc.Player):
                 "PositionTicks": int(item["CurrentPosition"] * 10000000),
                 "PlaySessionId": item["PlaySessionId"],
             }
-            item["Server"].jellyfin.session_stop(data)
+            self.reporter.stopped(item["ServerId"], data)
 
             if item.get("LiveStreamId"):
 
                 LOG.info("<[ livestream/%s ]", item["LiveStreamId"])
-                item["Server"].jellyfin.close_live_stream(item["LiveStreamId"])
+                self.reporter.call(
+                    item["ServerId"],
+                    lambda api, item=item: api.close_live_stream(item["LiveStreamId"]),
+                )
 
             elif item["PlayMethod"] == "Transcode":
 
                 LOG.info("<[ transcode/%s ]", item["Id"])
-                item["Server"].jellyfin.close_transcode(
-                    item["DeviceId"], item["PlaySessionId"]
+                self.reporter.call(
+                    item["ServerId"],
+                    lambda api, item=item: api.close_transcode(
+                        item["DeviceId"], item["PlaySessionId"]
+                    ),
                 )
 
             path = translate_path(
@@ -490,31 +502,43 @@ class Player(xbmc.Player):
                     if item["Id"] in file:
                         xbmcvfs.delete(os.path.join(path, file))
 
-            result = item["Server"].jellyfin.get_item(item["Id"]) or {}
+            if settings("offerDelete.bool"):
+                # Once the server knows the play stopped
+                self.reporter.call(
+                    item["ServerId"],
+                    lambda api, item=item: self.offer_delete(api, item),
+                )
 
-            if "UserData" in result and result["UserData"]["Played"]:
-                delete = False
+            window("jellyfin.external_check", clear=True)
 
-                if result["Type"] == "Episode" and settings("deleteTV.bool"):
-                    delete = True
-                elif result["Type"] == "Movie" and settings("deleteMovies.bool"):
-                    delete = True
+        self.played.clear()
+        window("jellyfin_playing_id", clear=True)
 
-                if not settings("offerDelete.bool"):
-                    delete = False
+    def offer_delete(self, api, item):
+        """Look the played item up on the reporter, the dialog gets its own
+        thread so it doesn't hold up the reports behind it.
+        """
+        result = api.get_item(item["Id"]) or {}
 
-                if delete:
-                    LOG.info("Offer delete option")
+        if "UserData" in result and result["UserData"]["Played"]:
+            delete = False
 
-                    if dialog(
-                        "yesno", translate(30091), translate(33015), autoclose=120000
-                    ):
-                        item["Server"].jellyfin.delete_item(item["Id"])
+            if result["Type"] == "Episode" and settings("deleteTV.bool"):
+                delete = True
+            elif result["Type"] == "Movie" and settings("deleteMovies.bool"):
+                delete = True
 
-            window("jellyfin.external_check", clear=True)
+            if delete:
+                threading.Thread(target=self.confirm_delete, args=(api, item)).start()
 
-        self.played.clear()
-        window("jellyfin_playing_id", clear=True)
+    def confirm_delete(self, api, item):
+        LOG.info("Offer delete option")
+
+        if dialog("yesno", translate(30091), translate(33015), autoclose=120000):
+            try:
+                api.delete_item(item["Id"])
+            except Exception as error:
+                LOG.warning("Failed to delete %s: %s", item["Id"], error)
 
     def _fetch_skip_segments(self, item):
         if not settings("mediaSegmentsEnabled.bool"):
@@ -526,13 +550,43 @@ class Player(xbmc.Player):
 
         self._reset_skip_dialog()
 
-        segments = item["Server"].jellyfin.get_media_segments(item_id)
+        segments = item.get("MediaSegments")
+        if segments is None:
+            segments = item["Server"].jellyfin.get_media_segments(item_id)
         if segments:
             segments = self._convert_media_segments(segments)
 
+        if segments:
+            segments = SegmentIndex(segments, self._get_segment_skip_mode)
+
         if segments:
             self.skip_segments[item_id] = segments
-            LOG.info("Loaded media segments for %s: %s", item_id, list(segments.keys()))
+            LOG.info("Loaded media segments for %s: %s", item_id, segments.types())
+
+    def _prefetch_next_segments(self):
+        """Ask for the segments of the next playlist entry while this one plays."""
+        playlist = xbmc.PlayList(xbmc.PLAYLIST_VIDEO)
+        position = playlist.getposition()
+
+        if position < 0 or position + 1 >= playlist.size():
+            return
+
+        item = playutils.PLAYS.get(playlist[position + 1].getPath())
+
+        if item is None or item.get("MediaSegments") is not None:
+            return
+
+        threading.Thread(target=self._prefetch_segments, args=(item,)).start()
+
+    def _prefetch_segments(self, item):
+        """Without them, the segments are fetched once the item starts."""
+        try:
+            server = Jellyfin(item["ServerId"]).get_client()
+            item["MediaSegments"] = server.jellyfin.get_media_segments(item["Id"])
+        except Exception as error:
+            LOG.exception("Failed to prefetch media segments: %s", error)
+        else:
+            LOG.debug("Prefetched media segments for %s", item["Id"])
 
     def _convert_media_segments(self, response):
         if not response or "Items" not in response:
@@ -557,53 +611,14 @@ class Player(xbmc.Player):
                 }
         return segments if segments else None
 
-    def _process_segment(
-        self, item_id, segment_type, segment, current_position, skip_mode
-    ):
-        """Check if current position is within segment bounds. Returns (start, end) tuple, None if outside bounds, or False if invalid."""
-        start = segment.get("Start")
-        end = segment.get("End")
-        if start is None or end is None or end <= start:
-            return False
-
-        LOG.debug(
-            "Skip check: pos=%.1f, %s start=%.1f end=%.1f, in_segment=%s",
-            current_position,
-            segment_type,
-            start,
-            end,
-            start <= current_position <= end,
-        )
-
-        if not (start <= current_position <= end):
-            return None
-
-        return (start, end)
-
     def check_skip_segments(self, item, current_position):
         item_id = item["Id"]
         segments = self.skip_segments.get(item_id)
         if not segments:
             return
 
-        for segment_type, segment in segments.items():
-            skip_mode = self._get_segment_skip_mode(segment_type)
-            if skip_mode == 0:  # Off
-                continue
-
-            bounds = self._process_segment(
-                item_id, segment_type, segment, current_position, skip_mode
-            )
-            if not bounds:
-                continue
-
-            start, end = bounds
+        for start, end, segment_type, skip_mode in segments.at(current_position):
             segment_key = "%s:%s" % (item_id, segment_type)
-            LOG.debug(
-                "Skip check: IN WINDOW! segment_key=%s, already_prompted=%s",
-                segment_key,
-                segment_key in self.skip_prompted,
-            )
             if segment_key in self.skip_prompted:
                 continue
 
@@ -620,6 +635,20 @@ class Player(xbmc.Player):
             self._handle_skip_segment(segment_type, start, end, skip_mode)
             break
 
+    def next_skip_segment(self, item, current_position):
+        """Seconds until the next skip segment of item starts, None if there
+        is none ahead or playback doesn't move.
+        """
+        segments = self.skip_segments.get(item["Id"])
+        if not segments or item.get("Paused") or self.speed <= 0:
+            return None
+
+        start = segments.next_start(current_position)
+        if start is None:
+            return None
+
+        return (start - current_position + MARGIN) / self.speed
+
     def _get_segment_skip_mode(self, segment_type):
         """Get the skip mode for a segment type. Returns 0=Off, 1=Auto, 2=Button."""
         setting_map = {
@@ -780,6 +809,7 @@ class Player(xbmc.Player):
         self._reset_skip_dialog()
 
         self.up_next = False
+        self.speed = 1
         self.skip_segments = {}
         self.skip_prompted = set()
 
@@ -791,6 +821,10 @@ class Player(xbmc.Player):
             self.segment_checker = SegmentChecker(player=self)
             self.segment_checker.start()
 
+    def _reschedule_segment_checker(self):
+        if self.segment_checker:
+            self.segment_checker.reschedule()
+
     def _reset_skip_dialog(self):
         if self.skip_dialog:
             try:
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+#################################################################################################
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from .helper import LazyLogger
+from .helper.exceptions import HTTPException
+from .helper.utils import translate_path
+from .jellyfin import Jellyfin
+
+#################################################################################################
+
+LOG = LazyLogger(__name__)
+QUEUE = "special://profile/addon_data/plugin.video.jellyfin/progress.json"
+# Seconds between two progress reports of a play, unless something happened
+INTERVAL = 10.0
+# Reports kept while the server can't be reached, the oldest progress goes first
+MAX_QUEUED = 200
+# Seconds to wait before trying an unreachable server again, doubled up to MAX_BACKOFF
+BACKOFF = 2.0
+MAX_BACKOFF = 300.0
+UNREACHABLE = ("ServerUnreachable", "ReadTimeout")
+REPORTS = {
+    "playing": "session_playing",
+    "progress": "session_progress",
+    "stopped": "session_stop",
+}
+
+#################################################################################################
+
+
+class ProgressReporter(threading.Thread):
+    """Sends the playback reports of the player in order, off the player's
+    thread.
+
+    A progress report replaces the one of the same play still waiting and is
+    sent at most every interval seconds, unless it is urgent (pause, seek...).
+    Reports that fail because the server can't be reached are kept in a
+    bounded queue on disk and sent again once it answers, also after a restart.
+    """
+
+    def __init__(
+        self,
+        path=None,
+        interval=INTERVAL,
+        max_queued=MAX_QUEUED,
+        deliver=None,
+        clock=time.time,
+    ):
+
+        self.path = path or translate_path(QUEUE)
+        self.interval = interval
+        self.max_queued = max_queued
+        self.clock = clock
+        self.condition = threading.Condition()
+        self.queue = deque()
+        self.sent = {}
+        self.backoff = 0
+        self.retry = 0
+        self.offline = False
+        self.saved = False
+        self.stopping = False
+
+        if deliver is not None:
+            self.deliver = deliver
+
+        self.load()
+        threading.Thread.__init__(self)
+
+    def playing(self, server_id, data):
+        self.add(server_id, "playing", data)
+
+    def progress(self, server_id, data, urgent=False):
+        self.add(server_id, "progress", data, urgent)
+
+    def stopped(self, server_id, data):
+        self.add(server_id, "stopped", data)
+
+    def call(self, server_id, call):
+        """Run call(api) after the reports queued so far, it isn't kept if the
+        server can't be reached.
+        """
+        self.add(server_id, "call", call)
+
+    def add(self, server_id, kind, data, urgent=False):
+        entry = {"ServerId": server_id, "Kind": kind, "Data": data, "Urgent": urgent}
+
+        with self.condition:
+            if kind in ("progress", "stopped"):
+                for waiting in self.waiting_progress(data):
+                    # Superseded by the newer report of the same play
+                    entry["Urgent"] = entry["Urgent"] or waiting["Urgent"]
+                    self.queue.remove(waiting)
+
+            self.queue.append(entry)
+            self.trim()
+
+            if self.offline:
+                self.save()
+
+            self.condition.notify()
+
+    def waiting_progress(self, data):
+        return [
+            x
+            for x in self.queue
+            if x["Kind"] == "progress"
+            and x["Data"].get("PlaySessionId") == data.get("PlaySessionId")
+        ]
+
+    def trim(self):
+        while len(self.queue) > self.max_queued:
+            for entry in self.queue:
+                if entry["Kind"] == "progress":
+                    self.queue.remove(entry)
+
+                    break
+            else:
+                self.queue.popleft()
+
+    def stop(self):
+        """Stop once the report being sent is done, what is left is saved."""
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+
+    def run(self):
+        LOG.info("--->[ progress reporter ]")
+
+        while True:
+            with self.condition:
+                entry = self.take()
+
+                if entry is None:
+                    if self.queue:
+                        self.save()
+
+                    break
+
+            self.send(entry)
+
+        LOG.info("---<[ progress reporter ]")
+
+    def take(self):
+        """Wait for the next report due, None once stopping."""
+        while not self.stopping:
+            now = self.clock()
+            timeout = self.retry - now
+
+            if timeout <= 0:
+                timeout = None
+
+                for entry in self.queue:
+                    due = self.due(entry)
+
+                    if due <= now:
+                        self.queue.remove(entry)
+
+                        return entry
+
+                    if timeout is None or due - now < timeout:
+                        timeout = due - now
+
+            self.condition.wait(timeout)
+
+    def due(self, entry):
+        if entry["Kind"] != "progress" or entry["Urgent"]:
+            return 0
+
+        return self.sent.get(entry["Data"].get("PlaySessionId"), 0) + self.interval
+
+    def send(self, entry):
+        try:
+            self.deliver(entry)
+        except HTTPException as error:
+            if error.status not in UNREACHABLE:
+                LOG.warning("--[ report/%s ] %s", entry["Kind"], error.status)
+
+                return
+
+            with self.condition:
+                self.backoff = min(MAX_BACKOFF, self.backoff * 2 or BACKOFF)
+                self.retry = self.clock() + self.backoff
+                self.offline = True
+
+                if entry["Kind"] != "call":
+                    # Before anything newer of the play
+                    entry["Urgent"] = True
+                    self.queue.appendleft(entry)
+                    self.trim()
+
+                self.save()
+
+            LOG.info(
+                "--[ report/%s ] server unreachable, retry in %ss",
+                entry["Kind"],
+                self.backoff,
+            )
+        except Exception as error:
+            LOG.exception(error)
+        else:
+            with self.condition:
+                if entry["Kind"] == "stopped":
+                    self.sent.pop(entry["Data"].get("PlaySessionId"), None)
+                elif entry["Kind"] != "call":
+                    self.sent[entry["Data"].get("PlaySessionId")] = self.clock()
+
+                if self.offline:
+                    LOG.info("--[ report ] server is back, %s queued", len(self.queue))
+                    self.backoff = 0
+                    self.offline = False
+
+                if self.saved:
+                    self.save()
+
+    def deliver(self, entry):
+        api = Jellyfin(entry["ServerId"]).get_client().jellyfin
+
+        if entry["Kind"] == "call":
+            entry["Data"](api)
+        else:
+            getattr(api, REPORTS[entry["Kind"]])(entry["Data"])
+
+    def save(self):
+        """Keep the reports waiting on disk, until they are sent."""
+        reports = [x for x in self.queue if x["Kind"] != "call"]
+
+        try:
+            if not reports:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+
+                self.saved = False
+
+                return
+
+            with open(self.path, "w") as outfile:
+                json.dump(reports, outfile)
+
+            self.saved = True
+        except (IOError, OSError) as error:
+            LOG.warning("Failed to save the playback reports: %s", error)
+
+    def load(self):
+        """Reports left from the last time, sent first."""
+        try:
+            with open(self.path) as infile:
+                reports = json.load(infile)
+        except (IOError, OSError, ValueError):
+            return
+
+        LOG.info("--[ report ] %s reports left to send", len(reports))
+        self.queue.extend(reports)
+        self.offline = self.saved = True
@@ -1,40 +1,121 @@
 from __future__ import division, absolute_import, print_function, unicode_literals
 
+import bisect
 import threading
-import xbmc
-from .helper import LazyLogger, settings
+
+from .helper import LazyLogger
 
 LOG = LazyLogger(__name__)
+# Seconds past a segment start to wake up at, the position is checked as an int
+MARGIN = 0.05
+
+
+class SegmentIndex(object):
+    """Skip segments of an item sorted by start, with the skip mode of their
+    type resolved once. A segment is (start, end, segment_type, skip_mode).
+    """
+
+    def __init__(self, segments, skip_mode):
+
+        self.segments = []
+
+        for segment_type, segment in segments.items():
+            start = segment.get("Start")
+            end = segment.get("End")
+
+            if start is None or end is None or end <= start:
+                continue
+
+            mode = skip_mode(segment_type)
+
+            if mode == 0:  # Off
+                continue
+
+            self.segments.append((start, end, segment_type, mode))
+
+        self.segments.sort()
+        self.starts = [segment[0] for segment in self.segments]
+
+    def __len__(self):
+        return len(self.segments)
+
+    def types(self):
+        return [segment[2] for segment in self.segments]
+
+    def at(self, position):
+        """Segments playing at position, the earliest first."""
+        index = bisect.bisect_right(self.starts, position)
+
+        return [x for x in self.segments[:index] if position <= x[1]]
+
+    def next_start(self, position):
+        """Start of the first segment after position, None if there is none."""
+        index = bisect.bisect_right(self.starts, position)
+
+        if index < len(self.starts):
+            return self.starts[index]
 
 
 class SegmentChecker(threading.Thread):
+    """Checks the skip segments of the playing item when the next one starts.
+
+    It sleeps until the start of the next segment rather than polling the
+    position. A new item, seek, pause, resume or speed change reschedules it.
+    """
+
     stop_thread = False
 
     def __init__(self, player):
         self.player = player
+        self.condition = threading.Condition()
+        self.rescheduled = False
 
         threading.Thread.__init__(self)
 
     def stop(self):
-        self.stop_thread = True
+        with self.condition:
+            self.stop_thread = True
+            self.condition.notify()
+
+    def reschedule(self):
+        with self.condition:
+            self.rescheduled = True
+            self.condition.notify()
 
     def run(self):
         LOG.info("--->[ segment checker ]")
 
-        while not self.stop_thread:
-            if self.player.isPlaying() and settings("mediaSegmentsEnabled.bool"):
-                try:
-                    current_file = self.player.get_playing_file()
-                    if self.player.is_playing_file(current_file):
-                        item = self.player.get_file_info(current_file)
-                        current_pos = int(self.player.getTime())
-                        self.player.check_skip_segments(item, current_pos)
-                    else:
-                        LOG.info("Current file is not yet playing: %s", current_file)
+        while True:
+            timeout = self.check()
 
-                except Exception as e:
-                    LOG.exception("Error in segment checker loop: %s", e)
+            with self.condition:
+                if not self.stop_thread and not self.rescheduled:
+                    self.condition.wait(timeout)
 
-            xbmc.sleep(500)
+                self.rescheduled = False
+
+                if self.stop_thread:
+                    break
 
         LOG.info("---<[ segment checker ]")
+
+    def check(self):
+        """Check the position, returns the seconds until the next segment
+        starts or None when nothing is ahead.
+        """
+        if self.stop_thread or not self.player.isPlaying():
+            return None
+
+        try:
+            current_file = self.player.get_playing_file()
+
+            if not self.player.is_playing_file(current_file):
+                return None
+
+            item = self.player.get_file_info(current_file)
+            position = self.player.getTime()
+            self.player.check_skip_segments(item, position)
+
+            return self.player.next_skip_segment(item, self.player.getTime())
+        except Exception as e:
+            LOG.exception("Error in segment checker: %s", e)
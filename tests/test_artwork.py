@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import sqlite3
+
+import pytest
+
+from jellyfin_kodi.objects.kodi.artwork import Artwork, diff_art
+
+
+@pytest.fixture
+def cursor():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    cursor.execute(
+        "CREATE TABLE art(art_id INTEGER PRIMARY KEY, media_id INTEGER, "
+        "media_type TEXT, type TEXT, url TEXT)"
+    )
+    yield cursor
+    conn.close()
+
+
+@pytest.fixture
+def statements(cursor):
+    statements = []
+    cursor.connection.set_trace_callback(statements.append)
+    yield statements
+    cursor.connection.set_trace_callback(None)
+
+
+def art(cursor, media_id=1):
+    cursor.execute(
+        "SELECT type, url FROM art WHERE media_id = ? ORDER BY type", (media_id,)
+    )
+    return dict(cursor.fetchall())
+
+
+ARTWORK = {
+    "Primary": "primary",
+    "Banner": "banner",
+    "Logo": None,
+    "Backdrop": ["b0", "b1", "b2"],
+}
+
+
+def test_diff_art():
+    existing = {(1, "movie", "thumb"): "a", (1, "movie", "poster"): "b"}
+    wanted = {(1, "movie", "thumb"): "a", (1, "movie", "poster"): "c"}
+    wanted[(1, "movie", "fanart")] = "d"
+
+    assert diff_art(existing, wanted) == (
+        [(1, "movie", "fanart", "d")],
+        [("c", 1, "movie", "poster")],
+    )
+
+
+def test_add_writes_every_art_type(cursor):
+    Artwork(cursor).add(ARTWORK, 1, "movie")
+
+    assert art(cursor) == {
+        "banner": "banner",
+        "fanart": "b0",
+        "fanart1": "b1",
+        "fanart2": "b2",
+        "poster": "primary",
+        "thumb": "primary",
+    }
+
+
+def test_add_unchanged_art_only_reads(cursor, statements):
+    artwork = Artwork(cursor)
+    artwork.add(ARTWORK, 1, "movie")
+    del statements[:]
+
+    artwork.add(ARTWORK, 1, "movie")
+
+    assert len(statements) == 1
+    assert statements[0].strip().startswith("SELECT")
+
+
+def test_add_updates_changed_art_and_drops_removed_backdrops(cursor):
+    artwork = Artwork(cursor)
+    artwork.add(ARTWORK, 1, "movie")
+    artwork.add(ARTWORK, 2, "movie")
+
+    artwork.add(dict(ARTWORK, Primary="new", Backdrop=["b0"]), 1, "movie")
+
+    assert art(cursor) == {
+        "banner": "banner",
+        "fanart": "b0",
+        "poster": "new",
+        "thumb": "new",
+    }
+    assert len(art(cursor, 2)) == 6
+
+
+def test_add_skips_poster_for_music(cursor):
+    Artwork(cursor).add({"Primary": "primary", "Backdrop": []}, 1, "album")
+
+    assert art(cursor) == {"thumb": "primary"}
+
+
+def test_update_many_reads_once_per_media_type(cursor, statements):
+    artwork = Artwork(cursor)
+    artwork.update("old", 1, "actor", "thumb")
+    del statements[:]
+
+    artwork.update_many(
+        [
+            ("new", 1, "actor", "thumb"),
+            ("a2", 2, "actor", "thumb"),
+            ("a3", 3, "actor", "thumb"),
+            ("d4", 4, "director", "thumb"),
+            (None, 5, "actor", "thumb"),
+        ]
+    )
+
+    selects = [sql for sql in statements if sql.strip().startswith("SELECT")]
+    assert len(selects) == 2
+    assert art(cursor, 1) == {"thumb": "new"}
+    assert art(cursor, 4) == {"thumb": "d4"}
+    assert art(cursor, 5) == {}
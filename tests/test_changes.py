@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import threading
+
+import pytest
+
+from jellyfin_kodi.changes import (
+    PendingChanges,
+    WriterLock,
+    batches,
+    UPDATED,
+    USERDATA,
+    REMOVED,
+)
+
+
+class Clock(object):
+    now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def changes(clock):
+    return PendingChanges(delay=1, max_delay=5, clock=clock)
+
+
+def test_overlapping_events_download_each_item_once(changes):
+    changes.updated(["1", "2"])
+    changes.updated(["2", "3"])
+    changes.userdata(["4", "4"])
+
+    assert changes.take(force=True) == (["1", "2", "3"], ["4"], [])
+
+
+def test_removal_cancels_pending_update_and_userdata(changes):
+    changes.updated(["1", "2"])
+    changes.userdata(["3"])
+    changes.removed(["1", "3"])
+
+    assert changes.take(force=True) == (["2"], [], ["1", "3"])
+
+
+def test_userdata_merges_into_pending_update(changes):
+    changes.userdata(["1"])
+    changes.updated(["1", "2"])
+    changes.userdata(["2"])
+
+    assert changes.take(force=True) == (["1", "2"], [], [])
+
+
+def test_update_after_removal_brings_item_back(changes):
+    changes.removed(["1"])
+    changes.userdata(["1"])
+
+    assert changes.take(force=True) == ([], [], ["1"])
+
+    changes.removed(["1"])
+    changes.updated(["1"])
+
+    assert changes.take(force=True) == (["1"], [], [])
+
+
+def test_burst_is_held_until_quiet(changes, clock):
+    assert changes.take() is None
+
+    changes.updated(["1"])
+    clock.now += 0.5
+    changes.updated(["2"])
+    clock.now += 0.9
+
+    assert changes.take() is None
+
+    clock.now += 0.1
+
+    assert changes.take() == (["1", "2"], [], [])
+    assert changes.take() is None
+    assert len(changes) == 0
+
+
+def test_steady_trickle_is_handed_on_after_max_delay(changes, clock):
+    for item_id in range(6):
+        changes.updated([str(item_id)])
+        clock.now += 0.9
+
+    updated, userdata, removed = changes.take()
+
+    assert updated == ["0", "1", "2", "3", "4", "5"]
+
+
+def test_due(changes, clock):
+    assert changes.due() is None
+
+    changes.updated(["1"])
+    clock.now += 0.4
+
+    assert changes.due() == pytest.approx(0.6)
+
+    clock.now += 2
+
+    assert changes.due() == 0
+
+
+def test_userdata_alone_is_handed_on_sooner(changes, clock):
+    changes.userdata(["1"])
+    clock.now += 0.2
+
+    assert changes.take() == ([], ["1"], [])
+
+    changes.userdata(["1"])
+    changes.updated(["2"])
+    clock.now += 0.2
+
+    assert changes.take() is None
+
+
+@pytest.mark.parametrize(
+    "count, limit, workers, sizes",
+    [
+        (0, 50, 3, []),
+        (1, 50, 3, [1]),
+        (6, 50, 3, [2, 2, 2]),
+        (7, 50, 3, [3, 3, 1]),
+        (200, 50, 3, [50, 50, 50, 50]),
+        (120, 50, 3, [40, 40, 40]),
+    ],
+)
+def test_batches(count, limit, workers, sizes):
+    item_ids = [str(x) for x in range(count)]
+    result = batches(item_ids, limit, workers)
+
+    assert [len(x) for x in result] == sizes
+    assert [x for batch in result for x in batch] == item_ids
+
+
+def waiter(lane, order):
+    def run():
+        lane.acquire()
+        order.append(lane.name)
+        lane.release()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+
+    return thread
+
+
+def wait_for(lock, lane):
+    while not lock.waiting[lane]:
+        threading.Event().wait(0.001)
+
+
+def test_writer_lock_serves_the_most_urgent_lane_first():
+    lock = WriterLock()
+    order = []
+    lock.acquire()
+
+    threads = []
+    for name in (UPDATED, REMOVED, USERDATA):
+        threads.append(waiter(lock.lane(name), order))
+        wait_for(lock, name)
+
+    assert lock.lane(UPDATED).preempted()
+    assert not lock.lane(USERDATA).preempted()
+
+    lock.release()
+    for thread in threads:
+        thread.join(5)
+
+    assert order == [USERDATA, REMOVED, UPDATED]
+    assert not lock.lane(UPDATED).preempted()
+
+
+def test_lane_knows_when_another_writer_held_the_lock():
+    lock = WriterLock()
+    updated = lock.lane(UPDATED)
+    userdata = lock.lane(USERDATA)
+
+    updated.acquire()
+    assert not updated.changed
+    updated.release()
+
+    updated.acquire()
+    assert not updated.changed
+    updated.release()
+
+    userdata.acquire()
+    userdata.release()
+
+    updated.acquire()
+    assert updated.changed
+    updated.release()
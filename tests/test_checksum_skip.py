@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import pytest
+
+from benchmarks.obj_map import sample_item
+from jellyfin_kodi.helper import api
+from jellyfin_kodi.objects.movies import Movies
+from jellyfin_kodi.objects.obj import Objects, fingerprint
+from jellyfin_kodi.objects.utils import Lookups
+
+
+class Auth(object):
+    server_id = None
+
+    def get_server_info(self, server_id):
+        return {"address": "http://jellyfin"}
+
+
+class Server(object):
+    auth = Auth()
+
+
+class JellyfinDb(object):
+    def get_view_name(self, view_id):
+        return "Movies"
+
+
+class Written(Exception):
+    pass
+
+
+class Writer(Movies):
+    """Movies without databases."""
+
+    def __init__(self):
+        self.server = Server()
+        self.jellyfin_db = JellyfinDb()
+        self.objects = Objects()
+        self.lookups = Lookups(self.server)
+        self.item_ids = []
+
+    def get(self, *args):
+        return 1
+
+
+@pytest.fixture(autouse=True)
+def written(monkeypatch):
+    # The first thing a movie write does after the checksum check
+    def get_file_path(self, path):
+        raise Written
+
+    monkeypatch.setattr(api.API, "get_file_path", get_file_path)
+
+
+def movie(writer, item, checksum):
+    # row of jellyfin_db.get_item_by_id, skipping the @stop/@jellyfin_item wrappers
+    e_item = (1, 1, 1, None, "movie", "Movie", "library", "library", checksum)
+    Movies.movie.__wrapped__.__wrapped__(writer, item, e_item)
+
+
+def test_unchanged_movie_is_skipped():
+    item = dict(sample_item(1), Type="Movie")
+    writer = Writer()
+
+    movie(writer, item, fingerprint(item))
+
+    assert writer.item_ids == [item["Id"]]
+
+
+@pytest.mark.parametrize("checksum", [None, '{"Played": true}', "0" * 32])
+def test_changed_movie_is_written(checksum):
+    writer = Writer()
+
+    with pytest.raises(Written):
+        movie(writer, dict(sample_item(1), Type="Movie"), checksum)
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import sqlite3
+
+import pytest
+
+from jellyfin_kodi.database.jellyfin_db import JellyfinDatabase
+from jellyfin_kodi.database import (
+    jellyfin_tables,
+    JELLYFIN_DB_VERSION,
+    queries as QU,
+)
+
+
+@pytest.fixture
+def cursor():
+    conn = sqlite3.connect(":memory:")
+    yield conn.cursor()
+    conn.close()
+
+
+def indexes(cursor):
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='jellyfin' AND sql IS NOT NULL"
+    )
+    return sorted(row[0] for row in cursor.fetchall())
+
+
+def version(cursor):
+    cursor.execute(QU.get_version)
+    return cursor.fetchall()
+
+
+def test_new_database_gets_indexes(cursor):
+    jellyfin_tables(cursor)
+
+    assert len(indexes(cursor)) == 5
+    assert version(cursor) == [(str(JELLYFIN_DB_VERSION),)]
+
+
+def test_version_1_database_is_migrated(cursor):
+    cursor.execute("""CREATE TABLE jellyfin(
+        jellyfin_id TEXT UNIQUE, media_folder TEXT, jellyfin_type TEXT, media_type TEXT,
+        kodi_id INTEGER, kodi_fileid INTEGER, kodi_pathid INTEGER, parent_id INTEGER,
+        checksum INTEGER, jellyfin_parent_id TEXT)""")
+    cursor.execute("CREATE TABLE version(idVersion TEXT)")
+    cursor.execute("INSERT INTO version(idVersion) VALUES ('1')")
+
+    jellyfin_tables(cursor)
+
+    assert len(indexes(cursor)) == 5
+    assert version(cursor) == [(str(JELLYFIN_DB_VERSION),)]
+
+
+def test_checksum_column_is_migrated_to_text(cursor):
+    cursor.execute("""CREATE TABLE jellyfin(
+        jellyfin_id TEXT UNIQUE, media_folder TEXT, jellyfin_type TEXT, media_type TEXT,
+        kodi_id INTEGER, kodi_fileid INTEGER, kodi_pathid INTEGER, parent_id INTEGER,
+        checksum INTEGER, jellyfin_parent_id TEXT)""")
+    cursor.execute("CREATE TABLE version(idVersion TEXT)")
+    cursor.execute("INSERT INTO version(idVersion) VALUES ('3')")
+    cursor.execute(
+        "INSERT INTO jellyfin(jellyfin_id, jellyfin_type, kodi_id, checksum) "
+        "VALUES ('movie', 'Movie', 7, '{\"Played\": false}')"
+    )
+
+    jellyfin_tables(cursor)
+    cursor.execute(
+        "SELECT type FROM pragma_table_info('jellyfin') WHERE name = 'checksum'"
+    )
+    assert cursor.fetchall() == [("TEXT",)]
+    assert len(indexes(cursor)) == 5
+
+    db = JellyfinDatabase(cursor)
+    assert db.get_checksum("Movie") == [("movie", '{"Played": false}')]
+
+    # A digest that reads as a number stays a string
+    db.update_reference("12e4", "movie")
+    assert db.get_checksum("Movie") == [("movie", "12e4")]
+
+
+def test_migration_runs_once(cursor):
+    jellyfin_tables(cursor)
+    cursor.execute("DROP INDEX ix_jellyfin_parent")
+
+    jellyfin_tables(cursor)
+
+    assert "ix_jellyfin_parent" not in indexes(cursor)
+
+
+@pytest.mark.parametrize(
+    "query,args",
+    [
+        (QU.get_item_by_parent, (1, "episode")),
+        (QU.get_item_by_media_folder, ("library",)),
+        (QU.get_item_by_kodi, (1, "movie")),
+        (QU.get_checksum, ("Movie",)),
+        (QU.get_media_by_parent_id, ("parent",)),
+    ],
+)
+def test_lookups_use_an_index(cursor, query, args):
+    jellyfin_tables(cursor)
+
+    cursor.execute("EXPLAIN QUERY PLAN " + query, args)
+    plan = " ".join(row[-1] for row in cursor.fetchall())
+
+    assert "USING" in plan and "INDEX" in plan, plan
+
+
+def test_checkpoints_per_library_and_type(cursor):
+    jellyfin_tables(cursor)
+    db = JellyfinDatabase(cursor)
+
+    db.add_checkpoint("movies", "Movie", 0, 50)
+    db.add_checkpoint("movies", "Movie", 100, 50)
+    db.add_checkpoint("movies", "BoxSet", 0, 50)
+    db.add_checkpoint("shows", "Series", 0, 50)
+
+    assert sorted(db.get_checkpoints("movies", "Movie")) == [(0, 50), (100, 50)]
+
+    db.remove_checkpoints("movies", "Movie")
+    assert db.get_checkpoints("movies", "Movie") == []
+    assert db.get_checkpoints("movies", "BoxSet") == [(0, 50)]
+
+    db.remove_checkpoints("movies")
+    assert db.get_checkpoints("movies", "BoxSet") == []
+
+    db.remove_all_checkpoints()
+    assert db.get_checkpoints("shows", "Series") == []
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import queue
+
+import pytest
+
+from jellyfin_kodi import library
+from jellyfin_kodi.changes import PendingChanges
+from jellyfin_kodi.helper.pool import WorkerPool
+
+CHANGED = {
+    "movies": (["1", "2"], ["2", "3"]),
+    "shows": (["10"], ["11", "11"]),
+}
+
+
+@pytest.fixture
+def delta(monkeypatch):
+    requested = []
+    values = {"LastIncrementalSync": "2024-01-01T00:00:00Z", "syncIndicator": "99"}
+
+    def pages(index):
+        def changed(library_id, date):
+            requested.append((library_id, date))
+            yield {"Items": [{"Id": x} for x in CHANGED[library_id][index]]}
+
+        return changed
+
+    monkeypatch.setattr(library, "settings", lambda key, value=None: values.get(key))
+    monkeypatch.setattr(
+        library, "get_sync", lambda: {"Whitelist": ["movies", "Mixed:shows"]}
+    )
+    monkeypatch.setattr(library, "get_date_modified", pages(0))
+    monkeypatch.setattr(library, "get_userdata_date_modified", pages(1))
+
+    lib = library.Library.__new__(library.Library)
+    lib.changes = PendingChanges(delay=0)
+    lib.pool = WorkerPool()
+    lib.updated_queue = queue.Queue()
+    lib.userdata_queue = queue.Queue()
+    lib.removed_queue = queue.Queue()
+    lib.total_updates = 0
+
+    yield lib, requested, values
+
+
+def drain(q):
+    return [x for batch in list(q.queue) for x in batch]
+
+
+def test_delta_sync_queues_changed_items(delta):
+    lib, requested, values = delta
+
+    assert lib.delta_sync()
+    lib.queue_changes()
+
+    assert drain(lib.updated_queue) == ["1", "2", "10"]
+    # Updated items are written in full, userdata only once per item
+    assert drain(lib.userdata_queue) == ["3", "11"]
+    assert {library_id for library_id, date in requested} == {"movies", "shows"}
+    assert {date for library_id, date in requested} == {values["LastIncrementalSync"]}
+
+
+def test_delta_sync_needs_a_previous_sync(delta):
+    lib, requested, values = delta
+    values["LastIncrementalSync"] = ""
+
+    assert lib.delta_sync()
+    assert requested == []
+
+
+def test_delta_sync_reports_failure(delta, monkeypatch):
+    lib, requested, values = delta
+
+    def broken(library_id, date):
+        raise ValueError("unreachable")
+        yield
+
+    monkeypatch.setattr(library, "get_date_modified", broken)
+
+    assert lib.delta_sync() is False
+    assert not len(lib.changes)
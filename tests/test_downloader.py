@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import threading
+import time
+
+import pytest
+
+from jellyfin_kodi import downloader
+from jellyfin_kodi.helper.exceptions import HTTPException
+
+TOTAL = 95
+
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def _get(handler, params=None, server_id=None):
+        if params.get("EnableTotalRecordCount"):
+            return {"TotalRecordCount": TOTAL}
+
+        with lock:
+            calls.append(params["StartIndex"])
+
+        start = params["StartIndex"]
+        stop = min(start + params["Limit"], TOTAL)
+        return {"Items": [{"Id": str(x)} for x in range(start, stop)]}
+
+    def settings(setting, value=None):
+        return {"limitIndex": "10", "limitThreads": "2", "limitReadAhead": "2"}.get(
+            setting, ""
+        )
+
+    def _get_stream(handler, params=None, server_id=None):
+        result = _get(handler, params, server_id)
+        return {"Items": iter(result["Items"])}
+
+    monkeypatch.setattr(downloader, "_get", _get)
+    monkeypatch.setattr(downloader, "_get_stream", _get_stream)
+    monkeypatch.setattr(downloader, "settings", settings)
+
+    yield calls
+
+
+def _get_items(query, completed=None):
+    # Skip the @stop wrapper, it needs a running Kodi
+    return downloader._get_items.__wrapped__(query, completed=completed)
+
+
+def test_get_items_yields_every_page_once(fake_server):
+    ids = []
+
+    for page in _get_items({"url": "Items", "params": {}}):
+        ids.extend(item["Id"] for item in page["Items"])
+        params = page["RestorePoint"]["params"]
+        assert params["StartIndex"] == int(page["Items"][0]["Id"])
+        assert params["Limit"] == len(page["Items"]) <= 10
+
+    assert sorted(ids, key=int) == [str(x) for x in range(TOTAL)]
+    assert sorted(fake_server) == list(range(0, TOTAL, 10))
+
+
+def test_get_items_resumes_from_start_index(fake_server):
+    ids = []
+
+    for page in _get_items({"url": "Items", "params": {"StartIndex": 50}}):
+        ids.extend(item["Id"] for item in page["Items"])
+
+    assert sorted(ids, key=int) == [str(x) for x in range(50, TOTAL)]
+
+
+def test_get_items_read_ahead_is_bounded(fake_server):
+    pages = _get_items({"url": "Items", "params": {}})
+    next(pages)
+
+    # Give the fetch workers time to run ahead of the consumer
+    time.sleep(0.2)
+
+    # one page consumed, two buffered, two workers blocked on the full buffer
+    assert len(fake_server) <= 1 + 2 + 2
+
+    pages.close()
+
+
+def test_get_items_consumer_can_stop_early(fake_server):
+    pages = _get_items({"url": "Items", "params": {}})
+    next(pages)
+
+    finished = threading.Event()
+
+    def close():
+        pages.close()
+        finished.set()
+
+    threading.Thread(target=close).start()
+
+    assert finished.wait(5)
+    assert len(fake_server) < TOTAL // 10
+
+
+@pytest.mark.parametrize(
+    "start,completed,expected",
+    [
+        (0, None, [(0, 10), (10, 10), (20, 10)]),
+        (0, [(10, 10)], [(0, 10), (20, 10)]),
+        (0, [(20, 10), (0, 10)], [(10, 10)]),
+        # ranges written with another page size leave partial gaps
+        (0, [(0, 5), (12, 5)], [(5, 7), (17, 10)]),
+        (10, [(0, 15)], [(15, 10)]),
+        (0, [(0, 30)], []),
+    ],
+)
+def test_missing_pages(start, completed, expected):
+    assert downloader.missing_pages(start, 25, completed, 10) == expected
+
+
+def test_get_items_skips_completed_pages(fake_server):
+    ids = []
+    completed = [(0, 10), (30, 20), (90, 10)]
+
+    for page in _get_items({"url": "Items", "params": {}}, completed=completed):
+        ids.extend(item["Id"] for item in page["Items"])
+
+    assert sorted(fake_server) == [10, 20, 50, 60, 70, 80]
+    assert sorted(ids, key=int) == [str(x) for x in range(10, 30)] + [
+        str(x) for x in range(50, 90)
+    ]
+
+
+def test_get_items_splits_large_pages_into_batches(fake_server, monkeypatch):
+    monkeypatch.setattr(
+        downloader,
+        "settings",
+        lambda setting, value=None: {"limitIndex": "120"}.get(setting, ""),
+    )
+    batches = []
+
+    for page in _get_items({"url": "Items", "params": {}}):
+        params = page["RestorePoint"]["params"]
+        batches.append((params["StartIndex"], params["Limit"], len(page["Items"])))
+
+    assert fake_server == [0]
+    assert batches == [(0, 50, 50), (50, 45, 45)]
+
+
+def test_adaptive_paging_grows_when_fast_and_halves_on_errors():
+    paging = downloader.AdaptivePaging(20, 2, 100, 4)
+
+    for _ in range(4):
+        paging.success(0.1, 20)
+
+    assert paging.limit == 60
+    assert paging.threads == 3
+
+    paging.success(downloader.SLOW_PAGE + 1, 60)
+    assert (paging.limit, paging.threads) == (30, 3)
+
+    paging.failure()
+    assert (paging.limit, paging.threads) == (15, 1)
+
+    for _ in range(10):
+        paging.failure()
+
+    assert (paging.limit, paging.threads) == (10, 1)
+    assert (paging.requests, paging.errors) == (16, 11)
+
+
+def test_adaptive_paging_disabled_keeps_settings():
+    paging = downloader.AdaptivePaging(20, 2, 100, 4, enabled=False)
+    paging.success(0.1, 20)
+    paging.failure()
+
+    assert (paging.limit, paging.threads) == (20, 2)
+    assert paging.errors == 1
+
+
+def test_get_items_retries_failed_page(fake_server, monkeypatch):
+    monkeypatch.setattr(
+        downloader,
+        "settings",
+        lambda setting, value=None: {
+            "limitIndex": "10",
+            "limitThreads": "1",
+            "adaptivePaging.bool": True,
+        }.get(setting, ""),
+    )
+    streamed = downloader._get_stream
+    requests = []
+
+    def _get_stream(handler, params=None, server_id=None, **kwargs):
+        assert kwargs == {"server_retry": 1}
+        requests.append((params["StartIndex"], params["Limit"]))
+
+        if len(requests) == 3:
+            return None  # 500 response
+
+        return streamed(handler, params, server_id)
+
+    monkeypatch.setattr(downloader, "_get_stream", _get_stream)
+    ids = []
+
+    for page in _get_items({"url": "Items", "params": {}}):
+        ids.extend(item["Id"] for item in page["Items"])
+
+    assert sorted(ids, key=int) == [str(x) for x in range(TOTAL)]
+    # pages grew while fast, the failed one came back at half the size
+    assert requests[:2] == [(0, 10), (10, 15)]
+    assert requests[2:4] == [(25, 20), (25, 10)]
+
+
+def test_get_items_skips_page_failing_every_attempt(fake_server, monkeypatch):
+    monkeypatch.setattr(
+        downloader,
+        "settings",
+        lambda setting, value=None: {
+            "limitIndex": "10",
+            "limitThreads": "1",
+            "adaptivePaging.bool": True,
+        }.get(setting, ""),
+    )
+    streamed = downloader._get_stream
+
+    def _get_stream(handler, params=None, server_id=None, **kwargs):
+        if params["StartIndex"] == 0:
+            return None
+
+        return streamed(handler, params, server_id)
+
+    monkeypatch.setattr(downloader, "_get_stream", _get_stream)
+    ids = []
+
+    for page in _get_items({"url": "Items", "params": {}}):
+        ids.extend(item["Id"] for item in page["Items"])
+
+    assert ids[0] != "0"
+    assert set(ids) <= {str(x) for x in range(TOTAL)}
+
+
+def test_get_items_fetches_the_rest_of_a_broken_stream(fake_server, monkeypatch):
+    monkeypatch.setattr(downloader, "BATCH_SIZE", 5)
+    monkeypatch.setattr(
+        downloader,
+        "settings",
+        lambda setting, value=None: {"limitIndex": "10", "limitThreads": "1"}.get(
+            setting, ""
+        ),
+    )
+    streamed = downloader._get_stream
+    requests = []
+
+    def _get_stream(handler, params=None, server_id=None, **kwargs):
+        requests.append((params["StartIndex"], params["Limit"]))
+        items = streamed(handler, params, server_id)["Items"]
+
+        def broken():
+            for index, item in enumerate(items):
+                if index == 7:
+                    raise HTTPException("ReadTimeout", None)
+
+                yield item
+
+        if len(requests) == 3:
+            return {"Items": broken()}
+
+        return {"Items": items}
+
+    monkeypatch.setattr(downloader, "_get_stream", _get_stream)
+    ids = []
+
+    for page in _get_items({"url": "Items", "params": {}}):
+        ids.extend(item["Id"] for item in page["Items"])
+
+    assert ids == [str(x) for x in range(TOTAL)]
+    # the batch handed out before the read failed isn't fetched again
+    assert requests[2:4] == [(20, 10), (25, 5)]
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import collections
+import threading
+
+import pytest
+
+from jellyfin_kodi import full_sync
+from jellyfin_kodi.changes import WriterLock, UPDATED
+
+
+class FakeJellyfin(object):
+
+    def __init__(self):
+        self.requested = []
+        self.fetched = collections.defaultdict(threading.Event)
+
+    def get_seasons(self, show_id):
+        self.requested.append(show_id)
+        self.fetched[show_id].set()
+        return {"Items": [{"Id": "season-%s" % show_id, "SeriesId": show_id}]}
+
+
+class FakeServer(object):
+
+    def __init__(self):
+        self.jellyfin = FakeJellyfin()
+
+
+@pytest.fixture
+def sync(monkeypatch):
+    def get_episode_by_show(show_id):
+        # The downloader hands out the same dict for every page
+        page = {"Items": []}
+
+        for index in range(2):
+            page["Items"][:] = [{"Id": "%s-%s" % (show_id, index)}]
+            yield page
+
+    monkeypatch.setattr(full_sync.server, "get_episode_by_show", get_episode_by_show)
+    monkeypatch.setattr(full_sync, "settings", lambda setting, value=None: "2")
+
+    sync = full_sync.FullSync.__new__(full_sync.FullSync)
+    sync.server = FakeServer()
+
+    yield sync
+
+
+def series_pages(pages):
+    # Reused like the downloader does
+    items = {"Items": [], "RestorePoint": {"params": {}}}
+
+    for page in pages:
+        items["Items"][:] = [{"Id": show_id} for show_id in page]
+        items["RestorePoint"]["params"] = {"StartIndex": int(page[0])}
+        yield items
+
+
+def test_prefetch_shows_downloads_seasons_and_episodes(sync):
+    results = []
+
+    for items, shows in sync.prefetch_shows(series_pages([["1", "2"], ["3"]])):
+        results.append(
+            (
+                [show["Id"] for show in items["Items"]],
+                items["RestorePoint"]["params"]["StartIndex"],
+                {show_id: future.result() for show_id, future in shows.items()},
+            )
+        )
+
+    assert [result[:2] for result in results] == [(["1", "2"], 1), (["3"], 3)]
+    assert results[1][2] == {
+        "3": (
+            [{"Id": "season-3", "SeriesId": "3"}],
+            [{"Id": "3-0"}, {"Id": "3-1"}],
+        )
+    }
+
+
+def test_prefetch_shows_downloads_next_page_ahead(sync):
+    pages = sync.prefetch_shows(series_pages([["1"], ["2"], ["3"]]))
+    items, shows = next(pages)
+    shows["1"].result()
+
+    assert items["Items"] == [{"Id": "1"}]
+    # The second page is on its way while the first one is written
+    assert sync.server.jellyfin.fetched["2"].wait(5)
+
+    pages.close()
+    assert "3" not in sync.server.jellyfin.requested
+
+
+class View(object):
+    media_type = "movies"
+    view_name = "Movies"
+
+    def __getitem__(self, index):
+        return self.view_name
+
+
+def test_remove_library_holds_the_writer_lock(sync, monkeypatch):
+    class Library(object):
+        direct_path = False
+        database_lock = WriterLock()
+        music_database_lock = WriterLock()
+
+    class JellyfinDatabase(object):
+        def __init__(self, cursor):
+            pass
+
+        def get_view(self, view_id):
+            return View()
+
+        def get_item_by_media_folder(self, view_id):
+            return [("m1", "Movie"), ("m2", "Movie")]
+
+    class Database(object):
+        cursor = None
+
+        def __init__(self, name=None):
+            pass
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+    removed = []
+
+    class Movies(object):
+        def __init__(self, *args):
+            pass
+
+        def remove(self, item_id):
+            assert Library.database_lock.owner is not None
+            removed.append(item_id)
+
+    saved = []
+    monkeypatch.setattr(full_sync, "Database", Database)
+    monkeypatch.setattr(full_sync.jellyfin_db, "JellyfinDatabase", JellyfinDatabase)
+    monkeypatch.setattr(full_sync, "Movies", Movies)
+    monkeypatch.setattr(full_sync, "get_sync", lambda: {"Whitelist": ["lib"]})
+    monkeypatch.setattr(full_sync, "save_sync", saved.append)
+    sync.library = Library()
+
+    sync.remove_library("lib")
+
+    assert removed == ["m1", "m2"]
+    assert Library.database_lock.owner is None
+    assert saved == [{"Whitelist": []}]
+
+
+def test_writer_lock_is_a_plain_lock():
+    lock = WriterLock()
+
+    with lock:
+        assert lock.owner == UPDATED
+
+    assert lock.owner is None
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from jellyfin_kodi.helper.exceptions import HTTPException
+from jellyfin_kodi.jellyfin.configuration import Config
+from jellyfin_kodi.jellyfin import http as http_module
+from jellyfin_kodi.jellyfin.http import HTTP, PooledAdapter
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = json.dumps({"Items": [{"Id": "1", "Overview": None}]}).encode("utf-8")
+
+        if self.path == "/Truncated":
+            body = body[: body.index(b"}") + 1]
+        elif self.path == "/Missing":
+            body = b"Not found"
+
+        self.send_response(404 if self.path == "/Missing" else 200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Client(object):
+    def __init__(self, address, pool_size):
+        self.config = Config()
+        self.config.http(pool_size=pool_size)
+        self.config.data["auth.server"] = address
+        self.config.data["auth.server-id"] = "server"
+        self.callbacks = []
+
+    def callback(self, event, data):
+        self.callbacks.append(event)
+
+
+@pytest.fixture
+def address():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    yield "http://127.0.0.1:%s" % server.server_address[1]
+
+    server.shutdown()
+    server.server_close()
+
+
+def started(address, pool_size=4):
+    http = HTTP(Client(address, pool_size))
+    http.start_session()
+    http.keep_alive = True
+
+    return http
+
+
+def test_session_adapters_are_sized_by_config(address):
+    http = started(address, pool_size=7)
+
+    for adapter in http.session.adapters.values():
+        assert isinstance(adapter, PooledAdapter)
+        assert adapter._pool_maxsize == 7
+
+
+def test_sequential_requests_reuse_one_connection(address):
+    http = started(address)
+
+    for _ in range(5):
+        assert http.request({"handler": "Items"}) == {"Items": [{"Id": "1"}]}
+
+    assert http.connection_stats() == {"opened": 1, "reused": 4}
+
+
+def test_concurrent_requests_stay_within_the_pool(address):
+    http = started(address, pool_size=3)
+
+    with ThreadPoolExecutor(3) as executor:
+        for _ in range(2):
+            list(executor.map(lambda x: http.request({"handler": "Items"}), range(30)))
+
+    stats = http.connection_stats()
+    assert stats["opened"] <= 3 + 3
+    assert stats["opened"] + stats["reused"] == 60
+
+
+def test_stats_without_a_session():
+    assert HTTP(Client("", 1)).connection_stats() == {"opened": 0, "reused": 0}
+
+
+def test_streamed_items_release_the_connection(address):
+    http = started(address)
+
+    for _ in range(3):
+        result = http.request({"handler": "Items", "stream_items": True})
+        assert list(result["Items"]) == [{"Id": "1"}]
+
+    assert http.connection_stats() == {"opened": 1, "reused": 2}
+
+
+def test_truncated_stream_raises_a_read_timeout(address):
+    http = started(address)
+    result = http.request({"handler": "Truncated", "stream_items": True})
+
+    with pytest.raises(HTTPException) as error:
+        list(result["Items"])
+
+    assert error.value.status == "ReadTimeout"
+
+
+def test_streamed_error_releases_the_connection(address):
+    http = started(address)
+
+    for _ in range(3):
+        with pytest.raises(HTTPException) as error:
+            http.request({"handler": "Missing", "stream_items": True})
+
+        assert error.value.status == 404
+
+    assert http.connection_stats() == {"opened": 1, "reused": 2}
+
+
+@pytest.mark.parametrize(
+    "error, attempts, status, callbacks",
+    [
+        (requests.exceptions.ConnectionError, 6, "ServerUnreachable", 1),
+        (requests.exceptions.ReadTimeout, 2, "ReadTimeout", 0),
+    ],
+)
+def test_server_retry_leaves_connection_retries_alone(
+    monkeypatch, error, attempts, status, callbacks
+):
+    monkeypatch.setattr(http_module.time, "sleep", lambda seconds: None)
+    http = HTTP(Client("http://server", 1))
+    calls = []
+
+    def _requests(session, action, **kwargs):
+        calls.append(action)
+        raise error()
+
+    monkeypatch.setattr(http, "_requests", _requests)
+
+    with pytest.raises(HTTPException) as raised:
+        http.request({"handler": "Items", "server_retry": 1})
+
+    assert raised.value.status == status
+    assert len(calls) == attempts
+    assert len(http.client.callbacks) == callbacks
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import sqlite3
+
+import pytest
+
+from benchmarks import kodi_schema
+from jellyfin_kodi.objects.kodi import kodi, Movies, Music
+from jellyfin_kodi.objects.kodi import queries as QU
+
+STREAMS = {
+    "video": [
+        {
+            "codec": "hevc",
+            "aspect": 1.78,
+            "width": 3840,
+            "height": 2160,
+            "3d": None,
+            "hdrtype": "hdr10",
+        }
+    ],
+    "audio": [{"codec": "eac3", "channels": 6, "language": "eng"}],
+    "subtitle": ["eng", "fre"],
+}
+
+
+@pytest.fixture(params=sorted(kodi_schema.KODI))
+def version(request, monkeypatch):
+    monkeypatch.setattr(kodi, "kodi_version", lambda: request.param)
+    return request.param
+
+
+@pytest.fixture
+def video(version, tmp_path):
+    conn = sqlite3.connect(
+        kodi_schema.create_video(str(tmp_path / "video.db"), version)
+    )
+    yield conn.cursor()
+    conn.close()
+
+
+@pytest.fixture
+def music(version, tmp_path):
+    conn = sqlite3.connect(
+        kodi_schema.create_music(str(tmp_path / "music.db"), version)
+    )
+    yield conn.cursor()
+    conn.close()
+
+
+def test_streams_match_the_schema(version, video):
+    Movies(video).add_streams(1, STREAMS, 5400)
+
+    video.execute(
+        "SELECT iStreamType, strVideoCodec, strAudioCodec, strSubtitleLanguage"
+        " FROM streamdetails ORDER BY iStreamType, strSubtitleLanguage"
+    )
+    assert video.fetchall() == [
+        (0, "hevc", None, None),
+        (1, None, "eac3", None),
+        (2, None, None, "eng"),
+        (2, None, None, "fre"),
+    ]
+
+    if version >= 20:
+        video.execute("SELECT strHdrType FROM streamdetails WHERE iStreamType = 0")
+        assert video.fetchall() == [("hdr10",)]
+
+
+def test_video_versions_only_from_kodi_21(version, video):
+    writer = Movies(video)
+    writer.add_videoversion(1, 1, "movie", writer.itemtype, 40400)
+
+    if version >= 21:
+        video.execute("SELECT idFile, idMedia, idType FROM videoversion")
+        assert video.fetchall() == [(1, 1, 40400)]
+    else:
+        video.execute(QU.check_video_version)
+        assert video.fetchone() == (0,)
+
+
+def test_music_version(version, music):
+    writer = Music(music)
+
+    assert writer.version_id == kodi_schema.KODI[version][1]
+
+    album_id = writer.add_album(None, "Album", None, "album", "2024-01-01")
+    music.execute("SELECT idAlbum, strAlbum FROM album")
+    assert music.fetchall() == [(album_id, "Album")]
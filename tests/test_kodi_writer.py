@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import sqlite3
+
+import pytest
+
+from jellyfin_kodi.objects.kodi import Kodi
+from jellyfin_kodi.objects.kodi.kodi import LookupCache
+
+
+class Writer(Kodi):
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        Kodi.__init__(self)
+
+
+@pytest.fixture
+def cursor():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    cursor.executescript("""
+        CREATE TABLE genre(genre_id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE genre_link(genre_id INTEGER, media_id INTEGER, media_type TEXT);
+        CREATE UNIQUE INDEX ix_genre_link ON genre_link(genre_id, media_type, media_id);
+        CREATE TABLE studio(studio_id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE studio_link(studio_id INTEGER, media_id INTEGER, media_type TEXT);
+        CREATE TABLE tag(tag_id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE tag_link(tag_id INTEGER, media_id INTEGER, media_type TEXT);
+        CREATE TABLE path(idPath INTEGER PRIMARY KEY, strPath TEXT);
+        """)
+    yield cursor
+    conn.close()
+
+
+def links(cursor):
+    cursor.execute(
+        "SELECT genre_id, media_id FROM genre_link ORDER BY media_id, genre_id"
+    )
+    return cursor.fetchall()
+
+
+def test_add_genres_without_bulk_writes_immediately(cursor):
+    writer = Writer(cursor)
+    writer.add_genres(["Drama", "Comedy"], 1, "movie")
+
+    assert links(cursor) == [(1, 1), (2, 1)]
+
+
+def test_bulk_defers_link_writes_until_exit(cursor):
+    writer = Writer(cursor)
+
+    with writer.bulk():
+        writer.add_genres(["Drama", "Comedy"], 1, "movie")
+        writer.add_genres(["Drama"], 2, "movie")
+        writer.add_studios(["ACME"], 2, "movie")
+
+        assert links(cursor) == []
+
+    assert links(cursor) == [(1, 1), (2, 1), (1, 2)]
+    cursor.execute("SELECT studio_id, media_id FROM studio_link")
+    assert cursor.fetchall() == [(1, 2)]
+
+
+def test_bulk_replaces_existing_links(cursor):
+    writer = Writer(cursor)
+    writer.add_genres(["Drama", "Comedy"], 1, "movie")
+
+    with writer.bulk():
+        writer.add_genres(["Comedy"], 1, "movie")
+
+    assert links(cursor) == [(2, 1)]
+
+
+def test_bulk_same_item_twice_keeps_last_write(cursor):
+    writer = Writer(cursor)
+
+    with writer.bulk():
+        writer.add_genres(["Drama", "Comedy"], 1, "movie")
+        writer.add_genres(["Horror"], 1, "movie")
+
+    assert links(cursor) == [(3, 1)]
+
+
+def test_bulk_drops_link_writes_of_a_failed_batch(cursor):
+    writer = Writer(cursor)
+
+    with pytest.raises(KeyError):
+        with writer.bulk():
+            writer.add_genres(["Drama"], 1, "movie")
+            raise KeyError("item")
+
+    assert links(cursor) == []
+    assert writer._lookup.get("genre", "Drama") is None
+
+    with writer.bulk():
+        writer.add_genres(["Comedy"], 2, "movie")
+
+    assert links(cursor) == [(2, 2)]
+
+
+def test_bulk_failed_flush_isnt_masked(cursor):
+    writer = Writer(cursor)
+
+    with pytest.raises(sqlite3.OperationalError):
+        with writer.bulk():
+            writer.execute_link("INSERT INTO missing VALUES (?)", (1,))
+
+    assert writer._bulk is None
+    assert not writer._bulk_deletes
+
+
+@pytest.fixture
+def selects(cursor):
+    statements = []
+    cursor.connection.set_trace_callback(
+        lambda sql: sql.strip().startswith("SELECT") and statements.append(sql)
+    )
+    yield statements
+    cursor.connection.set_trace_callback(None)
+
+
+def test_bulk_preloads_lookup_tables(cursor, selects):
+    cursor.executescript("""
+        INSERT INTO genre VALUES (1, 'Drama'), (2, 'Comedy');
+        INSERT INTO studio VALUES (1, 'ACME');
+        INSERT INTO tag VALUES (1, 'Favorite movies');
+        """)
+    writer = Writer(cursor)
+    del selects[:]
+
+    with writer.bulk():
+        preloaded = len(selects)
+
+        for media_id in range(1, 20):
+            writer.add_genres(["drama", "Comedy"], media_id, "movie")
+            writer.add_studios(["ACME"], media_id, "movie")
+            writer.get_tag("Favorite movies", media_id, "movie")
+
+        assert len(selects) == preloaded
+
+    assert links(cursor)[:2] == [(1, 1), (2, 1)]
+
+
+def test_lookup_cache_remembers_new_rows(cursor, selects):
+    writer = Writer(cursor)
+    genre_id = writer.get_genre("Drama")
+    path_id = writer.add_path("/movies/")
+    del selects[:]
+
+    assert writer.get_genre("DRAMA") == genre_id
+    assert writer.add_path("/movies/") == path_id
+    assert writer.get_path("/Movies/") is None
+    assert len(selects) == 1
+
+
+def test_lookup_cache_follows_path_changes(cursor):
+    writer = Writer(cursor)
+    path_id = writer.add_path("/old/")
+
+    writer.cache_path("/new/", path_id)
+    assert writer.get_path("/new/") == path_id
+    assert writer._lookup.get("path", "/old/") is None
+
+    writer._lookup.discard("path", path_id)
+    assert writer._lookup.get("path", "/new/") is None
+
+
+def test_lookup_cache_is_bounded():
+    cache = LookupCache(size=2)
+
+    for genre_id, name in enumerate(["Drama", "Comedy", "Horror"]):
+        cache.set("genre", name, genre_id)
+
+    assert cache.get("genre", "Drama") is None
+    assert cache.get("genre", "horror") == 2
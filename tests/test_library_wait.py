@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import pytest
+
+from jellyfin_kodi import library
+from jellyfin_kodi.changes import PendingChanges
+from jellyfin_kodi.helper.pool import WorkerPool
+
+
+class Player(object):
+    playing = False
+
+    def isPlayingVideo(self):
+        return self.playing
+
+
+class Clock(object):
+    now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def lib(monkeypatch):
+    lib = library.Library.__new__(library.Library)
+    lib.changes = PendingChanges(delay=1, max_delay=5, clock=Clock())
+    lib.pool = WorkerPool()
+    lib.player = Player()
+    lib.pending_refresh = False
+    lib.timeouts = []
+
+    monkeypatch.setattr(library, "settings", lambda key: False)
+    monkeypatch.setattr(lib.pool, "wait", lib.timeouts.append)
+
+    return lib
+
+
+def test_idle_library_sleeps_without_timeout(lib):
+    lib.wait()
+
+    assert lib.timeouts == [None]
+
+
+def test_library_wakes_when_changes_are_due(lib):
+    lib.changes.updated(["1"])
+    lib.wait()
+
+    lib.pending_refresh = True
+    lib.wait()
+
+    assert lib.timeouts == [1, 1]
+
+
+def test_library_checks_back_while_sync_waits_for_playback(lib, monkeypatch):
+    monkeypatch.setattr(library.xbmc, "getCondVisibility", lambda condition: False)
+    lib.player.playing = True
+    lib.changes.updated(["1"])
+    lib.changes.clock.now += 10
+    lib.wait()
+
+    assert lib.timeouts == [2]
+
+
+def test_writer_workers_implement_write():
+    assert library.WriterWorker.__abstractmethods__ == {"write"}
+
+    for worker in (
+        library.UpdateWorker,
+        library.UserDataWorker,
+        library.RemovedWorker,
+    ):
+        assert not worker.__abstractmethods__
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+from jellyfin_kodi.database import jellyfin_tables
+from jellyfin_kodi.database.jellyfin_db import JellyfinDatabase
+from jellyfin_kodi.helper.pool import WorkerPool
+from jellyfin_kodi.objects import utils
+from jellyfin_kodi.objects.obj import fingerprint
+
+MOVIE = {"Id": "m1", "Type": "Movie", "LocalTrailerCount": 1}
+UNCHANGED = {"Id": "m2", "Type": "Movie", "LocalTrailerCount": 1}
+SERIES = {"Id": "s1", "Type": "Series", "LocalTrailerCount": 2}
+EPISODES = [
+    {"Id": "e1", "Type": "Episode", "SeriesId": "s9"},
+    {"Id": "e2", "Type": "Episode", "SeriesId": "s9"},
+    {"Id": "e3", "Type": "Episode", "SeriesId": "s1"},
+]
+
+
+class FakeJellyfin(object):
+
+    def __init__(self):
+        self.calls = []
+
+    def get_local_trailers(self, item_id):
+        self.calls.append(("trailers", item_id))
+        return [{"Id": "trailer-%s" % item_id}]
+
+    def get_items(self, item_ids):
+        self.calls.append(("items", sorted(item_ids)))
+        return {"Items": [{"Id": x, "Type": "Series"} for x in item_ids]}
+
+    def get_item(self, item_id):
+        self.calls.append(("item", item_id))
+        return {"Id": item_id}
+
+
+class FakeServer(object):
+
+    def __init__(self):
+        self.jellyfin = FakeJellyfin()
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    conn = sqlite3.connect(":memory:")
+    jellyfin_tables(conn.cursor())
+    db = JellyfinDatabase(conn.cursor())
+    db.add_reference(
+        "m2", 1, 1, 1, "Movie", "movie", None, fingerprint(UNCHANGED), "lib", None
+    )
+    db.add_reference("s1", 1, None, 1, "Series", "tvshow", None, "x", "lib", None)
+    db.add_view("lib", "Movies", "movies")
+
+    class FakeDatabase(object):
+        cursor = conn.cursor()
+
+    @contextmanager
+    def database(name):
+        yield FakeDatabase()
+
+    views = []
+
+    def get_ids_in_view(view_id, item_ids):
+        views.append((view_id, list(item_ids)))
+        return {x for x in item_ids if x.startswith("m")}
+
+    monkeypatch.setattr(utils.database, "Database", database)
+    monkeypatch.setattr(
+        utils.database, "get_sync", lambda: {"Whitelist": ["Mixed:lib"]}
+    )
+    monkeypatch.setattr(utils, "settings", lambda setting, value=None: "2")
+    monkeypatch.setattr(utils.server, "get_ids_in_view", get_ids_in_view)
+    monkeypatch.setattr(utils, "find_library", lambda server, item: {"Id": "ancestor"})
+
+    lookups = utils.Lookups(FakeServer())
+    lookups.views = views
+
+    yield lookups
+    conn.close()
+
+
+def test_prefetch_trailers_of_items_to_write(lookups):
+    lookups.prefetch([MOVIE, UNCHANGED, SERIES], {"Id": "lib"})
+
+    assert sorted(lookups.trailers) == ["m1", "s1"]
+    assert lookups.trailer("m1") == [{"Id": "trailer-m1"}]
+
+    calls = lookups.server.jellyfin.calls
+    del calls[:]
+    # Taken once, after that it goes to the server
+    assert lookups.trailer("m1") == [{"Id": "trailer-m1"}]
+    assert calls == [("trailers", "m1")]
+
+
+def test_prefetch_fingerprint_is_taken_over_by_the_writer(lookups, monkeypatch):
+    computed = []
+
+    def counted(item):
+        computed.append(item["Id"])
+        return fingerprint(item)
+
+    monkeypatch.setattr(utils, "fingerprint", counted)
+    lookups.prefetch([UNCHANGED], {"Id": "lib"})
+
+    assert lookups.fingerprint(UNCHANGED) == fingerprint(UNCHANGED)
+    assert computed == ["m2"]
+
+    # Only for the very item it was computed from
+    lookups.prefetch([UNCHANGED], {"Id": "lib"})
+    assert lookups.fingerprint(dict(UNCHANGED)) == fingerprint(UNCHANGED)
+    assert computed == ["m2", "m2", "m2"]
+    assert lookups.fingerprints == {}
+
+
+def test_prefetch_missing_series_in_one_request(lookups):
+    lookups.prefetch(EPISODES, {"Id": "lib"})
+
+    assert lookups.server.jellyfin.calls == [("items", ["s9"])]
+    assert lookups.get_series("s9") == {"Id": "s9", "Type": "Series"}
+    assert lookups.get_series("s1") == {"Id": "s1"}
+
+
+def test_prefetch_library_of_new_items(lookups):
+    lookups.prefetch([MOVIE, UNCHANGED] + EPISODES)
+
+    # One request per whitelisted view, only for the new items
+    assert lookups.views == [("lib", ["m1", "e1", "e2", "e3"])]
+    assert lookups.library(MOVIE) == {"Id": "lib", "Name": "Movies"}
+    assert lookups.library(EPISODES[0]) == {"Id": "ancestor"}
+
+
+def test_prefetch_skips_library_when_known(lookups):
+    lookups.prefetch([MOVIE], {"Id": "lib"})
+
+    assert lookups.views == []
+
+
+def test_get_item_worker_prefetches_before_queueing(monkeypatch):
+    from jellyfin_kodi import downloader
+
+    events = []
+
+    class Http(object):
+        def request(self, request):
+            return {"Items": [MOVIE, SERIES]}
+
+    class Server(object):
+        http = Http()
+
+    class Lookups(object):
+        def prefetch(self, items):
+            events.append(("prefetch", [item["Id"] for item in items]))
+
+    class Output(object):
+        def put(self, item):
+            events.append(("put", item["Id"]))
+
+    work = downloader.queue.Queue()
+    monkeypatch.setattr(downloader, "window", lambda key: False)
+
+    worker = downloader.GetItemWorker(
+        WorkerPool(),
+        Server(),
+        [(work, {"Movie": Output(), "Series": Output()}, Lookups())],
+    )
+    work.put(["m1", "s1"])
+    worker.work(work, work.get())
+
+    assert events == [("prefetch", ["m1", "s1"]), ("put", "m1"), ("put", "s1")]
@@ -1,8 +1,15 @@
 # -*- coding: utf-8 -*-
 from __future__ import division, absolute_import, print_function, unicode_literals
 
+import threading
+
 import pytest
 
+from jellyfin_kodi import player as player_module
+from jellyfin_kodi.helper.exceptions import HTTPException
+from jellyfin_kodi.player import Player
+from jellyfin_kodi.segments import SegmentChecker, SegmentIndex, MARGIN
+
 
 class TestMediaSegmentsConversion:
 
@@ -145,3 +152,159 @@ class TestDurationFormatting:
         else:
             duration_text = "%ds" % seconds
         assert duration_text == expected_text
+
+
+SEGMENTS = {
+    "Credits": {"Start": 2458.0, "End": 2520.0},
+    "Introduction": {"Start": 42.5, "End": 122.0},
+    "Recap": {"Start": 0.0, "End": 40.0},
+    "Preview": {"Start": 10.0, "End": 5.0},
+}
+MODES = {"Introduction": 1, "Credits": 2, "Recap": 0, "Preview": 1}
+
+
+class TestSegmentIndex:
+
+    def test_segments_are_sorted_and_filtered_once(self):
+        resolved = []
+
+        def skip_mode(segment_type):
+            resolved.append(segment_type)
+            return MODES[segment_type]
+
+        index = SegmentIndex(SEGMENTS, skip_mode)
+
+        assert index.types() == ["Introduction", "Credits"]
+        assert sorted(resolved) == ["Credits", "Introduction", "Recap"]
+
+        index.at(50)
+        index.next_start(50)
+
+        assert len(resolved) == 3
+
+    @pytest.mark.parametrize(
+        "position, playing, next_start",
+        [
+            (0, [], 42.5),
+            (42.5, ["Introduction"], 2458.0),
+            (122.0, ["Introduction"], 2458.0),
+            (200, [], 2458.0),
+            (2500, ["Credits"], None),
+        ],
+    )
+    def test_lookup(self, position, playing, next_start):
+        index = SegmentIndex(SEGMENTS, MODES.get)
+
+        assert [x[2] for x in index.at(position)] == playing
+        assert index.next_start(position) == next_start
+
+
+class FakePlayer(object):
+    """Playing an item at a position the test moves."""
+
+    def __init__(self):
+        self.position = 0.0
+        self.checked = threading.Semaphore(0)
+        self.timeouts = []
+
+    def isPlaying(self):
+        return True
+
+    def get_playing_file(self):
+        return "file"
+
+    def is_playing_file(self, file):
+        return True
+
+    def get_file_info(self, file):
+        return {"Id": "item"}
+
+    def getTime(self):
+        return self.position
+
+    def check_skip_segments(self, item, position):
+        self.checked.release()
+
+    def next_skip_segment(self, item, position):
+        return self.timeouts.pop(0) if self.timeouts else None
+
+
+class TestSegmentChecker:
+
+    def test_wakes_for_the_next_segment_or_when_rescheduled(self):
+        player = FakePlayer()
+        player.timeouts = [0.01]
+        checker = SegmentChecker(player)
+        checker.start()
+
+        try:
+            # Once started, once the segment starts
+            assert player.checked.acquire(timeout=5)
+            assert player.checked.acquire(timeout=5)
+            # Nothing ahead, it sleeps until told otherwise
+            assert not player.checked.acquire(timeout=0.1)
+
+            checker.reschedule()
+
+            assert player.checked.acquire(timeout=5)
+        finally:
+            checker.stop()
+            checker.join(5)
+
+        assert not checker.is_alive()
+
+
+@pytest.fixture
+def player():
+    player = Player.__new__(Player)
+    player.skip_segments = {"item": SegmentIndex(SEGMENTS, MODES.get)}
+    player.skip_prompted = set()
+    player.handled = []
+    player._handle_skip_segment = lambda *args: player.handled.append(args)
+
+    return player
+
+
+class TestPlayerSegments:
+
+    def test_each_segment_is_handled_once(self, player):
+        item = {"Id": "item"}
+
+        player.check_skip_segments(item, 30)
+        player.check_skip_segments(item, 43)
+        player.check_skip_segments(item, 60)
+
+        assert player.handled == [("Introduction", 42.5, 122.0, 1)]
+
+    def test_next_skip_segment(self, player):
+        item = {"Id": "item"}
+
+        assert player.next_skip_segment(item, 40.5) == pytest.approx(2 + MARGIN)
+
+        player.speed = 2
+
+        assert player.next_skip_segment(item, 40.5) == pytest.approx(1 + MARGIN / 2)
+        assert player.next_skip_segment(dict(item, Paused=True), 40.5) is None
+        assert player.next_skip_segment(item, 2500) is None
+        assert player.next_skip_segment({"Id": "other"}, 0) is None
+
+    def test_failed_prefetch_is_fetched_on_start(self, player, monkeypatch):
+        class Client(object):
+            class jellyfin(object):
+                @staticmethod
+                def get_media_segments(item_id):
+                    raise HTTPException("ServerUnreachable", None)
+
+        class Jellyfin(object):
+            def __init__(self, server_id):
+                pass
+
+            def get_client(self):
+                return Client()
+
+        monkeypatch.setattr(player_module, "Jellyfin", Jellyfin)
+        item = {"Id": "next", "ServerId": "server"}
+
+        player._prefetch_segments(item)
+
+        assert item.get("MediaSegments") is None
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import sqlite3
+import threading
+
+import pytest
+
+from jellyfin_kodi.helper.metrics import Metrics, TimedCursor, report
+
+
+@pytest.fixture
+def metrics():
+    metrics = Metrics()
+    metrics.start()
+    return metrics
+
+
+def test_nothing_is_recorded_until_started():
+    metrics = Metrics()
+    metrics.record("http", 1.0)
+    metrics.queue_depth("pages", 3)
+    metrics.add_items(10)
+
+    with metrics.timer("map"):
+        pass
+
+    summary = metrics.summary()
+    assert summary["Stages"] == {}
+    assert summary["MaxQueueDepths"] == {}
+    assert summary["Items"] == 0
+
+
+def test_summary_aggregates_stages(metrics):
+    metrics.record("http", 0.010)
+    metrics.record("http", 0.030)
+    metrics.record("json", 0.002)
+    metrics.queue_depth("pages", 2)
+    metrics.queue_depth("pages", 5)
+    metrics.queue_depth("pages", 1)
+    metrics.add_items(40)
+
+    summary = metrics.stop()
+
+    assert summary["Stages"]["http"] == {
+        "Count": 2,
+        "TotalMs": 40.0,
+        "AverageMs": 20.0,
+        "MaxMs": 30.0,
+    }
+    assert summary["Stages"]["json"]["Count"] == 1
+    assert summary["MaxQueueDepths"] == {"pages": 5}
+    assert summary["Items"] == 40
+
+    lines = report(summary).splitlines()
+    assert lines[1].startswith("http ")
+    assert lines[-1].startswith("pages ")
+
+
+def test_timed_records_each_call(metrics):
+
+    @metrics.timed("map")
+    def double(value):
+        return value * 2
+
+    assert [double(x) for x in range(3)] == [0, 2, 4]
+    assert metrics.summary()["Stages"]["map"]["Count"] == 3
+
+
+def test_acquire_records_lock_wait(metrics):
+    lock = threading.Lock()
+
+    with metrics.acquire(lock, "lock.video"):
+        assert lock.locked()
+
+    assert not lock.locked()
+    assert metrics.summary()["Stages"]["lock.video"]["Count"] == 1
+
+
+def test_timed_cursor_attributes_statements_to_tables(metrics):
+    conn = sqlite3.connect(":memory:")
+    cursor = TimedCursor(conn.cursor(), metrics)
+
+    cursor.execute("CREATE TABLE genre(genre_id INTEGER PRIMARY KEY, name TEXT)")
+    cursor.executemany("INSERT INTO genre(name) VALUES (?)", [("Drama",), ("Comedy",)])
+    cursor.execute("UPDATE genre SET name = ? WHERE genre_id = ?", ("Horror", 2))
+    rows = cursor.execute("SELECT name FROM genre ORDER BY genre_id").fetchall()
+
+    assert rows == [("Drama",), ("Horror",)]
+    assert cursor.lastrowid == 2
+    assert sorted(metrics.summary()["Stages"]) == ["sql.create", "sql.genre"]
+    assert metrics.summary()["Stages"]["sql.genre"]["Count"] == 3
+    conn.close()
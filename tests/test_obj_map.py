@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import pytest
+
+from benchmarks.obj_map import LegacyObjects, sample_item
+from jellyfin_kodi.objects.obj import (
+    Objects,
+    compile_param,
+    fingerprint,
+    KEY,
+    LOOP,
+    PATH,
+)
+
+MAPPINGS = sorted(Objects().plans)
+
+
+def sparse_item():
+    item = sample_item(7)
+    item["MediaSources"] = []
+    item["People"] = None
+    item["Studios"] = []
+    del item["ProviderIds"]
+    del item["SeriesId"]
+    return item
+
+
+def music_item():
+    item = sample_item(3)
+    item.update(
+        {
+            "Type": "Audio",
+            "AlbumArtists": [{"Name": "Band"}, {"Name": ""}],
+            "ArtistItems": [{"Name": "Band", "Id": "1"}],
+            "Album": "Album",
+            "AlbumId": "album",
+            "MediaStreams": item["MediaSources"][0]["MediaStreams"],
+        }
+    )
+    return item
+
+
+@pytest.mark.parametrize("item", [sample_item(1), sparse_item(), music_item()])
+@pytest.mark.parametrize("name", MAPPINGS)
+def test_map_matches_interpreter(item, name):
+    mapped = dict(Objects().map(item, name))
+    expected = LegacyObjects().map(item, name)
+
+    # The checksum is a fingerprint of the whole item now, see below
+    if not name.endswith("UserData"):
+        mapped.pop("Checksum", None)
+        expected.pop("Checksum", None)
+
+    assert mapped == expected
+
+
+def test_compile_param():
+    assert compile_param("Name") == (KEY, "Name", (), "")
+    assert compile_param("MediaSources/0/Path") == (
+        PATH,
+        ("MediaSources", 0, "Path"),
+        (),
+        "",
+    )
+    assert compile_param("People:?Type=Actor$Name") == (
+        LOOP,
+        (("People",), False),
+        (("Type", "Actor", False),),
+        "Name",
+    )
+    assert compile_param("Studios?$Name") == (KEY, "Studios", (), "Name")
+    assert compile_param("Path?Type=!null") == (
+        KEY,
+        "Path",
+        (("Type", None, True),),
+        "",
+    )
+
+
+def test_map_requires_a_mapping_name():
+    with pytest.raises(Exception):
+        Objects().map(sample_item(), None)
+
+
+def test_fingerprint_ignores_key_order():
+    item = sample_item(1)
+    reordered = dict(reversed(list(item.items())))
+
+    assert fingerprint(item) == fingerprint(reordered)
+
+
+@pytest.mark.parametrize(
+    "path,value",
+    [
+        (("Name",), "Renamed"),
+        (("ImageTags", "Primary"), "new"),
+        (("MediaSources", 0, "MediaStreams", 1, "Language"), "ger"),
+        (("UserData", "Played"), False),
+    ],
+)
+def test_fingerprint_covers_the_whole_item(path, value):
+    item = sample_item(1)
+    before = fingerprint(item)
+
+    target = item
+    for step in path[:-1]:
+        target = target[step]
+    target[path[-1]] = value
+
+    assert fingerprint(item) != before
+
+
+def test_userdata_checksum_never_matches_a_full_write():
+    item = sample_item(1)
+
+    assert Objects().map(item, "Episode")["Checksum"] == fingerprint(item)
+    assert Objects().map(item, "EpisodeUserData")["Checksum"] != fingerprint(item)
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import threading
+import time
+
+import pytest
+
+from jellyfin_kodi.helper import playutils
+from jellyfin_kodi.helper.playutils import PlayRegistry
+
+
+class Window(object):
+    """Window properties shared by the processes."""
+
+    def __init__(self):
+        self.properties = {}
+
+    def __call__(self, key, value=None, clear=False):
+        key = key.replace(".json", "")
+
+        if clear:
+            self.properties.pop(key, None)
+        elif value is not None:
+            self.properties[key] = value
+        else:
+            return self.properties.get(key)
+
+
+@pytest.fixture(autouse=True)
+def window(monkeypatch):
+    window = Window()
+    monkeypatch.setattr(playutils, "window", window)
+
+    return window
+
+
+@pytest.fixture
+def plays():
+    plays = PlayRegistry()
+    plays.serve()
+
+    return plays
+
+
+def play(path):
+    return {"Path": path, "Id": path}
+
+
+def test_take_the_play_of_the_path_or_the_first_one(plays):
+    for path in ("intro", "movie", "part"):
+        plays.add(play(path))
+
+    assert plays.take("movie")["Id"] == "movie"
+    assert plays.take("unknown")["Id"] == "intro"
+    assert plays.take("part")["Id"] == "part"
+    assert plays.take("part") is None
+
+
+def test_take_waits_for_the_play(plays):
+    thread = threading.Timer(0.05, plays.add, [play("movie")])
+    thread.start()
+
+    assert plays.take("movie", timeout=5)["Id"] == "movie"
+    thread.join()
+
+
+def test_late_play_is_handed_on_when_set(plays):
+    handed = []
+
+    assert plays.take("movie", late=handed.append) is None
+
+    plays.add(play("movie"))
+    plays.add(play("next"))
+
+    assert [x["Id"] for x in handed] == ["movie"]
+    assert plays.take("next")["Id"] == "next"
+
+
+def test_late_play_of_another_path_is_left(plays):
+    handed = []
+    plays.take("movie", late=handed.append)
+    plays.add(play("remote"))
+
+    assert handed == []
+    assert plays.take("remote")["Id"] == "remote"
+
+    plays.take("movie", late=handed.append)
+    plays.add(play("movie"))
+
+    assert [x["Id"] for x in handed] == ["movie"]
+
+
+def test_late_play_expires(plays, monkeypatch):
+    handed = []
+    monkeypatch.setattr(playutils, "LATE_PLAY", -1)
+    plays.take("movie", late=handed.append)
+    plays.add(play("movie"))
+
+    assert handed == []
+    assert plays.waiting is None
+    assert plays.take("movie")["Id"] == "movie"
+
+
+def test_forget_the_late_play(plays):
+    handed = []
+    plays.take("movie", late=handed.append)
+    plays.forget()
+    plays.add(play("movie"))
+
+    assert handed == []
+
+
+def test_clear_forgets_the_late_play(plays):
+    handed = []
+    plays.take("movie", late=handed.append)
+    plays.clear()
+    plays.add(play("movie"))
+
+    assert handed == []
+
+
+def test_plays_of_another_process_go_through_the_window(plays, window):
+    plugin = PlayRegistry()
+    plugin.add(play("intro"))
+    plugin.add(play("movie"))
+
+    assert plugin.plays == {}
+    assert [x["Id"] for x in window.properties["jellyfin_play"]] == ["intro", "movie"]
+    assert plays.take("movie")["Id"] == "movie"
+    assert "jellyfin_play" not in window.properties
+    assert plays.take("unknown")["Id"] == "intro"
+
+
+def test_get_leaves_the_play_for_the_player(plays):
+    plays.add(play("next"))
+
+    assert plays.get("next")["Id"] == "next"
+    assert plays.get("unknown") is None
+    assert plays.take("next")["Id"] == "next"
+
+
+def test_late_play_of_another_process_is_picked_up(plays, window, monkeypatch):
+    monkeypatch.setattr(playutils, "LATE_POLL", 0.01)
+    handed = threading.Event()
+    took = []
+
+    def late(play):
+        took.append(play)
+        handed.set()
+
+    assert plays.take("movie", late=late) is None
+
+    plugin = PlayRegistry()
+    plugin.add(play("movie"))
+
+    assert handed.wait(5)
+    assert [x["Id"] for x in took] == ["movie"]
+    assert "jellyfin_play" not in window.properties
+    assert plays.waiting is None
+
+
+def test_polling_stops_with_the_waiting_playback(plays, monkeypatch):
+    monkeypatch.setattr(playutils, "LATE_POLL", 0.01)
+    handed = []
+    plays.take("movie", late=handed.append)
+    plays.clear()
+    PlayRegistry().add(play("movie"))
+
+    deadline = time.time() + 5
+
+    while plays.polling:
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+    assert handed == []
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import threading
+
+import pytest
+
+from jellyfin_kodi.helper import playutils
+from jellyfin_kodi.helper.playutils import PlayUtils, Prefetch
+
+from .test_play_registry import Window
+from .test_playutils_settings import PatchedSettings
+
+
+class ApiClient:
+    class config:
+        data = {"auth.token": ""}
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """Settings read, Kodi's window is the one of every process."""
+    reads = []
+    patched = PatchedSettings()
+    for name in playutils.PROFILE_SETTINGS:
+        patched.settings.setdefault(name, "")
+
+    def settings(setting, value=None):
+        reads.append(setting)
+        return patched(setting, value)
+
+    monkeypatch.setattr(playutils, "settings", settings)
+    monkeypatch.setattr(playutils, "window", Window())
+    monkeypatch.setattr(playutils, "PROFILES", {})
+
+    return reads
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    builds = []
+    build = PlayUtils.build_device_profile
+
+    def counted(self):
+        builds.append(self)
+        return build(self)
+
+    monkeypatch.setattr(PlayUtils, "build_device_profile", counted)
+
+    return builds
+
+
+def play_utils(force_transcode=False, item_type="Movie"):
+    return PlayUtils({"Type": item_type}, force_transcode, api_client=ApiClient)
+
+
+def test_requests_are_sent_together():
+    prefetch = Prefetch()
+    barrier = threading.Barrier(2, timeout=5)
+
+    prefetch.submit("intros", barrier.wait)
+    prefetch.submit("segments", barrier.wait)
+
+    assert sorted([prefetch.get("intros", None), prefetch.get("segments", None)]) == [
+        0,
+        1,
+    ]
+    prefetch.close()
+
+
+def test_request_not_sent_is_made_on_get():
+    prefetch = Prefetch()
+
+    assert prefetch.get("parts", lambda x: x * 2, 21) == 42
+    assert prefetch.executor is None
+
+
+def test_map_keeps_the_order():
+    prefetch = Prefetch()
+
+    assert prefetch.map(lambda x: x * 2, [1, 2, 3]) == [2, 4, 6]
+    assert prefetch.map(lambda x: x * 2, [1]) == [2]
+    prefetch.close()
+
+
+def test_device_profile_is_built_once_until_settings_change(reads, builds):
+    profile = play_utils().get_device_profile()
+    # Until the service is told
+    playutils.settings("transcode_h265", True)
+    play_utils().get_device_profile()
+
+    assert len(builds) == 1
+
+    playutils.settings("transcode_h265", False)
+    playutils.check_device_profile()
+    del reads[:]
+
+    assert play_utils().get_device_profile() == profile
+    assert len(builds) == 1
+    assert reads == []
+
+    playutils.settings("transcode_h265", True)
+    playutils.check_device_profile()
+    changed = play_utils().get_device_profile()
+
+    assert len(builds) == 2
+    assert "hevc" in profile["DirectPlayProfiles"][0]["VideoCodec"]
+    assert "hevc" not in changed["DirectPlayProfiles"][0]["VideoCodec"]
+
+
+def test_other_processes_take_the_published_profile(reads, builds):
+    profile = play_utils().get_device_profile()
+    # The plugin starts afresh for every play
+    playutils.PROFILES.clear()
+    del reads[:]
+
+    assert play_utils().get_device_profile() == profile
+    assert len(builds) == 1
+    assert reads == []
+
+
+def test_fingerprint_is_stable(reads):
+    fingerprint = playutils.profile_fingerprint()
+
+    assert fingerprint == playutils.profile_fingerprint()
+
+    playutils.settings("maxBitrate", "10")
+
+    assert fingerprint != playutils.profile_fingerprint()
+
+
+def test_device_profile_variants_are_not_cached(reads, builds):
+    forced = play_utils(force_transcode=True).get_device_profile()
+    channel = play_utils(item_type="TvChannel").get_device_profile()
+    profile = play_utils().get_device_profile()
+
+    assert len(builds) == 1
+    assert forced["DirectPlayProfiles"] == []
+    assert channel["TranscodingProfiles"][0]["Container"] == "ts"
+    assert profile["DirectPlayProfiles"]
+    assert profile["TranscodingProfiles"][0]["Container"] == "m3u8"
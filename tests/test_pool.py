@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import threading
+import time
+
+import pytest
+
+from jellyfin_kodi.helper.pool import (
+    WorkerPool,
+    PoolWorker,
+    READY,
+    IDLE,
+    STOPPED,
+)
+
+
+class Worker(PoolWorker):
+    def __init__(self, pool, queues, gate=None):
+        PoolWorker.__init__(self, pool, queues)
+        self.gate = gate
+        self.worked = []
+        self.released = 0
+
+    def work(self, work_queue, item):
+        if self.gate is not None:
+            self.gate.wait(5)
+
+        self.worked.append(item)
+        work_queue.task_done()
+
+        return item == "stop"
+
+    def release(self):
+        self.released += 1
+
+
+def until(condition, timeout=5):
+    """Wait for the workers to get condition true."""
+    deadline = time.time() + timeout
+
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool()
+    yield pool
+    pool.stop()
+
+    for worker in pool.workers:
+        worker.join(5)
+
+
+def test_workers_take_the_first_queue_first(pool):
+    first, second = pool.queue(), pool.queue()
+    second.put("b")
+    first.put("a")
+    worker = Worker(pool, [first, second])
+    pool.add(worker)
+
+    until(pool.idle)
+
+    assert worker.worked == ["a", "b"]
+
+
+def test_connections_are_kept_until_the_pool_is_drained(pool):
+    gate = threading.Event()
+    fast, slow = pool.queue(), pool.queue()
+    early = Worker(pool, [fast])
+    late = Worker(pool, [slow], gate)
+    pool.add(early)
+    pool.add(late)
+
+    slow.put(1)
+    fast.put(1)
+    until(lambda: early.state == READY)
+
+    assert early.released == 0
+    assert not pool.idle()
+
+    gate.set()
+    until(pool.idle)
+
+    assert early.released == late.released == 1
+    assert early.state == late.state == IDLE
+
+
+def test_put_wakes_an_idle_worker(pool):
+    work_queue = pool.queue()
+    worker = Worker(pool, [work_queue])
+    pool.add(worker)
+
+    for item in range(3):
+        work_queue.put(item)
+        until(pool.idle)
+
+    assert worker.worked == [0, 1, 2]
+    assert worker.released == 3
+
+
+def test_stop(pool):
+    work_queue = pool.queue()
+    worker = Worker(pool, [work_queue])
+    pool.add(worker)
+
+    work_queue.put("stop")
+    worker.join(5)
+
+    assert worker.state == STOPPED
+    assert worker.released == 1
+
+    other = Worker(pool, [work_queue])
+    pool.add(other)
+    pool.stop()
+    other.join(5)
+
+    assert other.state == STOPPED
+    assert not other.is_alive()
+
+
+def test_wait_returns_on_notify_sent_before():
+    pool = WorkerPool()
+    pool.notify()
+    pool.wait()
+
+    waiter = threading.Thread(target=pool.wait)
+    waiter.start()
+    pool.notify()
+    waiter.join(5)
+
+    assert not waiter.is_alive()
+
+
+def test_worker_without_work_fails_at_construction(pool):
+    class Idle(PoolWorker):
+        pass
+
+    with pytest.raises(TypeError):
+        Idle(pool, [pool.queue()])
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import threading
+
+import pytest
+
+from jellyfin_kodi.helper.exceptions import HTTPException
+from jellyfin_kodi.progress import ProgressReporter, BACKOFF
+
+
+class Clock(object):
+    now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Server(object):
+    """Takes the reports until it goes away."""
+
+    def __init__(self):
+        self.reports = []
+        self.reachable = True
+
+    def __call__(self, entry):
+        if not self.reachable:
+            raise HTTPException("ServerUnreachable", None)
+
+        self.reports.append((entry["Kind"], entry["Data"].get("PositionTicks")))
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def server():
+    return Server()
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "progress.json")
+
+
+@pytest.fixture
+def reporter(path, server, clock):
+    return ProgressReporter(path, interval=10, deliver=server, clock=clock)
+
+
+def report(position, session="session"):
+    return {"PlaySessionId": session, "PositionTicks": position}
+
+
+def send_due(reporter):
+    """Send the reports due now, without the thread."""
+    while True:
+        now = reporter.clock()
+        due = [x for x in reporter.queue if reporter.due(x) <= now]
+
+        if not due or reporter.retry > now:
+            return
+
+        reporter.queue.remove(due[0])
+        reporter.send(due[0])
+
+
+def test_progress_is_coalesced_and_rate_limited(reporter, server, clock):
+    reporter.playing("server", report(0))
+    reporter.progress("server", report(1))
+    reporter.progress("server", report(2))
+    send_due(reporter)
+
+    assert server.reports == [("playing", 0)]
+
+    clock.now += 10
+    send_due(reporter)
+
+    assert server.reports == [("playing", 0), ("progress", 2)]
+
+
+def test_urgent_progress_is_not_held_back(reporter, server):
+    reporter.playing("server", report(0))
+    reporter.progress("server", report(1), urgent=True)
+    send_due(reporter)
+
+    assert server.reports == [("playing", 0), ("progress", 1)]
+
+
+def test_stopped_supersedes_the_waiting_progress(reporter, server):
+    reporter.playing("server", report(0))
+    reporter.progress("server", report(1))
+    reporter.stopped("server", report(2))
+    send_due(reporter)
+
+    assert server.reports == [("playing", 0), ("stopped", 2)]
+
+
+def test_unreachable_server_gets_the_reports_later(path, reporter, server, clock):
+    server.reachable = False
+    reporter.playing("server", report(0))
+    send_due(reporter)
+
+    assert reporter.retry == clock.now + BACKOFF
+
+    reporter.stopped("server", report(5))
+    send_due(reporter)
+    clock.now += BACKOFF
+    send_due(reporter)
+
+    assert reporter.retry == clock.now + BACKOFF * 2
+
+    # Kodi restarts and the server is back
+    server.reachable = True
+    restarted = ProgressReporter(path, deliver=server, clock=clock)
+    send_due(restarted)
+
+    assert server.reports == [("playing", 0), ("stopped", 5)]
+    assert not restarted.offline
+    assert not restarted.queue
+
+    again = ProgressReporter(path, deliver=server, clock=clock)
+
+    assert not again.queue
+
+
+def test_queue_is_bounded(path, server, clock):
+    reporter = ProgressReporter(path, max_queued=3, deliver=server, clock=clock)
+    reporter.playing("server", report(0, "a"))
+    reporter.stopped("server", report(1, "a"))
+    reporter.progress("server", report(2, "b"))
+    reporter.progress("server", report(3, "c"))
+
+    assert [x["Kind"] for x in reporter.queue] == ["playing", "stopped", "progress"]
+
+
+def test_reports_are_sent_off_the_caller(reporter, server):
+    sent = threading.Event()
+    reporter.call("server", lambda api: sent.set())
+    reporter.deliver = lambda entry: entry["Data"](None)
+    reporter.start()
+
+    try:
+        assert sent.wait(5)
+    finally:
+        reporter.stop()
+        reporter.join(5)
+
+    assert not reporter.is_alive()
+
+
+def test_offer_delete_doesnt_hold_the_reporter(monkeypatch):
+    from jellyfin_kodi import player as player_module
+
+    opened = threading.Event()
+    answer = threading.Event()
+    deleted = threading.Event()
+
+    def dialog(*args, **kwargs):
+        opened.set()
+        return answer.wait(5)
+
+    class Api(object):
+        def get_item(self, item_id):
+            return {"Type": "Movie", "UserData": {"Played": True}}
+
+        def delete_item(self, item_id):
+            deleted.set()
+
+    monkeypatch.setattr(player_module, "dialog", dialog)
+    monkeypatch.setattr(player_module, "settings", lambda setting: True)
+    player = player_module.Player.__new__(player_module.Player)
+
+    player.offer_delete(Api(), {"Id": "item"})
+
+    # back on the reporter while the dialog is still open
+    assert opened.wait(5)
+    assert not deleted.is_set()
+    answer.set()
+    assert deleted.wait(5)
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import json
+
+import pytest
+
+from jellyfin_kodi.jellyfin.utils import clean_none_dict_values, stream_json_list
+
+DOCUMENT = {
+    "Items": [
+        {
+            "Id": str(x),
+            "Overview": None,
+            "People": [{"Name": "Café, ]}", "Role": None}, None],
+            "RunTimeTicks": 1.5e3,
+        }
+        for x in range(20)
+    ],
+    "TotalRecordCount": 20,
+    "StartIndex": 0,
+}
+
+
+def chunked(data, size):
+    return [data[x : x + size] for x in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, 1 << 20])
+def test_matches_loaded_and_cleaned_response(size):
+    raw = json.dumps(DOCUMENT, ensure_ascii=False).encode("utf-8")
+    expected = clean_none_dict_values(json.loads(raw))["Items"]
+
+    assert list(stream_json_list(chunked(raw, size))) == expected
+
+
+def test_items_are_yielded_before_the_end_of_the_response():
+    raw = json.dumps(DOCUMENT).encode("utf-8")
+    chunks = iter(chunked(raw, 64))
+
+    first = next(stream_json_list(chunks))
+
+    assert first["Id"] == "0"
+    assert len(list(chunks)) > 0
+
+
+@pytest.mark.parametrize(
+    "raw", [b'{"Items": []}', b'{"TotalRecordCount": 0}', b"", b'{"Items" : [ ] }']
+)
+def test_empty(raw):
+    assert list(stream_json_list(chunked(raw, 3))) == []
+
+
+def test_truncated_response_raises():
+    raw = json.dumps(DOCUMENT).encode("utf-8")
+
+    with pytest.raises(ValueError):
+        list(stream_json_list(chunked(raw[:-100], 64)))
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from __future__ import division, absolute_import, print_function, unicode_literals
+
+import queue
+
+from jellyfin_kodi import library
+from jellyfin_kodi.changes import WriterLock, USERDATA
+from jellyfin_kodi.helper.pool import WorkerPool
+
+
+class Writer(library.WriterWorker):
+
+    lane = library.UPDATED
+
+    def __init__(self, items):
+        self.work_queue = queue.Queue()
+        library.WriterWorker.__init__(
+            self, WorkerPool(), [self.work_queue], WriterLock(), "video", None, False
+        )
+        self.written = []
+
+        for item in items:
+            self.work_queue.put(item)
+
+    def write(self, item):
+        if item == "exit":
+            raise library.LibraryExitException("Library sync paused")
+        if item == "broken":
+            raise ValueError(item)
+
+        self.written.append(item)
+
+    def next_batch(self):
+        return self.batch(self.work_queue, self.work_queue.get())
+
+
+def test_batch_is_bounded(monkeypatch):
+    monkeypatch.setattr(library, "BATCH", 3)
+    writer = Writer(range(5))
+
+    assert writer.next_batch() is False
+    assert writer.written == [0, 1, 2]
+    assert writer.next_batch() is False
+    assert writer.written == [0, 1, 2, 3, 4]
+
+
+def test_batch_yields_to_a_more_urgent_lane():
+    writer = Writer(range(5))
+    writer.lock.waiting[USERDATA] = 1
+
+    assert writer.next_batch() is False
+    assert writer.written == [0]
+    assert writer.work_queue.qsize() == 4
+
+
+def test_batch_skips_failed_items_and_stops_on_exit():
+    writer = Writer([0, "broken", 1, "exit", 2])
+
+    assert writer.next_batch() is True
+    assert writer.written == [0, 1]
+    assert writer.work_queue.qsize() == 1